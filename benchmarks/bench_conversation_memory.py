@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Benchmark de Memoria de Conversaciones
+Compara listas de diccionarios con el historial compacto (MessageHistory)
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from conversation import MessageHistory, MessageRecord, Role
+
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+MESSAGES = 20
+CONTENT = "Mensaje de ejemplo"
+
+
+def build_dicts() -> dict:
+    """
+    Formato anterior: lista de diccionarios con timestamp ISO por usuario
+
+    Returns:
+        Conversaciones indexadas por usuario
+    """
+    conversations = {}
+    for user_id in range(USERS):
+        conversation = []
+        for n in range(MESSAGES):
+            conversation.append({
+                "role": "user" if n % 2 == 0 else "assistant",
+                "content": CONTENT,
+                "timestamp": datetime.now().isoformat()
+            })
+            if len(conversation) > 20:
+                conversation = conversation[-20:]
+        conversations[user_id] = conversation
+    return conversations
+
+
+def build_records() -> dict:
+    """
+    Formato nuevo: buffer circular de MessageRecord por usuario
+
+    Returns:
+        Conversaciones indexadas por usuario
+    """
+    conversations = {}
+    for user_id in range(USERS):
+        history = MessageHistory(20)
+        for n in range(MESSAGES):
+            history.append(MessageRecord(Role.USER if n % 2 == 0 else Role.ASSISTANT, CONTENT))
+        conversations[user_id] = history
+    return conversations
+
+
+def measure(builder) -> tuple:
+    """
+    Mide la memoria retenida y el tiempo de construcción
+
+    Args:
+        builder: Función que construye las conversaciones
+
+    Returns:
+        Tupla (MB retenidos, segundos)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    conversations = builder()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del conversations
+    return current / 1024 / 1024, elapsed
+
+
+if __name__ == "__main__":
+    print(f"🧠 Memoria de conversaciones ({USERS:,} usuarios x {MESSAGES} mensajes)")
+    print("=" * 60)
+    print(f"{'Formato':>20} | {'MB':>10} | {'Bytes/mensaje':>14} | {'Tiempo (s)':>10}")
+    print("-" * 60)
+
+    for name, builder in (("dict + ISO", build_dicts), ("MessageRecord", build_records)):
+        megabytes, elapsed = measure(builder)
+        per_message = megabytes * 1024 * 1024 / (USERS * MESSAGES)
+        print(f"{name:>20} | {megabytes:>10.1f} | {per_message:>14.1f} | {elapsed:>10.2f}")
+
+    print("=" * 60)
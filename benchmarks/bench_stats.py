@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Benchmark de StatsManager
+Mide el coste por interacción según crece el número de usuarios, con
+volcados a disco en segundo plano durante la medición
+"""
+
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from stats import StatsManager
+
+
+USER_COUNTS = [10, 1_000, 10_000, 100_000]
+INTERACTIONS = 2_000
+
+# Volcados frecuentes para que coincidan con las interacciones medidas
+FLUSH_INTERVAL = 0.2
+FLUSH_THRESHOLD = 200
+
+# Pausa entre interacciones (el bot no registra una detrás de otra)
+PAUSE = 0.001
+
+
+def populate(stats: StatsManager, users: int):
+    """
+    Rellena las estadísticas con usuarios sintéticos
+
+    Args:
+        stats: Gestor de estadísticas
+        users: Cantidad de usuarios a crear
+    """
+    now = datetime.now().isoformat()
+    for user_id in range(users):
+        stats.storage.stats["users"][str(user_id)] = {
+            "total_messages": 10,
+            "total_tokens": 1000,
+            "total_response_time": 10.0,
+            "first_interaction": now,
+            "last_interaction": now,
+            "interactions": [
+                {"timestamp": now, "tokens": 100, "response_time": 1.0}
+                for _ in range(10)
+            ]
+        }
+
+
+def run(users: int) -> tuple:
+    """
+    Ejecuta el benchmark para una cantidad de usuarios
+
+    Args:
+        users: Cantidad de usuarios existentes
+
+    Returns:
+        Tupla (µs de media por interacción, ms de la peor, volcados durante
+        la medición, segundos del volcado final)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_file = Path(tmp) / "stats.json"
+        stats = StatsManager(
+            data_file=str(stats_file),
+            flush_interval=FLUSH_INTERVAL,
+            flush_threshold=FLUSH_THRESHOLD
+        )
+        populate(stats, users)
+
+        latencies = []
+        flushes = 0
+        last_mtime = None
+        for _ in range(INTERACTIONS):
+            start = time.perf_counter()
+            stats.add_interaction(random.randrange(users), 200, 1.5)
+            latencies.append(time.perf_counter() - start)
+
+            mtime = stats_file.stat().st_mtime_ns if stats_file.exists() else None
+            if mtime != last_mtime:
+                flushes += 1
+                last_mtime = mtime
+            time.sleep(PAUSE)
+
+        mean = sum(latencies) / len(latencies) * 1e6
+        worst = max(latencies) * 1000
+
+        start = time.perf_counter()
+        stats.close()
+        flush_time = time.perf_counter() - start
+
+    return mean, worst, flushes, flush_time
+
+
+if __name__ == "__main__":
+    print("📊 Benchmark de StatsManager (escritura diferida, volcando durante la medición)")
+    print("=" * 76)
+    print(f"{'Usuarios':>10} | {'µs/interacción':>15} | {'Peor (ms)':>10} | {'Volcados':>9} | {'Volcado final (s)':>17}")
+    print("-" * 76)
+
+    for users in USER_COUNTS:
+        mean, worst, flushes, flush_time = run(users)
+        print(f"{users:>10,} | {mean:>15.2f} | {worst:>10.2f} | {flushes:>9,} | {flush_time:>17.3f}")
+
+    print("=" * 76)
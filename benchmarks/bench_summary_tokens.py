@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Benchmark de Resumen Continuo
+Compara los tokens de prompt por turno con y sin resumen de conversación
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from context_builder import ContextBuilder
+from conversation import ConversationStore, MessageRecord, Role
+from storage import JSONStorage
+from summarizer import ConversationSummarizer
+
+
+TURNS = 60
+SYSTEM_PROMPT = "Eres un asistente útil y amigable."
+WORDS = "python discord ollama modelo contexto mensaje respuesta servidor usuario error".split()
+
+
+class OfflineClient:
+    """Cliente sin Ollama: devuelve un resumen de longitud típica (~150 tokens)"""
+
+    async def generate(self, payload: Dict) -> Dict:
+        return {"response": " ".join(random.choices(WORDS, k=90))}
+
+
+def text(words: int) -> str:
+    """Texto sintético de `words` palabras"""
+    return " ".join(random.choices(WORDS, k=words))
+
+
+async def run(summarize: bool) -> list:
+    """
+    Simula una conversación larga y mide los tokens de prompt de cada turno
+
+    Args:
+        summarize: Activar el resumen continuo
+
+    Returns:
+        Tokens estimados del prompt en cada turno
+    """
+    random.seed(42)
+    tokens = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JSONStorage(data_dir=tmp, flush_interval=3600)
+        store = ConversationStore(storage)
+        builder = ContextBuilder(num_ctx=8192, num_predict=500)
+        summarizer = ConversationSummarizer(store, OfflineClient(), "offline") if summarize else None
+
+        for _ in range(TURNS):
+            prompt = text(random.randint(10, 40))
+            store.append(1, MessageRecord(Role.USER, prompt))
+
+            summary, _ = store.get_summary(1)
+            history = store.unsummarized(1) if summary else store.get(1)
+            _, decision = builder.build(SYSTEM_PROMPT, history, prompt, summary)
+            tokens.append(decision["tokens"])
+
+            store.append(1, MessageRecord(Role.ASSISTANT, text(random.randint(60, 200))))
+            if summarizer:
+                summarizer.maybe_schedule(1)
+                # El resumen termina entre turnos (el usuario tarda en responder)
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+
+        storage.close()
+
+    return tokens
+
+
+if __name__ == "__main__":
+    without = asyncio.run(run(summarize=False))
+    with_summary = asyncio.run(run(summarize=True))
+
+    print(f"📝 Tokens de prompt por turno ({TURNS} turnos)")
+    print("=" * 60)
+    print(f"{'Turnos':>10} | {'Sin resumen':>12} | {'Con resumen':>12} | {'Ahorro':>8}")
+    print("-" * 60)
+    for start in range(0, TURNS, 10):
+        a = sum(without[start:start + 10]) / 10
+        b = sum(with_summary[start:start + 10]) / 10
+        print(f"{start + 1:>4}-{start + 10:<5} | {a:>12.0f} | {b:>12.0f} | {(1 - b / a) * 100:>7.1f}%")
+    print("-" * 60)
+    a = sum(without) / TURNS
+    b = sum(with_summary) / TURNS
+    print(f"{'Media':>10} | {a:>12.0f} | {b:>12.0f} | {(1 - b / a) * 100:>7.1f}%")
+    print("=" * 60)
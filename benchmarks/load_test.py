@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Prueba de Carga del Dashboard
+Lanza peticiones concurrentes contra /api/* y mide peticiones/s y latencia p99
+
+Uso:
+    python benchmarks/load_test.py --url http://localhost:5000 --concurrency 32 --duration 20
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import urlparse
+
+
+ENDPOINTS = [
+    "/api/health",
+    "/api/stats",
+    "/api/users",
+    "/api/hourly",
+    "/api/commands",
+    "/api/personalities",
+    "/api/logs/latest",
+    "/api/summary"
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil de una lista de latencias (0 si está vacía)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def worker(
+    url: str,
+    endpoints: List[str],
+    offset: int,
+    deadline: float,
+    timeout: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    lock: threading.Lock,
+    conditional: bool = False,
+    compressed: bool = False
+):
+    """
+    Repite peticiones GET sobre una conexión keep-alive hasta `deadline`
+
+    Args:
+        url: URL base del dashboard
+        endpoints: Rutas a recorrer en orden circular
+        offset: Ruta por la que empieza este hilo (reparte la carga)
+        deadline: Instante (time.perf_counter) en el que parar
+        timeout: Tiempo máximo por petición en segundos
+        latencies: Latencias por ruta (compartido)
+        errors: Errores por ruta (compartido)
+        lock: Cerrojo de los resultados compartidos
+        conditional: Reenviar el último ETag de cada ruta en If-None-Match
+        compressed: Aceptar respuestas comprimidas (gzip / brotli)
+    """
+    parsed = urlparse(url)
+    connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    connection = None
+    local_latencies = defaultdict(list)
+    local_errors = defaultdict(int)
+    etags: Dict[str, str] = {}
+    base_headers = {"Connection": "keep-alive"}
+    if compressed:
+        base_headers["Accept-Encoding"] = "br, gzip"
+
+    i = offset
+    while time.perf_counter() < deadline:
+        path = endpoints[i % len(endpoints)]
+        i += 1
+
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = connection_class(parsed.netloc, timeout=timeout)
+            headers = dict(base_headers)
+            if conditional and path in etags:
+                headers["If-None-Match"] = etags[path]
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if conditional and response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+            if response.status >= 400:
+                local_errors[path] += 1
+            else:
+                local_latencies[path].append(time.perf_counter() - start)
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            local_errors[path] += 1
+            if connection is not None:
+                connection.close()
+            connection = None
+
+    if connection is not None:
+        connection.close()
+
+    with lock:
+        for path, values in local_latencies.items():
+            latencies[path].extend(values)
+        for path, count in local_errors.items():
+            errors[path] += count
+
+
+def run(
+    url: str,
+    endpoints: List[str],
+    concurrency: int,
+    duration: float,
+    timeout: float,
+    conditional: bool = False,
+    compressed: bool = False
+):
+    """
+    Ejecuta la prueba de carga e imprime los resultados por ruta
+
+    Args:
+        url: URL base del dashboard
+        endpoints: Rutas a probar
+        concurrency: Clientes simultáneos (un hilo y una conexión cada uno)
+        duration: Segundos de prueba
+        timeout: Tiempo máximo por petición en segundos
+        conditional: Peticiones condicionales con If-None-Match (como un navegador)
+        compressed: Aceptar respuestas comprimidas
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(url, endpoints, n, deadline, timeout, latencies, errors, lock, conditional, compressed),
+            daemon=True
+        )
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"🔥 Prueba de carga: {url} | {concurrency} clientes | {elapsed:.1f}s")
+    print("=" * 84)
+    print(f"{'Ruta':<22} | {'Peticiones':>10} | {'Errores':>7} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+    print("-" * 84)
+
+    everything = []
+    for path in endpoints:
+        values = latencies.get(path, [])
+        everything.extend(values)
+        print(
+            f"{path:<22} | {len(values):>10,} | {errors.get(path, 0):>7,} | {len(values) / elapsed:>8.1f} | "
+            f"{percentile(values, 0.50) * 1000:>9.1f} | {percentile(values, 0.99) * 1000:>9.1f}"
+        )
+
+    print("-" * 84)
+    print(
+        f"{'TOTAL':<22} | {len(everything):>10,} | {sum(errors.values()):>7,} | {len(everything) / elapsed:>8.1f} | "
+        f"{percentile(everything, 0.50) * 1000:>9.1f} | {percentile(everything, 0.99) * 1000:>9.1f}"
+    )
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API del dashboard")
+    parser.add_argument("--url", default="http://localhost:5000", help="URL base del dashboard")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de prueba")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Tiempo máximo por petición (s)")
+    parser.add_argument(
+        "--endpoints",
+        default=",".join(ENDPOINTS),
+        help="Rutas a probar separadas por comas"
+    )
+    parser.add_argument("--conditional", action="store_true", help="Reenviar ETag en If-None-Match")
+    parser.add_argument("--compressed", action="store_true", help="Aceptar gzip / brotli")
+    args = parser.parse_args()
+
+    endpoints = [path.strip() for path in args.endpoints.split(",") if path.strip()]
+    run(
+        args.url.rstrip("/"),
+        endpoints,
+        args.concurrency,
+        args.duration,
+        args.timeout,
+        conditional=args.conditional,
+        compressed=args.compressed
+    )
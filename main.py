@@ -114,7 +114,7 @@ def check_env_file():
 def check_dependencies():
     """Verifica las dependencias necesarias"""
     print("\n🔍 Verificando dependencias...")
-    required = ["discord", "dotenv", "requests", "flask", "flask_cors"]
+    required = ["discord", "dotenv", "requests", "aiohttp", "flask", "flask_cors"]
     missing = []
     
     for package in required:
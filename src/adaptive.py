@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Ajuste Adaptativo de Opciones
+Ajusta num_predict, num_ctx y num_thread según la latencia p95 y la cola
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class AdaptiveController:
+    """Controlador que acorta las respuestas bajo carga y las recupera en reposo"""
+
+    def __init__(
+        self,
+        num_predict: int = 500,
+        num_ctx: int = 2048,
+        num_thread: int = 0,
+        min_predict: int = 128,
+        min_ctx: int = 1024,
+        min_thread: int = 0,
+        max_thread: int = 0,
+        target_p95: float = 20.0,
+        queue_high: int = 5,
+        window: int = 50,
+        min_samples: int = 10,
+        interval: float = 30.0,
+        reload_interval: float = 300.0,
+        ctx_step: int = 512,
+        scheduler=None,
+        context_builder=None,
+        stats_manager=None,
+        logger=None
+    ):
+        """
+        Inicializa el controlador
+
+        Los valores configurados (num_predict, num_ctx) son a la vez el punto
+        de partida y el máximo: sin carga el bot se comporta como siempre.
+        Cambiar num_ctx o num_thread obliga a Ollama a recargar el modelo,
+        así que solo se tocan cada `reload_interval` segundos como mucho;
+        num_predict se ajusta en cada evaluación.
+
+        Args:
+            num_predict: Tokens máximos de respuesta (y tope superior)
+            num_ctx: Ventana de contexto (y tope superior)
+            num_thread: Hilos iniciales (0 = no enviar y dejar decidir a Ollama)
+            min_predict: Tokens mínimos de respuesta
+            min_ctx: Ventana de contexto mínima
+            min_thread: Hilos mínimos
+            max_thread: Hilos máximos (0 = no ajustar hilos)
+            target_p95: Latencia p95 objetivo en segundos
+            queue_high: Peticiones en cola a partir de las que se considera sobrecarga
+            window: Latencias recientes consideradas
+            min_samples: Latencias necesarias antes de decidir
+            interval: Segundos mínimos entre evaluaciones
+            reload_interval: Segundos mínimos entre cambios de num_ctx / num_thread
+            ctx_step: Tokens que se quitan o añaden a num_ctx en cada cambio
+            scheduler: GenerationScheduler del que leer la profundidad de la cola
+            context_builder: ContextBuilder cuyo presupuesto se mantiene sincronizado
+            stats_manager: StatsManager opcional donde publicar el punto de operación
+            logger: BotLogger opcional donde registrar cada decisión
+        """
+        self.max_predict = num_predict
+        self.max_ctx = num_ctx
+        self.min_predict = min(min_predict, num_predict)
+        self.min_ctx = min(min_ctx, num_ctx)
+        self.min_thread = min_thread
+        self.max_thread = max_thread
+        self.target_p95 = target_p95
+        self.queue_high = queue_high
+        self.min_samples = min_samples
+        self.interval = interval
+        self.reload_interval = reload_interval
+        self.ctx_step = ctx_step
+        self.scheduler = scheduler
+        self.context_builder = context_builder
+        self.stats_manager = stats_manager
+        self.logger = logger
+
+        self.num_predict = num_predict
+        self.num_ctx = num_ctx
+        self.num_thread = num_thread or max_thread
+
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._last_evaluation = time.monotonic()
+        self._last_reload = 0.0
+        self.last_decision: Optional[Dict] = None
+
+    def options(self) -> Dict:
+        """
+        Opciones de Ollama del punto de operación actual
+
+        Returns:
+            Diccionario con num_predict, num_ctx y (si se ajusta) num_thread
+        """
+        options = {"num_predict": self.num_predict, "num_ctx": self.num_ctx}
+        if self.num_thread:
+            options["num_thread"] = self.num_thread
+        return options
+
+    def p95(self) -> float:
+        """Latencia p95 de las generaciones recientes en segundos"""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def observe(self, latency: float):
+        """
+        Registra la latencia de una generación y reevalúa si toca
+
+        Args:
+            latency: Segundos que tardó la generación
+        """
+        self._latencies.append(latency)
+        if time.monotonic() - self._last_evaluation >= self.interval:
+            self.evaluate()
+
+    def evaluate(self) -> Optional[Dict]:
+        """
+        Decide el nuevo punto de operación a partir de la p95 y la cola
+
+        Returns:
+            Decisión tomada o None si no hay datos suficientes o nada cambia
+        """
+        now = time.monotonic()
+        self._last_evaluation = now
+        if len(self._latencies) < self.min_samples:
+            return None
+
+        p95 = self.p95()
+        depth = self.scheduler.queued if self.scheduler is not None else 0
+        overloaded = p95 > self.target_p95 or depth >= self.queue_high
+        idle = p95 < self.target_p95 * 0.6 and depth == 0
+        if not overloaded and not idle:
+            return None
+
+        can_reload = now - self._last_reload >= self.reload_interval
+        before = self.options()
+
+        if overloaded:
+            # Respuestas más cortas primero; la ventana solo si la cola crece
+            self.num_predict = max(self.min_predict, int(self.num_predict * 0.75))
+            if can_reload and depth >= self.queue_high:
+                self.num_ctx = max(self.min_ctx, self.num_ctx - self.ctx_step)
+                if self.max_thread:
+                    # Varias generaciones a la vez: menos hilos para no saturar la CPU
+                    self.num_thread = max(self.min_thread or 1, self.num_thread - 1)
+            elif can_reload and self.max_thread:
+                # Generación lenta sin cola: más hilos para cada una
+                self.num_thread = min(self.max_thread, self.num_thread + 1)
+        else:
+            self.num_predict = min(self.max_predict, int(self.num_predict * 1.25) + 1)
+            if can_reload:
+                self.num_ctx = min(self.max_ctx, self.num_ctx + self.ctx_step)
+
+        after = self.options()
+        if after == before:
+            return None
+        if after.get("num_ctx") != before.get("num_ctx") or after.get("num_thread") != before.get("num_thread"):
+            self._last_reload = now
+
+        if self.context_builder is not None:
+            self.context_builder.num_ctx = self.num_ctx
+            self.context_builder.num_predict = self.num_predict
+
+        self.last_decision = {
+            "action": "shrink" if overloaded else "grow",
+            "p95": round(p95, 2),
+            "queue_depth": depth,
+            "before": before,
+            "after": after
+        }
+        if self.logger:
+            self.logger.log_info(
+                f"Ajuste adaptativo ({self.last_decision['action']}): p95={p95:.2f}s, "
+                f"cola={depth}, {before} -> {after}"
+            )
+        if self.stats_manager:
+            self.stats_manager.set_adaptive_state(after, p95, depth, self.last_decision["action"])
+        return self.last_decision
+
+    def get_status(self) -> Dict:
+        """
+        Obtiene el punto de operación actual
+
+        Returns:
+            Diccionario con las opciones, la p95 reciente y la última decisión
+        """
+        return {
+            **self.options(),
+            "p95": self.p95(),
+            "samples": len(self._latencies),
+            "target_p95": self.target_p95,
+            "last_decision": self.last_decision
+        }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    class DemoScheduler:
+        """Cola simulada"""
+        queued = 0
+
+    scheduler = DemoScheduler()
+    controller = AdaptiveController(
+        num_predict=500,
+        num_ctx=4096,
+        target_p95=10.0,
+        window=20,
+        interval=3600,
+        reload_interval=0,
+        scheduler=scheduler
+    )
+
+    phases = [("Reposo", 4.0, 0), ("Pico de carga", 18.0, 8), ("Carga alta", 14.0, 2), ("Reposo", 3.0, 0)]
+    for name, latency, depth in phases:
+        scheduler.queued = depth
+        for _ in range(3):
+            for _ in range(10):
+                controller.observe(latency)
+            decision = controller.evaluate()
+            action = decision["action"] if decision else "sin cambios"
+            print(f"{name:>14} | p95={controller.p95():5.1f}s cola={depth} | {action:11} | {controller.options()}")
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Pool de Servidores Ollama
+Reparte las peticiones entre varios servidores con balanceo y sondas de salud
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from ollama_client import OllamaClient
+
+
+# Errores que indican que el servidor no responde (expulsión pasiva)
+BACKEND_FAILURES = (asyncio.TimeoutError, aiohttp.ClientConnectionError)
+
+
+class Backend:
+    """Servidor Ollama del pool y su estado"""
+
+    def __init__(self, url: str, weight: float = 1, timeout: float = 60):
+        """
+        Args:
+            url: URL base del servidor (p. ej. http://gpu1:11434)
+            weight: Peso relativo (capacidad) del servidor
+            timeout: Tiempo máximo por petición en segundos
+        """
+        self.url = url.rstrip("/")
+        self.name = urlparse(self.url).netloc or self.url
+        self.weight = weight if weight > 0 else 1
+        self.client = OllamaClient(self.url, timeout=timeout)
+
+        self.outstanding = 0
+        self.requests = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Indica si el servidor puede recibir peticiones"""
+        return self.healthy and self.ejected_until <= time.monotonic()
+
+    @property
+    def load(self) -> float:
+        """Carga relativa a su peso (peticiones en curso + la nueva)"""
+        return (self.outstanding + 1) / self.weight
+
+
+class OllamaPool:
+    """Pool de servidores Ollama con la misma interfaz que OllamaClient"""
+
+    def __init__(
+        self,
+        backends: List[Backend],
+        probe_interval: float = 10.0,
+        probe_timeout: float = 5.0,
+        eject_cooldown: float = 30.0,
+        max_sticky_users: int = 10000,
+        stats_manager=None,
+        on_reassign: Optional[Callable[[int], None]] = None
+    ):
+        """
+        Inicializa el pool
+
+        Args:
+            backends: Servidores del pool
+            probe_interval: Segundos entre sondas /api/tags (0 = sin sondas)
+            probe_timeout: Tiempo máximo de cada sonda en segundos
+            eject_cooldown: Segundos fuera del pool tras un fallo de conexión
+            max_sticky_users: Usuarios cuya asignación se recuerda
+            stats_manager: StatsManager opcional donde registrar latencias y errores
+            on_reassign: Callback opcional llamado con el ID de un usuario que
+                cambia de servidor (su contexto KV ya no sirve)
+
+        Raises:
+            ValueError: Si no hay ningún servidor
+        """
+        if not backends:
+            raise ValueError("El pool necesita al menos un servidor Ollama")
+
+        self.backends = backends
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.eject_cooldown = eject_cooldown
+        self.max_sticky_users = max_sticky_users
+        self.stats_manager = stats_manager
+        self.on_reassign = on_reassign
+
+        self._by_name = {backend.name: backend for backend in backends}
+        self._sticky: "OrderedDict[int, str]" = OrderedDict()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_spec(cls, spec: str, timeout: float = 60, **kwargs) -> "OllamaPool":
+        """
+        Crea el pool a partir de una lista "url|peso,url|peso" (el peso es opcional)
+
+        Args:
+            spec: Servidores separados por comas, p. ej.
+                "http://gpu1:11434|3,http://gpu2:11434"
+            timeout: Tiempo máximo por petición en segundos
+            **kwargs: Resto de opciones de OllamaPool
+
+        Returns:
+            Pool configurado
+
+        Raises:
+            ValueError: Si la lista está vacía o un peso no es numérico
+        """
+        backends = []
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            url, _, weight = item.partition("|")
+            backends.append(Backend(url.strip(), float(weight) if weight else 1.0, timeout))
+        return cls(backends, **kwargs)
+
+    async def start(self):
+        """Abre las sesiones HTTP y lanza las sondas de salud"""
+        for backend in self.backends:
+            await backend.client.start()
+
+        if self.probe_interval > 0 and len(self.backends) > 1 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self):
+        """Detiene las sondas y cierra las sesiones HTTP"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+        for backend in self.backends:
+            await backend.client.close()
+
+    def route(self, user_id: Optional[int] = None) -> Backend:
+        """
+        Elige el servidor para una petición
+
+        Un usuario sigue en el mismo servidor mientras esté disponible (su
+        caché KV sigue caliente allí); si no, va al de menos peticiones en
+        curso en proporción a su peso.
+
+        Args:
+            user_id: ID del usuario (None = sin afinidad)
+
+        Returns:
+            Servidor elegido
+        """
+        # Si todos están caídos se prueba igualmente con el menos cargado
+        available = [b for b in self.backends if b.available] or self.backends
+
+        if user_id is not None:
+            backend = self._by_name.get(self._sticky.get(user_id))
+            if backend in available:
+                self._sticky.move_to_end(user_id)
+                return backend
+
+        backend = min(available, key=lambda b: (b.load, b.requests / b.weight))
+
+        if user_id is not None:
+            previous = self._sticky.pop(user_id, None)
+            self._sticky[user_id] = backend.name
+            while len(self._sticky) > self.max_sticky_users:
+                self._sticky.popitem(last=False)
+            if previous is not None and previous != backend.name and self.on_reassign:
+                self.on_reassign(user_id)
+
+        return backend
+
+    @contextmanager
+    def _track(self, backend: Backend):
+        """Cuenta una petición en curso y registra su latencia o su fallo"""
+        backend.outstanding += 1
+        backend.requests += 1
+        start = time.monotonic()
+        error = False
+        try:
+            yield
+        except BACKEND_FAILURES:
+            error = True
+            self._eject(backend)
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            backend.outstanding -= 1
+            if self.stats_manager:
+                self.stats_manager.add_backend_request(backend.name, time.monotonic() - start, error)
+
+    def _eject(self, backend: Backend):
+        """Saca un servidor del pool durante `eject_cooldown` segundos"""
+        backend.ejected_until = time.monotonic() + self.eject_cooldown
+        print(f"⚠️ Servidor Ollama {backend.name} fuera del pool durante {self.eject_cooldown:.0f}s")
+        if self.stats_manager:
+            self.stats_manager.add_backend_ejection(backend.name)
+
+    async def generate(
+        self,
+        payload: Dict,
+        user_id: Optional[int] = None,
+        backend: Optional[Backend] = None
+    ) -> Dict:
+        """
+        Llama a /api/generate sin streaming en el servidor elegido
+
+        Args:
+            payload: Cuerpo de la petición (model, prompt, options...)
+            user_id: ID del usuario para la afinidad de servidor
+            backend: Servidor ya elegido con route() (tiene prioridad)
+
+        Returns:
+            Respuesta JSON de Ollama
+        """
+        backend = backend or self.route(user_id)
+        with self._track(backend):
+            return await backend.client.generate(payload)
+
+    async def generate_stream(
+        self,
+        payload: Dict,
+        user_id: Optional[int] = None,
+        backend: Optional[Backend] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Llama a /api/generate en modo streaming en el servidor elegido
+
+        Args:
+            payload: Cuerpo de la petición (model, prompt, options...)
+            user_id: ID del usuario para la afinidad de servidor
+            backend: Servidor ya elegido con route() (tiene prioridad)
+
+        Yields:
+            Cada fragmento JSON emitido por Ollama
+        """
+        backend = backend or self.route(user_id)
+        with self._track(backend):
+            async for chunk in backend.client.generate_stream(payload):
+                yield chunk
+
+    async def embed(self, model: str, inputs: List[str]) -> List[List[float]]:
+        """
+        Calcula embeddings en el servidor menos cargado
+
+        Args:
+            model: Modelo de embeddings
+            inputs: Textos a convertir
+
+        Returns:
+            Un vector por texto, en el mismo orden
+        """
+        backend = self.route()
+        with self._track(backend):
+            return await backend.client.embed(model, inputs)
+
+    async def preload(self, model: str, keep_alive: str = "5m") -> int:
+        """
+        Carga un modelo en todos los servidores disponibles
+
+        Args:
+            model: Modelo de Ollama
+            keep_alive: Tiempo que Ollama debe mantenerlo cargado
+
+        Returns:
+            Servidores que lo han cargado correctamente
+        """
+        backends = [b for b in self.backends if b.available]
+
+        async def load(backend: Backend) -> bool:
+            try:
+                await backend.client.preload(model, keep_alive)
+                return True
+            except Exception:
+                return False
+
+        return sum(await asyncio.gather(*[load(backend) for backend in backends]))
+
+    async def probe(self):
+        """Comprueba la salud de todos los servidores con /api/tags"""
+        async def check(backend: Backend):
+            try:
+                await backend.client.tags(timeout=self.probe_timeout)
+                healthy = True
+            except Exception:
+                healthy = False
+
+            if healthy != backend.healthy:
+                backend.healthy = healthy
+                state = "disponible" if healthy else "sin respuesta"
+                print(f"{'✅' if healthy else '❌'} Servidor Ollama {backend.name} {state}")
+                if self.stats_manager:
+                    self.stats_manager.set_backend_health(backend.name, healthy)
+
+        await asyncio.gather(*[check(backend) for backend in self.backends])
+
+    async def _probe_loop(self):
+        """Lanza las sondas de salud periódicamente"""
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.probe_interval)
+
+    def get_status(self) -> List[Dict]:
+        """
+        Obtiene el estado actual de cada servidor
+
+        Returns:
+            Lista con nombre, peso, peticiones en curso y disponibilidad
+        """
+        now = time.monotonic()
+        return [
+            {
+                "name": backend.name,
+                "weight": backend.weight,
+                "outstanding": backend.outstanding,
+                "healthy": backend.healthy,
+                "ejected_for": max(0.0, backend.ejected_until - now),
+                "sticky_users": sum(1 for name in self._sticky.values() if name == backend.name)
+            }
+            for backend in self.backends
+        ]
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    from aiohttp import web
+
+    async def start_server(port: int, delay: float):
+        """Servidor Ollama falso que tarda `delay` segundos por respuesta"""
+        async def generate(request: web.Request) -> web.Response:
+            await asyncio.sleep(delay)
+            return web.json_response({"response": f"ok desde {port}", "eval_count": 1})
+
+        async def tags(request: web.Request) -> web.Response:
+            return web.json_response({"models": []})
+
+        app = web.Application()
+        app.router.add_post("/api/generate", generate)
+        app.router.add_get("/api/tags", tags)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        return runner
+
+    async def demo():
+        runners = [await start_server(11436, 0.2), await start_server(11437, 0.2)]
+
+        pool = OllamaPool.from_spec(
+            "http://127.0.0.1:11436|2,http://127.0.0.1:11437|1,http://127.0.0.1:11438",
+            timeout=5,
+            probe_interval=0.5,
+            on_reassign=lambda user_id: print(f"🔁 Usuario {user_id} cambia de servidor")
+        )
+        await pool.start()
+        await asyncio.sleep(0.2)
+
+        results = await asyncio.gather(*[
+            pool.generate({"model": "fake", "prompt": "hola"}) for _ in range(12)
+        ], return_exceptions=True)
+        errors = sum(1 for r in results if isinstance(r, Exception))
+        print(f"📨 12 peticiones, {errors} errores")
+
+        for user_id in (1, 2, 3):
+            first = pool.route(user_id).name
+            again = pool.route(user_id).name
+            print(f"👤 Usuario {user_id}: {first} -> {again}")
+
+        await runners[0].cleanup()
+        for _ in range(3):
+            try:
+                await pool.generate({"model": "fake", "prompt": "hola"}, user_id=1)
+            except BACKEND_FAILURES:
+                pass
+
+        for status in pool.get_status():
+            print(f"🖥️  {status}")
+
+        await pool.close()
+        await runners[1].cleanup()
+
+    asyncio.run(demo())
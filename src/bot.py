@@ -8,12 +8,14 @@ Bot de Discord inteligente con IA local usando Ollama
 import discord
 from discord import app_commands
 from discord.ext import commands
-import requests
+import aiohttp
+import hashlib
 import json
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 from pathlib import Path
+from typing import Awaitable, Callable, Optional
 import asyncio
 
 # Importar módulos propios
@@ -21,6 +23,19 @@ from logger import BotLogger
 from personality import PersonalityManager
 from chat_export import ChatExporter
 from stats import StatsManager
+from storage import create_storage
+from backend_pool import OllamaPool
+from streaming import StreamingMessage, split_message
+from scheduler import GenerationScheduler, QueueFullError
+from conversation import ConversationStore, MessageHistory, MessageRecord, Role
+from context_builder import ContextBuilder
+from summarizer import ConversationSummarizer
+from response_cache import ResponseCache
+from semantic_cache import EmbeddingBatcher, SemanticCache
+from single_flight import SingleFlight
+from model_router import ModelRouter, parse_mapping
+from adaptive import AdaptiveController
+from speculative import SpeculativeResponder
 
 # Cargar variables de entorno
 load_dotenv()
@@ -29,14 +44,191 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 AUTHORIZED_IDS = [int(id) for id in os.getenv("AUTHORIZED_IDS", "").split(",") if id]
 USE_GPU = os.getenv("USE_GPU", "false").lower() == "true"
-OLLAMA_MODEL = "llama3.2"
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+MODEL_SMALL = os.getenv("MODEL_SMALL", "")
+MODEL_LARGE = os.getenv("MODEL_LARGE", "")
+MODEL_SHORT_PROMPT_CHARS = int(os.getenv("MODEL_SHORT_PROMPT_CHARS", "80"))
+MODEL_LONG_PROMPT_CHARS = int(os.getenv("MODEL_LONG_PROMPT_CHARS", "400"))
+MODEL_BY_PERSONALITY = parse_mapping(os.getenv("MODEL_BY_PERSONALITY", ""))
+MODEL_BY_CHANNEL = parse_mapping(os.getenv("MODEL_BY_CHANNEL", ""))
+MODEL_BY_TIER = parse_mapping(os.getenv("MODEL_BY_TIER", ""))
+USER_TIERS = parse_mapping(os.getenv("USER_TIERS", ""))
+MODEL_CHOICES = [m.strip() for m in os.getenv("MODEL_CHOICES", "").split(",") if m.strip()]
+MODEL_KEEP_ALIVE = os.getenv("MODEL_KEEP_ALIVE", "30m")
+MODEL_WARM_INTERVAL = float(os.getenv("MODEL_WARM_INTERVAL", "600"))
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_BACKENDS = os.getenv("OLLAMA_BACKENDS", "")
+OLLAMA_PROBE_INTERVAL = float(os.getenv("OLLAMA_PROBE_INTERVAL", "10"))
+OLLAMA_EJECT_COOLDOWN = float(os.getenv("OLLAMA_EJECT_COOLDOWN", "30"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+STREAM_EDIT_TOKENS = int(os.getenv("STREAM_EDIT_TOKENS", "20"))
+KV_CONTEXT_MAX_TOKENS = int(os.getenv("KV_CONTEXT_MAX_TOKENS", "1536"))
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "2048"))
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", "500"))
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "false").lower() == "true"
+SUMMARY_THRESHOLD = int(os.getenv("SUMMARY_THRESHOLD", "12"))
+SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "4"))
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "8"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_CONTEXT = os.getenv("RESPONSE_CACHE_CONTEXT", "true").lower() == "true"
+RESPONSE_CACHE_EXCLUDE = [p.strip() for p in os.getenv("RESPONSE_CACHE_EXCLUDE", "").split(",") if p.strip()]
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "nomic-embed-text")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_INDEX = os.getenv("SEMANTIC_CACHE_INDEX", "bruteforce")
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+ADAPTIVE_TUNING = os.getenv("ADAPTIVE_TUNING", "true").lower() == "true"
+ADAPTIVE_TARGET_P95 = float(os.getenv("ADAPTIVE_TARGET_P95", "20"))
+ADAPTIVE_QUEUE_HIGH = int(os.getenv("ADAPTIVE_QUEUE_HIGH", "5"))
+ADAPTIVE_MIN_PREDICT = int(os.getenv("ADAPTIVE_MIN_PREDICT", "128"))
+ADAPTIVE_MIN_CTX = int(os.getenv("ADAPTIVE_MIN_CTX", "1024"))
+ADAPTIVE_MIN_THREADS = int(os.getenv("ADAPTIVE_MIN_THREADS", "0"))
+ADAPTIVE_MAX_THREADS = int(os.getenv("ADAPTIVE_MAX_THREADS", "0"))
+ADAPTIVE_INTERVAL = float(os.getenv("ADAPTIVE_INTERVAL", "30"))
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "false").lower() == "true"
+SPECULATIVE_DRAFT_MODEL = os.getenv("SPECULATIVE_DRAFT_MODEL", "llama3.2:1b")
+SPECULATIVE_DRAFT_TOKENS = int(os.getenv("SPECULATIVE_DRAFT_TOKENS", "120"))
+SPECULATIVE_DRAFT_TIMEOUT = float(os.getenv("SPECULATIVE_DRAFT_TIMEOUT", "10"))
+SPECULATIVE_BUSY_MESSAGES = int(os.getenv("SPECULATIVE_BUSY_MESSAGES", "5"))
+SPECULATIVE_PERSONALITIES = [p.strip() for p in os.getenv("SPECULATIVE_PERSONALITIES", "").split(",") if p.strip()]
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "2"))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "50"))
+LOG_FSYNC_POLICY = os.getenv("LOG_FSYNC_POLICY", "interval")
+LOG_FSYNC_INTERVAL = float(os.getenv("LOG_FSYNC_INTERVAL", "1.0"))
+LOG_FSYNC_EVERY = int(os.getenv("LOG_FSYNC_EVERY", "100"))
+LOG_MAX_INTERACTION_MB = float(os.getenv("LOG_MAX_INTERACTION_MB", "50"))
+CONVERSATION_MAX_USERS = int(os.getenv("CONVERSATION_MAX_USERS", "1000"))
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", "3600"))
+CONVERSATION_SPILL = os.getenv("CONVERSATION_SPILL", "true").lower() == "true"
 
 # Inicializar managers
-logger = BotLogger()
-personality_manager = PersonalityManager()
+logger = BotLogger(
+    fsync_policy=LOG_FSYNC_POLICY,
+    fsync_interval=LOG_FSYNC_INTERVAL,
+    fsync_every=LOG_FSYNC_EVERY,
+    max_interaction_bytes=int(LOG_MAX_INTERACTION_MB * 1024 * 1024)
+)
+storage = create_storage(logger=logger)
+personality_manager = PersonalityManager(storage=storage)
 chat_exporter = ChatExporter()
-stats_manager = StatsManager()
+stats_manager = StatsManager(storage=storage)
+ollama_pool = OllamaPool.from_spec(
+    OLLAMA_BACKENDS or OLLAMA_URL,
+    timeout=OLLAMA_TIMEOUT,
+    probe_interval=OLLAMA_PROBE_INTERVAL,
+    eject_cooldown=OLLAMA_EJECT_COOLDOWN,
+    stats_manager=stats_manager,
+    # El contexto KV solo es válido en el servidor que lo generó
+    on_reassign=lambda user_id: reset_ollama_context(user_id)
+)
+scheduler = GenerationScheduler(
+    max_concurrent=MAX_CONCURRENT_GENERATIONS,
+    max_queue=MAX_QUEUE_DEPTH,
+    stats_manager=stats_manager
+)
+conversation_store = ConversationStore(
+    storage,
+    max_users=CONVERSATION_MAX_USERS,
+    idle_ttl=CONVERSATION_IDLE_TTL,
+    keep=20,
+    spill_dir="data/sessions" if CONVERSATION_SPILL else None,
+    stats_manager=stats_manager
+)
+context_builder = ContextBuilder(
+    num_ctx=OLLAMA_NUM_CTX,
+    num_predict=OLLAMA_NUM_PREDICT,
+    stats_manager=stats_manager
+)
+summarizer = ConversationSummarizer(
+    conversation_store,
+    ollama_pool,
+    OLLAMA_MODEL,
+    threshold=SUMMARY_THRESHOLD,
+    keep_recent=SUMMARY_KEEP_RECENT,
+    scheduler=scheduler,
+    stats_manager=stats_manager
+) if SUMMARY_ENABLED else None
+
+response_cache = ResponseCache(
+    max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+    ttl=RESPONSE_CACHE_TTL,
+    stats_manager=stats_manager
+) if RESPONSE_CACHE_ENABLED else None
+
+semantic_cache = SemanticCache(
+    EmbeddingBatcher(
+        lambda texts: ollama_pool.embed(SEMANTIC_CACHE_MODEL, texts),
+        stats_manager=stats_manager
+    ).embed,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl=SEMANTIC_CACHE_TTL,
+    index_type=SEMANTIC_CACHE_INDEX,
+    persist_file="data/semantic_cache.json",
+    stats_manager=stats_manager
+) if SEMANTIC_CACHE_ENABLED else None
+
+model_router = ModelRouter(
+    OLLAMA_MODEL,
+    small_model=MODEL_SMALL,
+    large_model=MODEL_LARGE,
+    short_prompt_chars=MODEL_SHORT_PROMPT_CHARS,
+    long_prompt_chars=MODEL_LONG_PROMPT_CHARS,
+    personality_models=MODEL_BY_PERSONALITY,
+    channel_models=MODEL_BY_CHANNEL,
+    tier_models=MODEL_BY_TIER,
+    user_tiers=USER_TIERS,
+    allowed_models=MODEL_CHOICES,
+    storage=storage,
+    client=ollama_pool,
+    keep_alive=MODEL_KEEP_ALIVE,
+    warm_interval=MODEL_WARM_INTERVAL,
+    stats_manager=stats_manager,
+    # El contexto KV de un modelo no sirve para otro
+    on_switch=lambda user_id: reset_ollama_context(user_id)
+)
+
+adaptive_controller = AdaptiveController(
+    num_predict=OLLAMA_NUM_PREDICT,
+    num_ctx=OLLAMA_NUM_CTX,
+    min_predict=ADAPTIVE_MIN_PREDICT,
+    min_ctx=ADAPTIVE_MIN_CTX,
+    min_thread=ADAPTIVE_MIN_THREADS,
+    max_thread=ADAPTIVE_MAX_THREADS,
+    target_p95=ADAPTIVE_TARGET_P95,
+    queue_high=ADAPTIVE_QUEUE_HIGH,
+    interval=ADAPTIVE_INTERVAL,
+    scheduler=scheduler,
+    context_builder=context_builder,
+    stats_manager=stats_manager,
+    logger=logger
+) if ADAPTIVE_TUNING else None
+
+if adaptive_controller:
+    stats_manager.set_adaptive_state(adaptive_controller.options())
+
+speculator = SpeculativeResponder(
+    busy_messages=SPECULATIVE_BUSY_MESSAGES,
+    draft_timeout=SPECULATIVE_DRAFT_TIMEOUT,
+    stats_manager=stats_manager
+) if SPECULATIVE_ENABLED else None
+
+# Generaciones en curso, para que preguntas idénticas simultáneas compartan una
+flights = SingleFlight()
+
+# Personalidades excluidas de la caché desde .env
+for _personality in RESPONSE_CACHE_EXCLUDE:
+    if _personality in PersonalityManager.PERSONALITIES:
+        PersonalityManager.PERSONALITIES[_personality]["cache"] = False
+
+# Personalidades con respuesta especulativa desde .env (sustituye a las de por defecto)
+if SPECULATIVE_PERSONALITIES:
+    for _personality, _info in PersonalityManager.PERSONALITIES.items():
+        _info["speculative"] = _personality in SPECULATIVE_PERSONALITIES
 
 # Configuración del bot
 intents = discord.Intents.default()
@@ -45,8 +237,7 @@ intents.messages = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 
-# Almacenamiento de conversaciones
-conversations = {}
+# Canal de respuestas
 response_channel_id = None
 
 
@@ -57,66 +248,249 @@ def is_authorized(user_id: int) -> bool:
     return user_id in AUTHORIZED_IDS
 
 
-def get_conversation(user_id: int) -> list:
-    """Obtiene la conversación de un usuario"""
-    if user_id not in conversations:
-        conversations[user_id] = []
-    return conversations[user_id]
+def get_conversation(user_id: int) -> MessageHistory:
+    """Obtiene la conversación de un usuario (la carga del almacenamiento si hace falta)"""
+    return conversation_store.get(user_id)
 
 
 def add_to_conversation(user_id: int, role: str, content: str):
     """Añade un mensaje a la conversación"""
+    # El almacén conserva solo los últimos 20 mensajes
+    conversation_store.append(user_id, MessageRecord(Role.parse(role), content))
+    
+    # Resumir los turnos antiguos en segundo plano antes de que se pierdan
+    if summarizer and role == "assistant":
+        summarizer.maybe_schedule(user_id)
+
+
+def set_conversation(user_id: int, messages: list):
+    """Sustituye la conversación de un usuario (vacía para reiniciarla)"""
+    if summarizer:
+        summarizer.cancel(user_id)
+    conversation_store.replace(user_id, messages)
+
+
+def cache_fingerprint(user_id: int, pending: bool = False) -> Optional[str]:
+    """
+    Huella de toda la conversación anterior al mensaje actual (para la caché de respuestas)
+    
+    Dos usuarios solo comparten una respuesta si su historial y su resumen
+    son idénticos; sin RESPONSE_CACHE_CONTEXT solo se cachea el primer turno.
+    
+    Args:
+        user_id: ID del usuario
+        pending: El mensaje actual aún no se ha añadido a la conversación
+        
+    Returns:
+        Huella ("" sin historial previo) o None si el turno no es cacheable
+    """
+    conversation = get_conversation(user_id)
+    # Mensajes contando el actual: la misma cuenta antes y después de añadirlo
+    if len(conversation) + (1 if pending else 0) >= conversation.capacity:
+        # Se pueden haber descartado turnos que el contexto KV sigue incluyendo
+        return None
+    
+    previous = list(conversation) if pending else list(conversation)[:-1]
+    if not previous:
+        return ""
+    if not RESPONSE_CACHE_CONTEXT:
+        return None
+    
+    summary, _ = conversation_store.get_summary(user_id)
+    digest = hashlib.sha1(summary.encode("utf-8"))
+    for record in previous:
+        digest.update(f"\n{record.role.label}:{record.content}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def response_cache_key(user_id: int, model: str, prompt: str, pending: bool = False) -> Optional[tuple]:
+    """Clave de caché (y de agrupación) de un mensaje, o None si no es cacheable"""
+    personality = personality_manager.get_personality(user_id)
+    if not response_cache or not personality_manager.is_cacheable(personality):
+        return None
+    fingerprint = cache_fingerprint(user_id, pending)
+    if fingerprint is None:
+        return None
+    return response_cache.make_key(model, personality, prompt, fingerprint)
+
+
+async def reply_from_cache(
+    user_id: int,
+    prompt: str,
+    response: str,
+    start_time: datetime,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None
+) -> str:
+    """Entrega una respuesta reutilizada y la registra como interacción"""
+    # El contexto KV de Ollama no incluye este turno: reconstruirlo en el siguiente
+    reset_ollama_context(user_id)
+    if on_token is not None:
+        await on_token(response)
+    
+    response_time = (datetime.now() - start_time).total_seconds()
+    stats_manager.add_interaction(user_id=user_id, tokens_used=0, response_time=response_time)
+    logger.log_message(user_id, prompt, response, response_time)
+    return response
+
+
+def ollama_options() -> dict:
+    """Opciones de generación (las ajusta el controlador adaptativo si está activo)"""
+    options = {"temperature": 0.7, "top_p": 0.9}
+    if adaptive_controller:
+        options.update(adaptive_controller.options())
+    else:
+        options.update(num_ctx=OLLAMA_NUM_CTX, num_predict=OLLAMA_NUM_PREDICT)
+    if USE_GPU:
+        options["num_gpu"] = 1
+    return options
+
+
+def build_prompt(user_id: int, personality: str, prompt: str) -> str:
+    """Prompt completo (personalidad + contexto de conversación) sin contexto KV"""
+    system_prompt = personality_manager.get_system_prompt(personality)
+    
+    # Construir contexto de conversación (turnos recientes que caben en el presupuesto)
     conversation = get_conversation(user_id)
-    conversation.append({
-        "role": role,
-        "content": content,
-        "timestamp": datetime.now().isoformat()
-    })
+    summary, _ = conversation_store.get_summary(user_id)
+    if summary:
+        # El resumen sustituye a los turnos que ya cubre
+        conversation = conversation_store.unsummarized(user_id)
+    context, _ = context_builder.build(system_prompt, conversation, prompt, summary)
     
-    # Limitar a últimos 20 mensajes
-    if len(conversation) > 20:
-        conversations[user_id] = conversation[-20:]
+    return f"{system_prompt}\n\nContexto de conversación:\n{context}\n\nUsuario: {prompt}\nAsistente:"
+
 
+def reset_ollama_context(user_id: int):
+    """Descarta el contexto KV de Ollama guardado para un usuario"""
+    conversation_store.reset_context(user_id)
 
-async def generate_response(user_id: int, prompt: str) -> str:
-    """Genera una respuesta usando Ollama"""
+
+async def generate_response(
+    user_id: int,
+    prompt: str,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+    channel_id: Optional[int] = None,
+    raise_errors: bool = False,
+    shareable: bool = True
+) -> str:
+    """
+    Genera una respuesta usando Ollama
+    
+    Args:
+        user_id: ID del usuario
+        prompt: Mensaje del usuario
+        on_token: Callback opcional; si se indica, la respuesta se pide en
+            streaming y se invoca con cada token recibido
+        channel_id: ID del canal (para las reglas de modelo por canal)
+        raise_errors: Propagar los errores en vez de devolver un mensaje de error
+        shareable: Otros usuarios pueden unirse a esta generación (False si se
+            puede cancelar, p. ej. la respuesta completa de un borrador)
+        
+    Returns:
+        Respuesta completa del modelo (o mensaje de error)
+    """
     try:
         start_time = datetime.now()
-        
-        # Obtener personalidad y contexto
         personality = personality_manager.get_personality(user_id)
-        system_prompt = personality_manager.get_system_prompt(personality)
-        
-        # Construir contexto de conversación
-        conversation = get_conversation(user_id)
-        context = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in conversation[-10:]
-        ])
-        
-        # Construir prompt completo
-        full_prompt = f"{system_prompt}\n\nContexto de conversación:\n{context}\n\nUsuario: {prompt}\nAsistente:"
-        
-        # Llamar a Ollama
-        data = {
-            "model": OLLAMA_MODEL,
-            "prompt": full_prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 500
-            }
-        }
+        model, model_reason = model_router.route(user_id, prompt, personality, channel_id)
         
-        if USE_GPU:
-            data["options"]["num_gpu"] = 1
+        # Preguntas repetidas: responder desde la caché sin llamar a Ollama
+        cacheable = personality_manager.is_cacheable(personality)
+        cache_key = response_cache_key(user_id, model, prompt)
         
-        response = requests.post(OLLAMA_URL, json=data, timeout=60)
-        response.raise_for_status()
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return await reply_from_cache(user_id, prompt, cached, start_time, on_token)
         
-        result = response.json()
-        ai_response = result.get("response", "").strip()
+        # Preguntas parecidas: buscar por similitud de embeddings (solo al empezar
+        # una conversación; la clave semántica no incluye el historial)
+        semantic_vector = None
+        if semantic_cache and cacheable and cache_key not in flights and cache_fingerprint(user_id) == "":
+            try:
+                cached, semantic_vector = await semantic_cache.lookup(model, personality, prompt)
+            except Exception as e:
+                logger.log_debug(f"Caché semántica no disponible: {e}")
+                cached = None
+            if cached is not None:
+                if cache_key:
+                    response_cache.put(cache_key, cached)
+                return await reply_from_cache(user_id, prompt, cached, start_time, on_token)
+        
+        async def generate(emit: Optional[Callable[[str], Awaitable[None]]]) -> tuple:
+            """Llama a Ollama con la conversación de este usuario"""
+            # Elegir modelo y servidor antes de leer el contexto KV (se descarta si cambian)
+            model_router.mark_used(user_id, model, model_reason)
+            backend = ollama_pool.route(user_id)
+            kv_context = conversation_store.get_context(user_id)
+            
+            if kv_context:
+                # Ollama ya tiene evaluado el historial: enviar solo el turno nuevo
+                full_prompt = f"\n\nUsuario: {prompt}\nAsistente:"
+            else:
+                # Prompt de la personalidad con el contexto de conversación
+                full_prompt = build_prompt(user_id, personality, prompt)
+            
+            # Llamar a Ollama
+            data = {
+                "model": model,
+                "prompt": full_prompt,
+                "stream": False,
+                "keep_alive": MODEL_KEEP_ALIVE,
+                "options": ollama_options()
+            }
+            
+            if kv_context:
+                data["context"] = kv_context
+            
+            if on_token is None:
+                result = await ollama_pool.generate(data, backend=backend)
+                ai_response = result.get("response", "").strip()
+                if emit is not None:
+                    await emit(ai_response)
+            else:
+                parts = []
+                result = {}
+                first_token_time = None
+                
+                async for chunk in ollama_pool.generate_stream(data, backend=backend):
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token_time is None:
+                            first_token_time = (datetime.now() - start_time).total_seconds()
+                            logger.log_debug(f"User {user_id} - Primer token en {first_token_time:.2f}s")
+                        parts.append(token)
+                        await emit(token)
+                    if chunk.get("done"):
+                        result = chunk
+                
+                ai_response = "".join(parts).strip()
+            
+            # Guardar el contexto KV para el siguiente turno (o reconstruirlo si crece demasiado)
+            new_context = result.get("context")
+            if new_context and len(new_context) <= min(KV_CONTEXT_MAX_TOKENS, context_builder.budget):
+                conversation_store.set_context(user_id, new_context)
+            else:
+                reset_ollama_context(user_id)
+            
+            return ai_response, result
+        
+        if cache_key and (shareable or cache_key in flights):
+            # Preguntas idénticas simultáneas: una sola generación para todas. Sin
+            # ningún await desde la comprobación de answer_message, quien se une
+            # sigue encontrando la generación en curso
+            (ai_response, result), leader = await flights.run(cache_key, generate, on_token)
+            stats_manager.add_coalesced_request(leader, result.get("eval_count", 0))
+            if not leader:
+                # Los tokens (si hay streaming) ya se entregaron; solo falta registrarla
+                return await reply_from_cache(user_id, prompt, ai_response, start_time)
+        else:
+            ai_response, result = await generate(on_token)
+        
+        if cache_key and ai_response:
+            response_cache.put(cache_key, ai_response)
+        if semantic_vector is not None and ai_response:
+            semantic_cache.store(model, personality, prompt, semantic_vector, ai_response)
         
         # Calcular tiempo de respuesta
         end_time = datetime.now()
@@ -128,22 +502,203 @@ async def generate_response(user_id: int, prompt: str) -> str:
             tokens_used=result.get("eval_count", 0),
             response_time=response_time
         )
+        if adaptive_controller:
+            adaptive_controller.observe(response_time)
         
         logger.log_message(user_id, prompt, ai_response, response_time)
         
         return ai_response
         
-    except requests.exceptions.Timeout:
+    except asyncio.TimeoutError:
+        reset_ollama_context(user_id)
         logger.log_error(user_id, "Timeout en Ollama")
+        if adaptive_controller:
+            # Sin esta muestra la p95 solo vería las respuestas que sí llegaron a tiempo
+            elapsed = (datetime.now() - start_time).total_seconds()
+            adaptive_controller.observe(max(elapsed, OLLAMA_TIMEOUT))
+        if raise_errors:
+            raise
         return "⏱️ Lo siento, la respuesta está tardando mucho. Por favor intenta de nuevo."
-    except requests.exceptions.ConnectionError:
+    except aiohttp.ClientConnectionError:
+        reset_ollama_context(user_id)
         logger.log_error(user_id, "Error de conexión con Ollama")
+        if raise_errors:
+            raise
         return "❌ No puedo conectar con Ollama. Asegúrate de que esté corriendo."
     except Exception as e:
+        reset_ollama_context(user_id)
         logger.log_error(user_id, f"Error generando respuesta: {str(e)}")
+        if raise_errors:
+            raise
         return f"❌ Error al generar respuesta: {str(e)}"
 
 
+async def answer_speculatively(message: discord.Message, content: str, personality: str):
+    """
+    Responde con un borrador del modelo rápido y lo edita con la respuesta completa
+    
+    Args:
+        message: Mensaje de Discord que mencionó al bot
+        content: Contenido del mensaje sin la mención
+        personality: Personalidad activa del usuario
+        
+    Raises:
+        QueueFullError: Si la cola está llena y no hubo borrador que mostrar
+    """
+    user_id = message.author.id
+    # El borrador se construye antes de añadir el turno del usuario al historial
+    draft_prompt = build_prompt(user_id, personality, content)
+    sent = None
+    user_added = False
+    
+    async def draft() -> str:
+        async def work() -> dict:
+            model_router.touch(SPECULATIVE_DRAFT_MODEL)
+            return await ollama_pool.generate({
+                "model": SPECULATIVE_DRAFT_MODEL,
+                "prompt": draft_prompt,
+                "keep_alive": MODEL_KEEP_ALIVE,
+                "options": dict(ollama_options(), num_predict=SPECULATIVE_DRAFT_TOKENS)
+            })
+        
+        # El borrador también cuenta en MAX_CONCURRENT_GENERATIONS (con su propio turno)
+        result = await scheduler.run(("draft", user_id), work)
+        return result.get("response", "")
+    
+    async def final() -> str:
+        async def work() -> str:
+            nonlocal user_added
+            add_to_conversation(user_id, "user", content)
+            user_added = True
+            # Si falla, mejor conservar el borrador que mostrar un error. Se cancela
+            # si el usuario vuelve a escribir: nadie más puede depender de ella
+            return await generate_response(
+                user_id,
+                content,
+                channel_id=message.channel.id,
+                raise_errors=True,
+                shareable=False
+            )
+        
+        return await scheduler.run(user_id, work)
+    
+    async def show_draft(text: str):
+        nonlocal sent
+        sent = await message.channel.send(f"{text[:1900]}\n\n✏️ *Borrador rápido, preparando la respuesta completa...*")
+    
+    try:
+        response, outcome = await speculator.run(user_id, message.channel.id, draft, final, show_draft)
+    except QueueFullError:
+        raise
+    except Exception as e:
+        # Falló la respuesta completa y no había borrador (ya registrado en el log)
+        response, outcome = f"❌ Error al generar respuesta: {str(e)}", "error"
+    
+    # Registrar el turno antes de editar (el siguiente mensaje del usuario ya puede estar en marcha)
+    if not user_added:
+        add_to_conversation(user_id, "user", content)
+    if response:
+        add_to_conversation(user_id, "assistant", response)
+    if outcome in ("cancelled", "final_failed"):
+        # El contexto KV de Ollama no incluye el borrador
+        reset_ollama_context(user_id)
+    
+    if not response:
+        return
+    
+    chunks = split_message(response)
+    if sent is None:
+        for chunk in chunks:
+            await message.channel.send(chunk)
+    else:
+        await sent.edit(content=chunks[0])
+        for chunk in chunks[1:]:
+            await message.channel.send(chunk)
+
+
+async def answer_message(message: discord.Message, content: str):
+    """
+    Genera y envía la respuesta a un mensaje pasando por la cola de generaciones
+    
+    Args:
+        message: Mensaje de Discord que mencionó al bot
+        content: Contenido del mensaje sin la mención
+        
+    Raises:
+        QueueFullError: Si la cola de generaciones está llena
+    """
+    user_id = message.author.id
+    personality = personality_manager.get_personality(user_id)
+    
+    # Si otro usuario con la misma conversación ya está generando la misma pregunta,
+    # unirse a esa generación sin ocupar turno en la cola (salvo que este usuario
+    # tenga peticiones pendientes)
+    model, _ = model_router.route(user_id, content, personality, message.channel.id)
+    cache_key = response_cache_key(user_id, model, content, pending=True)
+    join_flight = cache_key is not None and cache_key in flights and not scheduler.has_work(user_id)
+    
+    # Canales concurridos: borrador rápido y después la respuesta completa
+    if (
+        speculator
+        and not join_flight
+        and model != SPECULATIVE_DRAFT_MODEL
+        and personality_manager.is_speculative(personality)
+        and speculator.is_busy(message.channel.id)
+        and not (cache_key and cache_key in response_cache)
+    ):
+        await answer_speculatively(message, content, personality)
+        return
+    
+    if STREAM_RESPONSES:
+        # Publicar un mensaje provisional y editarlo con los tokens
+        reply = StreamingMessage(
+            message.channel,
+            edit_interval=STREAM_EDIT_INTERVAL,
+            edit_every_tokens=STREAM_EDIT_TOKENS
+        )
+        
+        async def on_queued(position: int):
+            await reply.start(f"⏳ En cola, posición {position}...")
+        
+        async def work(join: bool = False) -> Optional[str]:
+            await reply.start()
+            if join and cache_key not in flights:
+                # La generación compartida terminó mientras tanto: pasar por la cola
+                return None
+            add_to_conversation(user_id, "user", content)
+            return await generate_response(user_id, content, on_token=reply.feed, channel_id=message.channel.id)
+        
+        response = await work(join=True) if join_flight else None
+        if response is None:
+            response = await scheduler.run(user_id, work, on_queued=on_queued)
+        add_to_conversation(user_id, "assistant", response)
+        
+        await reply.finish(response)
+    else:
+        async def on_queued(position: int):
+            await message.channel.send(f"⏳ En cola, posición {position}...")
+        
+        async def work(join: bool = False) -> Optional[str]:
+            async with message.channel.typing():
+                if join and cache_key not in flights:
+                    # La generación compartida terminó mientras tanto: pasar por la cola
+                    return None
+                add_to_conversation(user_id, "user", content)
+                return await generate_response(user_id, content, channel_id=message.channel.id)
+        
+        # Generar respuesta
+        response = await work(join=True) if join_flight else None
+        if response is None:
+            response = await scheduler.run(user_id, work, on_queued=on_queued)
+        
+        # Añadir respuesta a conversación
+        add_to_conversation(user_id, "assistant", response)
+        
+        # Enviar respuesta (dividir si es muy larga)
+        for chunk in split_message(response):
+            await message.channel.send(chunk)
+
+
 @bot.event
 async def on_ready():
     """Evento cuando el bot está listo"""
@@ -152,6 +707,12 @@ async def on_ready():
     print(f"📊 Servidores: {len(bot.guilds)}")
     print(f"👥 Usuarios autorizados: {len(AUTHORIZED_IDS) if AUTHORIZED_IDS else 'Todos'}")
     
+    # Abrir sesiones HTTP persistentes con los servidores Ollama
+    await ollama_pool.start()
+    
+    # Mantener cargados los modelos en uso
+    await model_router.start()
+    
     # Sincronizar comandos slash
     try:
         synced = await bot.tree.sync()
@@ -174,36 +735,31 @@ async def on_message(message):
     if response_channel_id and message.channel.id != response_channel_id:
         return
     
+    if speculator:
+        # Actividad del canal y, si el usuario vuelve a escribir, quedarse con su borrador
+        speculator.observe(message.channel.id)
+        speculator.cancel(message.author.id, message.channel.id)
+    
     # Verificar autorización
     if not is_authorized(message.author.id):
         return
     
     # Si el mensaje menciona al bot o es DM
     if bot.user.mentioned_in(message) or isinstance(message.channel, discord.DMChannel):
-        async with message.channel.typing():
-            # Obtener contenido sin menciones
-            content = message.content.replace(f"<@{bot.user.id}>", "").strip()
-            
-            if not content:
-                await message.channel.send("👋 ¡Hola! ¿En qué puedo ayudarte?")
-                return
-            
-            # Añadir a conversación
-            add_to_conversation(message.author.id, "user", content)
-            
-            # Generar respuesta
-            response = await generate_response(message.author.id, content)
-            
-            # Añadir respuesta a conversación
-            add_to_conversation(message.author.id, "assistant", response)
-            
-            # Enviar respuesta (dividir si es muy larga)
-            if len(response) > 2000:
-                chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
-                for chunk in chunks:
-                    await message.channel.send(chunk)
-            else:
-                await message.channel.send(response)
+        # Obtener contenido sin menciones
+        content = message.content.replace(f"<@{bot.user.id}>", "").strip()
+        
+        if not content:
+            await message.channel.send("👋 ¡Hola! ¿En qué puedo ayudarte?")
+            return
+        
+        try:
+            await answer_message(message, content)
+        except QueueFullError as e:
+            await message.channel.send(
+                f"🚦 La cola está llena: hay {e.depth} peticiones por delante. "
+                f"Inténtalo de nuevo en unos segundos."
+            )
     
     await bot.process_commands(message)
 
@@ -216,7 +772,8 @@ async def newchat(interaction: discord.Interaction):
         return
     
     user_id = interaction.user.id
-    conversations[user_id] = []
+    set_conversation(user_id, [])
+    reset_ollama_context(user_id)
     
     logger.log_command(user_id, "newchat")
     await interaction.response.send_message("🔄 Conversación reiniciada. ¡Empecemos de nuevo!", ephemeral=True)
@@ -238,6 +795,7 @@ async def personality(interaction: discord.Interaction, style: app_commands.Choi
     
     user_id = interaction.user.id
     personality_manager.set_personality(user_id, style.value)
+    reset_ollama_context(user_id)
     
     descriptions = {
         "profesional": "🎓 formal y preciso",
@@ -254,6 +812,32 @@ async def personality(interaction: discord.Interaction, style: app_commands.Choi
     )
 
 
+@bot.tree.command(name="model", description="Elige el modelo de IA que te responde")
+@app_commands.describe(modelo="Modelo de Ollama (automático = según la pregunta)")
+@app_commands.choices(modelo=[
+    app_commands.Choice(name="🔀 Automático", value="auto")
+] + [
+    app_commands.Choice(name=f"🧠 {model}", value=model)
+    for model in model_router.allowed_models[:24]
+])
+async def model(interaction: discord.Interaction, modelo: app_commands.Choice[str]):
+    """Comando para fijar el modelo del usuario"""
+    if not is_authorized(interaction.user.id):
+        await interaction.response.send_message("❌ No estás autorizado para usar este comando.", ephemeral=True)
+        return
+    
+    user_id = interaction.user.id
+    model_router.set_user_model(user_id, None if modelo.value == "auto" else modelo.value)
+    reset_ollama_context(user_id)
+    
+    logger.log_command(user_id, f"model:{modelo.value}")
+    if modelo.value == "auto":
+        text = "✅ Modelo automático: elegiré el más adecuado para cada pregunta"
+    else:
+        text = f"✅ Modelo cambiado a: **{modelo.value}**"
+    await interaction.response.send_message(text, ephemeral=True)
+
+
 @bot.tree.command(name="export", description="Exporta tu historial de chat")
 @app_commands.describe(format="Formato de exportación")
 @app_commands.choices(format=[
@@ -278,9 +862,9 @@ async def export(interaction: discord.Interaction, format: app_commands.Choice[s
     try:
         # Exportar según formato
         if format.value == "dob":
-            filepath = chat_exporter.export_dob(user_id, conversation)
+            filepath = chat_exporter.export_dob(user_id, conversation.to_dicts())
         else:
-            filepath = chat_exporter.export_txt(user_id, conversation)
+            filepath = chat_exporter.export_txt(user_id, conversation.to_dicts())
         
         # Enviar archivo
         with open(filepath, 'rb') as f:
@@ -318,7 +902,8 @@ async def import_chat(interaction: discord.Interaction, archivo: discord.Attachm
         imported_data = chat_exporter.import_chat(temp_path)
         
         if imported_data:
-            conversations[user_id] = imported_data
+            set_conversation(user_id, imported_data)
+            reset_ollama_context(user_id)
             await interaction.followup.send(
                 f"✅ Historial importado correctamente\n"
                 f"📊 {len(imported_data)} mensajes cargados",
@@ -414,6 +999,7 @@ async def help_command(interaction: discord.Interaction):
         value=(
             "`/newchat` - Reinicia la conversación\n"
             "`/personality` - Cambia el estilo del bot\n"
+            "`/model` - Elige el modelo de IA\n"
             "`Menciona al bot` - Habla con la IA"
         ),
         inline=False
@@ -440,6 +1026,23 @@ async def help_command(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+async def run_bot():
+    """Ejecuta el bot y libera los recursos asíncronos al cerrarse"""
+    async with bot:
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            if summarizer:
+                await summarizer.close()
+            await model_router.close()
+            await ollama_pool.close()
+            conversation_store.close()
+            if semantic_cache:
+                semantic_cache.save()
+            stats_manager.close()
+            logger.log_shutdown()
+
+
 def main():
     """Función principal para iniciar el bot"""
     if not DISCORD_TOKEN:
@@ -447,7 +1050,10 @@ def main():
         return
     
     try:
-        bot.run(DISCORD_TOKEN)
+        discord.utils.setup_logging()
+        asyncio.run(run_bot())
+    except KeyboardInterrupt:
+        print("\n⏹️  Bot detenido")
     except discord.LoginFailure:
         logger.log_error("SYSTEM", "Token de Discord inválido")
         print("❌ ERROR: Token de Discord inválido")
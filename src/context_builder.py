@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Constructor de Contexto
+Selecciona los turnos más recientes que caben en el presupuesto de tokens
+"""
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from conversation import MessageRecord
+
+
+# Estimador de tokens: recibe un texto y devuelve cuántos tokens ocupa
+Tokenizer = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación rápida de tokens (~4 caracteres por token)
+
+    Args:
+        text: Texto a medir
+
+    Returns:
+        Tokens aproximados
+    """
+    return (len(text) + 3) // 4
+
+
+class ContextBuilder:
+    """Empaqueta los turnos más recientes bajo un presupuesto de tokens"""
+
+    # Marcador añadido a un mensaje recortado
+    TRUNCATION_MARK = "[...] "
+    # Prefijo del resumen de los turnos antiguos
+    SUMMARY_PREFIX = "Resumen de la conversación anterior: "
+
+    def __init__(
+        self,
+        num_ctx: int = 2048,
+        num_predict: int = 500,
+        tokenizer: Tokenizer = estimate_tokens,
+        min_truncated_tokens: int = 64,
+        stats_manager=None
+    ):
+        """
+        Inicializa el constructor
+
+        Args:
+            num_ctx: Ventana de contexto del modelo en tokens
+            num_predict: Tokens reservados para la respuesta
+            tokenizer: Función que estima los tokens de un texto
+            min_truncated_tokens: Hueco mínimo para incluir un mensaje recortado
+            stats_manager: StatsManager opcional donde registrar los recortes
+        """
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+        self.tokenizer = tokenizer
+        self.min_truncated_tokens = min_truncated_tokens
+        self.stats_manager = stats_manager
+        self._text_tokens: Dict[str, int] = {}
+
+    @property
+    def budget(self) -> int:
+        """Tokens disponibles para el prompt (ventana menos la respuesta)"""
+        return max(0, self.num_ctx - self.num_predict)
+
+    def _cached_tokens(self, text: str) -> int:
+        """
+        Tokens de un texto repetido (prompts de sistema), calculados una vez
+
+        Args:
+            text: Texto a medir
+
+        Returns:
+            Tokens estimados
+        """
+        tokens = self._text_tokens.get(text)
+        if tokens is None:
+            if len(self._text_tokens) > 256:
+                self._text_tokens.clear()
+            tokens = self._text_tokens[text] = self.tokenizer(text)
+        return tokens
+
+    @staticmethod
+    def format_message(record: MessageRecord) -> str:
+        """Línea de un mensaje dentro del prompt"""
+        return f"{record.role.label}: {record.content}"
+
+    def message_tokens(self, record: MessageRecord) -> int:
+        """
+        Tokens de un mensaje (se guardan en el propio mensaje)
+
+        Args:
+            record: Mensaje del historial
+
+        Returns:
+            Tokens estimados de su línea en el prompt
+        """
+        if record.tokens is None:
+            record.tokens = self.tokenizer(self.format_message(record))
+        return record.tokens
+
+    def _truncate(self, record: MessageRecord, tokens: int) -> str:
+        """
+        Recorta un mensaje conservando su final para que ocupe `tokens`
+
+        Args:
+            record: Mensaje demasiado largo
+            tokens: Tokens disponibles
+
+        Returns:
+            Línea recortada
+        """
+        prefix = f"{record.role.label}: {self.TRUNCATION_MARK}"
+        available = tokens - self.tokenizer(prefix)
+        # Aproximar por proporción y ajustar hasta que quepa
+        chars = max(0, len(record.content) * available // max(1, self.message_tokens(record)))
+        line = prefix + record.content[len(record.content) - chars:]
+        while chars > 0 and self.tokenizer(line) > tokens:
+            chars = chars * 9 // 10
+            line = prefix + record.content[len(record.content) - chars:]
+        return line
+
+    def build(
+        self,
+        system_prompt: str,
+        history: Iterable[MessageRecord],
+        prompt: str,
+        summary: str = ""
+    ) -> Tuple[str, Dict]:
+        """
+        Construye el bloque de contexto con los turnos más recientes que caben
+
+        Args:
+            system_prompt: Prompt de sistema de la personalidad
+            history: Mensajes en orden cronológico
+            prompt: Mensaje actual del usuario
+            summary: Resumen de los turnos anteriores a `history` (se antepone)
+
+        Returns:
+            Tupla (contexto, decisión) donde la decisión incluye los mensajes
+            incluidos, descartados y recortados y los tokens usados
+        """
+        records = list(history)
+        summary_line = f"{self.SUMMARY_PREFIX}{summary}" if summary else ""
+        fixed = self._cached_tokens(system_prompt) + self.tokenizer(prompt)
+        if summary_line:
+            fixed += self.tokenizer(summary_line)
+        remaining = self.budget - fixed
+
+        lines: List[str] = []
+        truncated = 0
+        # Del más reciente al más antiguo; se detiene en el primero que no cabe
+        for record in reversed(records):
+            tokens = self.message_tokens(record)
+            if tokens <= remaining:
+                lines.append(self.format_message(record))
+                remaining -= tokens
+                continue
+            if remaining >= self.min_truncated_tokens:
+                line = self._truncate(record, remaining)
+                lines.append(line)
+                remaining -= self.tokenizer(line)
+                truncated = 1
+            break
+
+        lines.reverse()
+        included = len(lines)
+        if summary_line:
+            lines.insert(0, summary_line)
+
+        decision = {
+            "included": included,
+            "dropped": len(records) - included,
+            "truncated": truncated,
+            "tokens": self.budget - remaining
+        }
+
+        if self.stats_manager:
+            self.stats_manager.add_context_build(**decision)
+
+        return "\n".join(lines), decision
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    from conversation import MessageHistory, Role
+
+    history = MessageHistory(20)
+    for n in range(18):
+        history.append(MessageRecord(Role.USER if n % 2 == 0 else Role.ASSISTANT, f"Mensaje corto número {n}"))
+    history.append(MessageRecord(Role.USER, "ERROR " * 3000))
+    history.append(MessageRecord(Role.ASSISTANT, "Parece un error de conexión."))
+
+    builder = ContextBuilder(num_ctx=2048, num_predict=500)
+    context, decision = builder.build("Eres un asistente útil.", history, "¿Qué significa?")
+
+    print(f"🧮 Presupuesto: {builder.budget} tokens")
+    print(f"   Decisión: {decision}")
+    print(f"   Contexto: {len(context)} caracteres, {estimate_tokens(context)} tokens estimados")
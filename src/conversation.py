@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Almacén de Conversaciones
+Conversaciones en memoria acotadas por LRU y caducidad por inactividad
+"""
+
+import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from enum import IntEnum
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage import StorageBackend, atomic_write
+
+
+class Role(IntEnum):
+    """Autor de un mensaje"""
+
+    SYSTEM = 0
+    USER = 1
+    ASSISTANT = 2
+
+    @property
+    def label(self) -> str:
+        """Nombre usado en prompts y exportaciones ("user", "assistant"...)"""
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, value: str) -> "Role":
+        """
+        Convierte el nombre de un rol en su valor
+
+        Args:
+            value: "system", "user" o "assistant"
+
+        Returns:
+            Rol correspondiente
+
+        Raises:
+            ValueError: Si el rol no existe
+        """
+        try:
+            return cls[value.upper()]
+        except KeyError:
+            raise ValueError(f"Rol no válido: {value}") from None
+
+
+class MessageRecord:
+    """Mensaje compacto de una conversación"""
+
+    __slots__ = ("role", "content", "timestamp", "tokens")
+
+    def __init__(self, role: Role, content: str, timestamp: Optional[float] = None):
+        """
+        Args:
+            role: Autor del mensaje
+            content: Texto del mensaje
+            timestamp: Época en segundos (por defecto, ahora)
+        """
+        self.role = role
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # Tokens estimados, calculados la primera vez que se construye un contexto
+        self.tokens: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MessageRecord":
+        """
+        Crea un mensaje desde el formato de diccionario (almacenamiento, /import)
+
+        Args:
+            data: Diccionario con role, content y timestamp ISO opcional
+
+        Returns:
+            Mensaje compacto
+        """
+        timestamp = data.get("timestamp")
+        return cls(
+            Role.parse(data["role"]),
+            data["content"],
+            datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+        )
+
+    def to_dict(self) -> Dict:
+        """
+        Convierte el mensaje al formato de diccionario (almacenamiento, /export)
+
+        Returns:
+            Diccionario con role, content y timestamp ISO
+        """
+        return {
+            "role": self.role.label,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+    def __repr__(self) -> str:
+        return f"MessageRecord({self.role.label!r}, {self.content[:30]!r})"
+
+
+class HistoryView:
+    """Vista de solo lectura sobre un tramo del historial (sin copiar)"""
+
+    __slots__ = ("_history", "_offset", "_length")
+
+    def __init__(self, history: "MessageHistory", offset: int, length: int):
+        self._history = history
+        self._offset = offset
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        items = self._history._items
+        capacity = len(items)
+        start = self._history._head + self._offset
+        for i in range(self._length):
+            yield items[(start + i) % capacity]
+
+
+class MessageHistory:
+    """Buffer circular de capacidad fija con los últimos mensajes de un usuario"""
+
+    __slots__ = ("_items", "_head", "_size")
+
+    def __init__(self, capacity: int = 20, records: Iterable[MessageRecord] = ()):
+        """
+        Args:
+            capacity: Mensajes máximos conservados
+            records: Mensajes iniciales (se conservan los últimos `capacity`)
+        """
+        self._items: List[Optional[MessageRecord]] = [None] * max(1, capacity)
+        self._head = 0
+        self._size = 0
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_dicts(cls, messages: Iterable[Dict], capacity: int = 20) -> "MessageHistory":
+        """
+        Crea un historial desde mensajes en formato diccionario
+
+        Args:
+            messages: Mensajes con role, content y timestamp
+            capacity: Mensajes máximos conservados
+
+        Returns:
+            Historial compacto
+        """
+        return cls(capacity, (MessageRecord.from_dict(m) for m in messages))
+
+    @property
+    def capacity(self) -> int:
+        """Mensajes máximos conservados"""
+        return len(self._items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self.last(self._size))
+
+    def append(self, record: MessageRecord) -> Optional[MessageRecord]:
+        """
+        Añade un mensaje en O(1), sobrescribiendo el más antiguo si está lleno
+
+        Args:
+            record: Mensaje a añadir
+
+        Returns:
+            Mensaje descartado o None
+        """
+        capacity = len(self._items)
+        index = (self._head + self._size) % capacity
+        dropped = self._items[index]
+        self._items[index] = record
+        if self._size < capacity:
+            self._size += 1
+            return None
+        self._head = (self._head + 1) % capacity
+        return dropped
+
+    def last(self, count: int) -> HistoryView:
+        """
+        Obtiene una vista de los últimos mensajes sin copiarlos
+
+        Args:
+            count: Número de mensajes
+
+        Returns:
+            Vista iterable en orden cronológico
+        """
+        count = max(0, min(count, self._size))
+        return HistoryView(self, self._size - count, count)
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Convierte el historial al formato de diccionarios (/export)
+
+        Returns:
+            Lista de mensajes con role, content y timestamp ISO
+        """
+        return [record.to_dict() for record in self]
+
+
+class _Session:
+    """Estado residente de un usuario"""
+
+    __slots__ = ("messages", "context", "summary", "summary_until", "last_access", "size")
+
+    def __init__(
+        self,
+        messages: MessageHistory,
+        context: Optional[List[int]] = None,
+        summary: str = "",
+        summary_until: float = 0.0
+    ):
+        self.messages = messages
+        self.context = context
+        self.summary = summary
+        self.summary_until = summary_until
+        self.last_access = time.monotonic()
+        self.size = 0
+
+
+class ConversationStore:
+    """Mantiene en memoria solo las conversaciones de los usuarios activos"""
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        max_users: int = 1000,
+        idle_ttl: float = 3600,
+        keep: int = 20,
+        spill_dir: Optional[str] = None,
+        stats_manager=None,
+        report_interval: float = 10.0
+    ):
+        """
+        Inicializa el almacén
+
+        Args:
+            storage: Backend donde se persiste el historial
+            max_users: Usuarios residentes máximos (se expulsa el menos reciente)
+            idle_ttl: Segundos de inactividad tras los que se expulsa una sesión (0 = nunca)
+            keep: Mensajes conservados por usuario
+            spill_dir: Directorio donde volcar el contexto KV de las sesiones expulsadas
+                       (None = descartarlo)
+            stats_manager: StatsManager opcional donde publicar las métricas
+            report_interval: Segundos mínimos entre publicaciones de métricas
+        """
+        self.storage = storage
+        self.max_users = max(1, max_users)
+        self.idle_ttl = idle_ttl
+        self.keep = keep
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.stats_manager = stats_manager
+        self.report_interval = report_interval
+
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+        # Orden de acceso: el primero es el menos reciente
+        self._sessions: "OrderedDict[int, _Session]" = OrderedDict()
+        self._resident_bytes = 0
+        self._last_report = 0.0
+        self._counters = {
+            "hits": 0,
+            "loads": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+            "spilled": 0,
+            "reloaded": 0
+        }
+
+    # --- Tamaño aproximado en memoria ---
+
+    @staticmethod
+    def _message_size(record: Optional[MessageRecord]) -> int:
+        """Bytes aproximados que ocupa un mensaje"""
+        if record is None:
+            return 0
+        return sys.getsizeof(record) + sys.getsizeof(record.content) + sys.getsizeof(record.timestamp)
+
+    @staticmethod
+    def _context_size(context: Optional[List[int]]) -> int:
+        """Bytes aproximados que ocupa un contexto KV (lista de enteros)"""
+        if not context:
+            return 0
+        return sys.getsizeof(context) + len(context) * 28
+
+    def _resize(self, session: _Session, delta: Optional[int] = None):
+        """
+        Actualiza el tamaño de una sesión y el total residente
+
+        Args:
+            session: Sesión modificada
+            delta: Variación conocida en bytes (None = recalcular todo)
+        """
+        if delta is None:
+            size = sys.getsizeof(session.messages._items)
+            size += sum(self._message_size(m) for m in session.messages)
+            size += self._context_size(session.context)
+            size += sys.getsizeof(session.summary)
+            delta = size - session.size
+        self._resident_bytes += delta
+        session.size += delta
+
+    # --- Volcado a disco ---
+
+    def _spill_file(self, user_id: int) -> Path:
+        """Ruta del volcado de la sesión de un usuario"""
+        return self.spill_dir / f"{user_id}.json"
+
+    def _spill(self, user_id: int, session: _Session):
+        """
+        Vuelca a disco el estado que no está en el almacenamiento
+
+        Args:
+            user_id: ID del usuario
+            session: Sesión expulsada
+        """
+        if not self.spill_dir or not session.context:
+            return
+        try:
+            atomic_write(self._spill_file(user_id), json.dumps({"context": session.context}))
+            self._counters["spilled"] += 1
+        except Exception as e:
+            print(f"Error volcando la sesión de {user_id}: {e}")
+
+    def _unspill(self, user_id: int) -> Optional[List[int]]:
+        """
+        Recupera (y elimina) el volcado de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Contexto KV volcado o None
+        """
+        if not self.spill_dir:
+            return None
+        path = self._spill_file(user_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                context = json.load(f).get("context")
+            self._counters["reloaded"] += 1
+            return context
+        except Exception:
+            return None
+        finally:
+            path.unlink(missing_ok=True)
+
+    # --- Residencia ---
+
+    def _evict(self, user_id: int, reason: str):
+        """
+        Expulsa la sesión de un usuario de memoria
+
+        Args:
+            user_id: ID del usuario
+            reason: "lru" o "idle"
+        """
+        session = self._sessions.pop(user_id)
+        self._resident_bytes -= session.size
+        self._spill(user_id, session)
+        self._counters[f"evicted_{reason}"] += 1
+
+    def evict_idle(self) -> int:
+        """
+        Expulsa las sesiones inactivas más tiempo que `idle_ttl`
+
+        Returns:
+            Número de sesiones expulsadas
+        """
+        if not self.idle_ttl:
+            return 0
+
+        deadline = time.monotonic() - self.idle_ttl
+        evicted = 0
+        # El orden LRU coincide con el de último acceso: basta mirar el principio
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_access > deadline:
+                break
+            self._evict(user_id, "idle")
+            evicted += 1
+        return evicted
+
+    def _session(self, user_id: int) -> _Session:
+        """
+        Obtiene la sesión de un usuario, cargándola si no está en memoria
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Sesión residente
+        """
+        self.evict_idle()
+
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions.move_to_end(user_id)
+            self._counters["hits"] += 1
+        else:
+            summary = self.storage.load_summary(user_id)
+            session = _Session(
+                MessageHistory.from_dicts(self.storage.load_conversation(user_id), self.keep),
+                self._unspill(user_id),
+                summary["summary"],
+                summary["until"]
+            )
+            self._sessions[user_id] = session
+            self._resize(session)
+            self._counters["loads"] += 1
+
+            while len(self._sessions) > self.max_users:
+                self._evict(next(iter(self._sessions)), "lru")
+
+        session.last_access = time.monotonic()
+        self._report()
+        return session
+
+    # --- Conversaciones ---
+
+    def get(self, user_id: int) -> MessageHistory:
+        """
+        Obtiene la conversación de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Historial con los últimos `keep` mensajes
+        """
+        return self._session(user_id).messages
+
+    def append(self, user_id: int, record: MessageRecord):
+        """
+        Añade un mensaje a la conversación (y al almacenamiento)
+
+        Args:
+            user_id: ID del usuario
+            record: Mensaje a añadir
+        """
+        session = self._session(user_id)
+        dropped = session.messages.append(record)
+        self.storage.append_message(user_id, record.to_dict(), keep=self.keep)
+        self._resize(session, self._message_size(record) - self._message_size(dropped))
+
+    def replace(self, user_id: int, messages: List[Dict]):
+        """
+        Sustituye la conversación de un usuario
+
+        Args:
+            user_id: ID del usuario
+            messages: Nuevos mensajes en formato diccionario (vacío para reiniciarla)
+        """
+        session = self._session(user_id)
+        session.messages = MessageHistory.from_dicts(messages, self.keep)
+        self.storage.replace_conversation(user_id, session.messages.to_dicts())
+        # Un historial nuevo invalida el resumen anterior
+        if session.summary:
+            session.summary, session.summary_until = "", 0.0
+            self.storage.save_summary(user_id, "", 0.0)
+        self._resize(session)
+
+    # --- Resumen acumulado ---
+
+    def get_summary(self, user_id: int) -> Tuple[str, float]:
+        """
+        Obtiene el resumen acumulado de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Tupla (resumen, época del último mensaje que cubre)
+        """
+        session = self._session(user_id)
+        return session.summary, session.summary_until
+
+    def set_summary(self, user_id: int, summary: str, until: float):
+        """
+        Guarda el resumen acumulado de un usuario
+
+        Args:
+            user_id: ID del usuario
+            summary: Resumen de los mensajes hasta `until`
+            until: Época del último mensaje cubierto por el resumen
+        """
+        session = self._session(user_id)
+        delta = sys.getsizeof(summary) - sys.getsizeof(session.summary)
+        session.summary, session.summary_until = summary, until
+        self.storage.save_summary(user_id, summary, until)
+        self._resize(session, delta)
+
+    def unsummarized(self, user_id: int) -> List[MessageRecord]:
+        """
+        Obtiene los mensajes posteriores al resumen
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Mensajes aún no resumidos, en orden cronológico
+        """
+        session = self._session(user_id)
+        return [m for m in session.messages if m.timestamp > session.summary_until]
+
+    # --- Contexto KV de Ollama ---
+
+    def get_context(self, user_id: int) -> Optional[List[int]]:
+        """
+        Obtiene el contexto KV de Ollama de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Array "context" de la última respuesta o None
+        """
+        return self._session(user_id).context
+
+    def set_context(self, user_id: int, context: Optional[List[int]]):
+        """
+        Guarda el contexto KV de Ollama de un usuario
+
+        Args:
+            user_id: ID del usuario
+            context: Array "context" devuelto por Ollama (None para descartarlo)
+        """
+        session = self._session(user_id)
+        delta = self._context_size(context) - self._context_size(session.context)
+        session.context = context
+        self._resize(session, delta)
+
+    def reset_context(self, user_id: int):
+        """
+        Descarta el contexto KV de un usuario, esté o no en memoria
+
+        Args:
+            user_id: ID del usuario
+        """
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._resize(session, -self._context_size(session.context))
+            session.context = None
+        elif self.spill_dir:
+            self._spill_file(user_id).unlink(missing_ok=True)
+
+    # --- Métricas y ciclo de vida ---
+
+    def get_metrics(self) -> Dict:
+        """
+        Obtiene métricas de uso de memoria del almacén
+
+        Returns:
+            Diccionario con usuarios residentes, bytes aproximados y contadores
+        """
+        return {
+            "resident_users": len(self._sessions),
+            "resident_messages": sum(len(s.messages) for s in self._sessions.values()),
+            "resident_bytes": self._resident_bytes,
+            "max_users": self.max_users,
+            **self._counters
+        }
+
+    def _report(self, force: bool = False):
+        """Publica las métricas en el StatsManager como mucho cada `report_interval`"""
+        if not self.stats_manager:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.stats_manager.set_conversation_metrics(self.get_metrics())
+
+    def close(self):
+        """Vuelca las sesiones residentes y publica las métricas finales"""
+        for user_id, session in list(self._sessions.items()):
+            self._spill(user_id, session)
+        self._report(force=True)
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import tempfile
+    from storage import JSONStorage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JSONStorage(data_dir=tmp, flush_interval=3600)
+        store = ConversationStore(storage, max_users=100, idle_ttl=3600, spill_dir=f"{tmp}/sessions")
+
+        for user_id in range(1000):
+            store.append(user_id, MessageRecord(Role.USER, f"Hola, soy el usuario {user_id}"))
+            store.set_context(user_id, list(range(500)))
+
+        print("📦 Almacén de conversaciones:")
+        for key, value in store.get_metrics().items():
+            print(f"   {key}: {value}")
+
+        # El usuario 0 fue expulsado: su historial y su contexto se recuperan
+        print(f"\n🔁 Usuario 0: {next(iter(store.get(0))).content} (contexto: {len(store.get_context(0))} tokens)")
+
+        storage.close()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Caché HTTP del Dashboard
+Cuerpos JSON serializados (y comprimidos) una vez por versión de los datos, con ETag
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: se usa gzip
+    brotli = None
+
+
+def content_etag(payload, volatile: Tuple[str, ...] = ("timestamp",)) -> str:
+    """
+    Calcula un ETag fuerte a partir del contenido de una respuesta JSON
+
+    Los campos volátiles (la hora de generación) no cuentan, así que todos
+    los workers dan el mismo ETag para los mismos datos.
+
+    Args:
+        payload: Respuesta JSON ya decodificada
+        volatile: Claves de primer nivel que no forman parte del contenido
+
+    Returns:
+        ETag sin comillas
+    """
+    if isinstance(payload, dict):
+        payload = {key: value for key, value in payload.items() if key not in volatile}
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CachedBody:
+    """Cuerpo serializado de una respuesta y sus versiones comprimidas"""
+
+    __slots__ = ("body", "etag", "mimetype", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, etag: str, mimetype: str):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        """
+        Cuerpo comprimido con "gzip" o "br" (se comprime una sola vez)
+
+        Args:
+            encoding: Codificación aceptada por el cliente
+
+        Returns:
+            Bytes comprimidos
+        """
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    if encoding == "br":
+                        body = brotli.compress(self.body, quality=5)
+                    else:
+                        body = gzip.compress(self.body, compresslevel=6)
+                    self._encoded[encoding] = body
+        return body
+
+
+class BodyCache:
+    """Caché LRU de cuerpos de respuesta válidos mientras no cambie la versión"""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: Rutas (con su query string) recordadas como máximo
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, CachedBody]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[CachedBody]:
+        """
+        Obtiene el cuerpo de una ruta si es de la versión actual
+
+        Args:
+            key: Ruta con su query string
+            version: Versión actual de los datos
+
+        Returns:
+            Cuerpo en caché o None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, body: CachedBody):
+        """
+        Guarda el cuerpo de una ruta para una versión
+
+        Args:
+            key: Ruta con su query string
+            version: Versión de los datos con la que se generó
+            body: Cuerpo serializado
+        """
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def choose_encoding(accept_encodings, size: int, min_size: int) -> Optional[str]:
+    """
+    Elige la compresión de una respuesta
+
+    Args:
+        accept_encodings: Cabecera Accept-Encoding ya parseada (werkzeug Accept)
+        size: Tamaño del cuerpo sin comprimir
+        min_size: Tamaño mínimo para comprimir (0 = no comprimir nunca)
+
+    Returns:
+        "br", "gzip" o None
+    """
+    if min_size <= 0 or size < min_size:
+        return None
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+
+    payload = {
+        "success": True,
+        "data": [{"user_id": i, "total_messages": i * 3, "total_tokens": i * 300} for i in range(100)],
+        "timestamp": "2024-01-01T00:00:00"
+    }
+    cache = BodyCache()
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        body = cache.get("/api/users", version=1)
+        if body is None:
+            data = json.dumps(payload).encode("utf-8")
+            body = CachedBody(data, content_etag(payload), "application/json")
+            cache.put("/api/users", 1, body)
+        body.encoded("gzip")
+    elapsed = time.perf_counter() - start
+
+    later = dict(payload, timestamp="2024-01-01T00:00:30")
+    print(f"🏷️  ETag: {body.etag} (mismo contenido a otra hora: {content_etag(later) == body.etag})")
+    print(f"📦 {len(body.body)} bytes -> gzip {len(body.encoded('gzip'))} bytes")
+    print(f"⚡ 1000 peticiones en {elapsed * 1000:.1f} ms ({cache.hits} aciertos, {cache.misses} fallos)")
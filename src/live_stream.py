@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Métricas en Vivo (Server-Sent Events)
+Difunde a todos los dashboards abiertos solo lo que ha cambiado en cada tick
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+
+# Marca interna: el valor no ha cambiado
+_SAME = object()
+
+
+def diff(old: Any, new: Any) -> Any:
+    """
+    Calcula los cambios entre dos instantáneas
+
+    Los diccionarios se comparan clave a clave (recursivamente); cualquier
+    otro valor (números, listas) se envía entero si ha cambiado.
+
+    Args:
+        old: Instantánea anterior
+        new: Instantánea nueva
+
+    Returns:
+        Solo lo que ha cambiado, o _SAME si no ha cambiado nada
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            change = diff(old[key], value) if key in old else value
+            if change is not _SAME:
+                changes[key] = change
+        return changes if changes else _SAME
+    return _SAME if old == new else new
+
+
+def sse_message(event: str, data: Dict) -> str:
+    """
+    Formatea un evento SSE
+
+    Args:
+        event: Nombre del evento
+        data: Contenido (se envía como JSON en una sola línea)
+
+    Returns:
+        Texto del evento listo para escribir en la respuesta
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class LiveStream:
+    """Difusor SSE: un cálculo por tick, compartido por todos los suscriptores"""
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict],
+        version: Callable[[], int],
+        followers: Optional[Dict[str, Any]] = None,
+        parsers: Optional[Dict[str, Callable[[str], Any]]] = None,
+        tick: float = 1.0,
+        heartbeat: float = 15.0,
+        max_queue: int = 100,
+        max_subscribers: int = 0
+    ):
+        """
+        Inicializa el difusor
+
+        Args:
+            snapshot: Función que devuelve el estado completo (p. ej. el de /api/summary)
+            version: Función que devuelve la versión de los datos (solo se
+                recalcula la instantánea cuando cambia)
+            followers: LogFollower por nombre (p. ej. "errors") cuyas líneas
+                nuevas se añaden a cada delta
+            parsers: Conversión opcional de las líneas de cada seguidor
+            tick: Segundos entre deltas (los cambios de un tick van juntos)
+            heartbeat: Segundos máximos sin enviar nada (mantiene viva la conexión)
+            max_queue: Mensajes pendientes máximos por suscriptor; un cliente
+                más lento se desconecta y, al reconectar, recibe una instantánea
+            max_subscribers: Conexiones simultáneas máximas (0 = sin límite);
+                cada una ocupa un hilo del servidor mientras está abierta
+        """
+        self.snapshot = snapshot
+        self.version = version
+        self.followers = followers or {}
+        self.parsers = parsers or {}
+        self.tick = tick
+        self.heartbeat = heartbeat
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+
+        self._lock = threading.Lock()
+        self._subscribers: Set[queue.Queue] = set()
+        self._version: Optional[int] = None
+        self._snapshot: Optional[Dict] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        """Indica si se ha alcanzado el máximo de suscriptores"""
+        return 0 < self.max_subscribers <= len(self._subscribers)
+
+    def _current(self) -> Dict:
+        """Instantánea de la versión actual (recalculada solo si la versión cambió)"""
+        version = self.version()
+        if self._snapshot is None or version != self._version:
+            self._snapshot = self.snapshot()
+            self._version = version
+        return self._snapshot
+
+    def _subscribe(self) -> queue.Queue:
+        """
+        Registra un suscriptor y arranca el hilo de ticks si hace falta
+
+        Se llama con el cerrojo tomado, junto con el cálculo de la
+        instantánea, para que ningún delta anterior a ella llegue después.
+
+        Returns:
+            Cola de la que leer los mensajes (None = desconectar)
+        """
+        subscriber: queue.Queue = queue.Queue(self.max_queue)
+        self._subscribers.add(subscriber)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="live-stream", daemon=True)
+            self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        """Da de baja un suscriptor"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def events(self, retry_ms: int = 3000) -> Iterator[str]:
+        """
+        Generador de eventos para una conexión SSE
+
+        Empieza con la instantánea completa y sigue con un delta por tick
+        con cambios. Termina si el cliente se queda atrás o al cerrar. Si
+        ya no caben más suscriptores envía solo un evento "busy".
+
+        Args:
+            retry_ms: Milisegundos que espera el navegador antes de reconectar
+
+        Yields:
+            Texto SSE
+        """
+        with self._lock:
+            if self.full or self._stopped.is_set():
+                subscriber = None
+            else:
+                current = self._current()
+                version = self._version
+                subscriber = self._subscribe()
+        if subscriber is None:
+            yield f"retry: {retry_ms}\n" + sse_message("busy", {"subscribers": len(self)})
+            return
+
+        try:
+            yield f"retry: {retry_ms}\n" + sse_message("snapshot", {"version": version, "data": current})
+
+            while not self._stopped.is_set():
+                try:
+                    message = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self) -> Optional[str]:
+        """
+        Calcula el delta de este tick y lo envía a todos los suscriptores
+
+        Returns:
+            Mensaje enviado o None si no había cambios
+        """
+        lines = {}
+        for name, follower in self.followers.items():
+            new_lines = follower.read_new()
+            parse = self.parsers.get(name)
+            if parse is not None:
+                new_lines = [item for item in (parse(line) for line in new_lines) if item is not None]
+            if new_lines:
+                lines[name] = new_lines
+
+        with self._lock:
+            if not self._subscribers:
+                # Nadie escucha: la próxima instantánea se calculará al suscribirse
+                self._snapshot = None
+                return None
+
+            previous = self._snapshot
+            current = self._current()
+            changes = diff(previous, current) if previous is not None else current
+            if changes is _SAME and not lines:
+                return None
+
+            message = sse_message("delta", {
+                "version": self._version,
+                "changes": {} if changes is _SAME else changes,
+                **lines
+            })
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._disconnect(subscriber)
+            return message
+
+    def _disconnect(self, subscriber: queue.Queue):
+        """Vacía la cola de un suscriptor lento y le pide que se desconecte"""
+        self._subscribers.discard(subscriber)
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+        subscriber.put_nowait(None)
+
+    def _loop(self):
+        """Hilo que publica un delta por tick"""
+        while not self._stopped.wait(self.tick):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Error en el stream de métricas: {e}")
+
+    def stop(self):
+        """
+        Desconecta a todos los suscriptores sin tomar el cerrojo
+
+        Se puede llamar desde un manejador de señales (p. ej. SIGTERM) para
+        que las conexiones abiertas no retrasen el apagado ordenado.
+        """
+        self._stopped.set()
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(None)
+            except queue.Full:
+                pass  # Lo verá al sacar el siguiente mensaje (_stopped)
+
+    def close(self):
+        """Detiene el hilo de ticks y desconecta a todos los suscriptores"""
+        self._stopped.set()
+        with self._lock:
+            for subscriber in list(self._subscribers):
+                self._disconnect(subscriber)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    counters = {"global": {"total_messages": 0, "total_tokens": 0}, "hourly": {"14": 0}}
+    version = 0
+
+    def interaction(tokens: int):
+        global version
+        counters["global"]["total_messages"] += 1
+        counters["global"]["total_tokens"] += tokens
+        counters["hourly"]["14"] += 1
+        version += 1
+
+    stream = LiveStream(
+        snapshot=lambda: json.loads(json.dumps(counters)),
+        version=lambda: version,
+        tick=0.2,
+        heartbeat=0.5
+    )
+
+    received: List[List[str]] = [[] for _ in range(3)]
+
+    def client(n: int):
+        for message in stream.events():
+            received[n].append(message)
+
+    for n in range(3):
+        threading.Thread(target=client, args=(n,), daemon=True).start()
+    time.sleep(0.1)
+
+    for tokens in (120, 80, 200):
+        interaction(tokens)
+    time.sleep(0.3)
+    interaction(50)
+    time.sleep(0.9)
+    stream.close()
+
+    for n, messages in enumerate(received):
+        print(f"📡 Cliente {n}: {len(messages)} mensajes")
+    for message in received[1]:
+        lines = [line for line in message.strip().splitlines() if not line.startswith("retry")]
+        print(f"   {' | '.join(lines)[:100]}")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Lectura Inversa de Logs
+Obtiene las últimas líneas de un archivo leyendo bloques desde el final
+"""
+
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Tamaño de bloque por defecto al leer hacia atrás
+BLOCK_SIZE = 64 * 1024
+
+
+def _find_start_blocks(f, end: int, count: int, block_size: int) -> Tuple[int, bytes]:
+    """
+    Busca hacia atrás el inicio de la línea `count` leyendo bloques
+
+    Args:
+        f: Archivo abierto en modo binario
+        end: Offset donde termina la última línea a devolver
+        count: Número de líneas a devolver
+        block_size: Bytes leídos en cada bloque
+
+    Returns:
+        Tupla (offset de inicio, bytes entre el inicio y `end`)
+    """
+    chunks = []
+    chunk_start = end
+    # Un salto de línea en end - 1 cierra la última línea, no cuenta
+    search_end = end - 1
+    found = 0
+
+    while found < count:
+        if chunk_start == 0:
+            return 0, b"".join(reversed(chunks))
+
+        read_size = min(block_size, chunk_start)
+        chunk_start -= read_size
+        f.seek(chunk_start)
+        chunk = f.read(read_size)
+        chunks.append(chunk)
+
+        limit = search_end - chunk_start
+        while found < count and limit > 0:
+            index = chunk.rfind(b"\n", 0, limit)
+            if index < 0:
+                break
+            found += 1
+            limit = index
+        search_end = chunk_start + limit
+
+    start = search_end + 1
+    data = b"".join(reversed(chunks))
+    return start, data[start - chunk_start:]
+
+
+def _find_start_mmap(f, end: int, count: int) -> Tuple[int, bytes]:
+    """
+    Busca hacia atrás el inicio de la línea `count` usando mmap
+
+    Args:
+        f: Archivo abierto en modo binario
+        end: Offset donde termina la última línea a devolver
+        count: Número de líneas a devolver
+
+    Returns:
+        Tupla (offset de inicio, bytes entre el inicio y `end`)
+    """
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        search_end = end - 1
+        for _ in range(count):
+            index = mm.rfind(b"\n", 0, search_end) if search_end > 0 else -1
+            if index < 0:
+                start = 0
+                break
+            start = index + 1
+            search_end = index
+        return start, mm[start:end]
+
+
+def tail_lines(
+    path: Path,
+    count: int,
+    before: Optional[int] = None,
+    block_size: int = BLOCK_SIZE,
+    use_mmap: bool = False
+) -> Tuple[List[str], int]:
+    """
+    Devuelve las últimas `count` líneas de un archivo sin leerlo entero
+
+    Args:
+        path: Archivo a leer
+        count: Número de líneas a devolver
+        before: Cursor de una llamada anterior; devuelve las líneas previas
+        block_size: Bytes leídos en cada bloque
+        use_mmap: Usar mmap en lugar de lecturas por bloques
+
+    Returns:
+        Tupla (líneas en orden original con su salto de línea, cursor).
+        El cursor es el offset de la primera línea devuelta; 0 indica que
+        no quedan líneas anteriores.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size if before is None else max(0, min(before, size))
+
+        if count <= 0 or end == 0:
+            return [], end
+
+        if use_mmap:
+            start, data = _find_start_mmap(f, end, count)
+        else:
+            start, data = _find_start_blocks(f, end, count, block_size)
+
+    return data.decode("utf-8", errors="replace").splitlines(keepends=True), start
+
+
+class LogFollower:
+    """Sigue las líneas nuevas de un conjunto de logs (como tail -F sobre un patrón)"""
+
+    def __init__(self, log_dir: Path, pattern: str, max_bytes: int = 1024 * 1024):
+        """
+        Inicializa el seguidor
+
+        Lo que ya existe al crearlo se ignora: solo se devuelven las líneas
+        escritas después. Los archivos que aparecen más tarde (rotaciones,
+        otro arranque del bot) se leen desde el principio.
+
+        Args:
+            log_dir: Directorio de logs
+            pattern: Patrón glob de los archivos (p. ej. "errors_*.log")
+            max_bytes: Bytes máximos leídos por archivo en cada llamada
+        """
+        self.log_dir = Path(log_dir)
+        self.pattern = pattern
+        self.max_bytes = max_bytes
+        self._offsets: Dict[Path, int] = {
+            path: path.stat().st_size for path in self.log_dir.glob(pattern)
+        }
+
+    def read_new(self) -> List[str]:
+        """
+        Devuelve las líneas completas escritas desde la llamada anterior
+
+        Una línea a medio escribir se deja para la siguiente llamada.
+
+        Returns:
+            Líneas nuevas sin salto de línea, en orden de escritura por archivo
+        """
+        lines = []
+        seen = set()
+        for path in sorted(self.log_dir.glob(self.pattern), key=lambda p: p.stat().st_mtime):
+            seen.add(path)
+            offset = self._offsets.get(path, 0)
+            try:
+                size = path.stat().st_size
+                if size < offset:
+                    # Archivo truncado: empezar de nuevo
+                    offset = 0
+                if size == offset:
+                    self._offsets[path] = offset
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(min(size - offset, self.max_bytes))
+            except OSError:
+                continue
+
+            end = data.rfind(b"\n") + 1
+            if end == 0 and len(data) == self.max_bytes:
+                # Línea más larga que el máximo: se descarta para no atascarse
+                self._offsets[path] = offset + len(data)
+                continue
+            self._offsets[path] = offset + end
+            lines.extend(
+                line for line in data[:end].decode("utf-8", errors="replace").splitlines() if line.strip()
+            )
+
+        # Olvidar archivos borrados
+        for path in [p for p in self._offsets if p not in seen]:
+            del self._offsets[path]
+        return lines
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "errors.log"
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(200_000):
+                f.write(f"[2024-01-01 00:00:00] [ERROR] Usuario {i} - Error de prueba ñ\n")
+
+        start = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            expected = f.readlines()[-10:]
+        readlines_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lines, cursor = tail_lines(path, 10)
+        tail_time = time.perf_counter() - start
+
+        print(f"📄 Archivo: {path.stat().st_size / 1024 / 1024:.1f} MB")
+        print(f"   readlines(): {readlines_time * 1000:.2f} ms")
+        print(f"   tail_lines(): {tail_time * 1000:.2f} ms (iguales: {lines == expected})")
+
+        # Paginar hacia atrás con el cursor
+        with open(path, "r", encoding="utf-8") as f:
+            all_lines = f.readlines()
+        for use_mmap in (False, True):
+            pages = []
+            cursor = None
+            while cursor != 0:
+                page, cursor = tail_lines(path, 7_000, before=cursor, block_size=4096, use_mmap=use_mmap)
+                pages = page + pages
+            print(f"   Paginación completa (mmap={use_mmap}): {pages == all_lines}")
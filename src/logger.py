@@ -5,28 +5,228 @@
 Logging avanzado con múltiples niveles y archivos separados
 """
 
+import atexit
+import hashlib
 import logging
+import os
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import json
 
+from log_tail import LogFollower, tail_lines
+from storage import atomic_write
+
+
+# Políticas de fsync del escritor de interacciones
+FSYNC_POLICIES = ("never", "interval", "every")
+
+# Bytes iniciales con los que se reconoce un archivo de interacciones ya procesado
+AGGREGATE_HEAD_BYTES = 256
+
+
+class InteractionWriter:
+    """Escritor JSONL en segundo plano con archivo abierto, lotes y rotación"""
+    
+    def __init__(
+        self,
+        log_dir: Path,
+        timestamp: str,
+        fsync_policy: str = "interval",
+        fsync_interval: float = 1.0,
+        fsync_every: int = 100,
+        max_bytes: int = 50 * 1024 * 1024,
+        batch_size: int = 500
+    ):
+        """
+        Inicializa el escritor (el hilo arranca con el primer registro)
+        
+        Args:
+            log_dir: Directorio de logs
+            timestamp: Sufijo de los archivos interactions_<timestamp>*.jsonl
+            fsync_policy: "never", "interval" o "every" (cada N registros)
+            fsync_interval: Segundos entre fsync con la política "interval"
+            fsync_every: Registros entre fsync con la política "every"
+            max_bytes: Tamaño a partir del cual se abre un archivo nuevo (0 = sin límite)
+            batch_size: Registros máximos escritos de una vez
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync no válida: {fsync_policy}")
+        
+        self.log_dir = log_dir
+        self.timestamp = timestamp
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.fsync_every = max(1, fsync_every)
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        
+        self.path = self.log_dir / f'interactions_{self.timestamp}.jsonl'
+        self._rotation = 0
+        self._file = None
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+    
+    def write(self, line: str):
+        """
+        Encola una línea JSON para escribirla en segundo plano
+        
+        Args:
+            line: Registro serializado (sin salto de línea)
+        """
+        if self._closed:
+            # Tras el cierre se escribe directamente para no perder registros
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            return
+        
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._write_loop,
+                        name="interaction-writer",
+                        daemon=True
+                    )
+                    self._thread.start()
+                    atexit.register(self.close)
+        
+        self._queue.put(line)
+    
+    def _open(self):
+        """Abre el archivo actual, rotando si ya supera el tamaño máximo"""
+        while self.max_bytes and self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            self._next_path()
+        self._file = open(self.path, 'a', encoding='utf-8')
+    
+    def _next_path(self):
+        """Pasa al siguiente archivo de la rotación"""
+        self._rotation += 1
+        self.path = self.log_dir / f'interactions_{self.timestamp}_{self._rotation:03d}.jsonl'
+    
+    def _fsync(self):
+        """Fuerza a disco lo escrito hasta ahora"""
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+    
+    def _write_loop(self):
+        """Hilo escritor: agrupa los registros pendientes y los escribe juntos"""
+        self._open()
+        timeout = self.fsync_interval if self.fsync_policy == "interval" else None
+        
+        while True:
+            try:
+                line = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._unsynced:
+                    self._fsync()
+                continue
+            
+            batch = [line]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = None in batch
+            records = [line for line in batch if line is not None]
+            try:
+                data = ''.join(line + '\n' for line in records)
+                if data:
+                    size = self._file.tell()
+                    if self.max_bytes and size and size + len(data.encode('utf-8')) > self.max_bytes:
+                        self._file.close()
+                        self._next_path()
+                        self._open()
+                    
+                    self._file.write(data)
+                    self._file.flush()
+                    self._unsynced += len(records)
+                
+                if self._unsynced and (
+                    stop
+                    or (self.fsync_policy == "every" and self._unsynced >= self.fsync_every)
+                    or (self.fsync_policy == "interval"
+                        and time.monotonic() - self._last_fsync >= self.fsync_interval)
+                ):
+                    self._fsync()
+            except Exception as e:
+                print(f"Error escribiendo interacciones: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if stop:
+                self._file.close()
+                return
+    
+    def flush(self):
+        """Espera a que se escriban todos los registros encolados"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+    
+    def close(self):
+        """Escribe los registros pendientes y detiene el hilo escritor"""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
 
 class BotLogger:
     """Gestor de logging para el bot"""
     
-    def __init__(self, log_dir: str = "logs"):
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        use_mmap: bool = False,
+        fsync_policy: str = "interval",
+        fsync_interval: float = 1.0,
+        fsync_every: int = 100,
+        max_interaction_bytes: int = 50 * 1024 * 1024
+    ):
         """
         Inicializa el sistema de logging
         
         Args:
             log_dir: Directorio donde guardar los logs
+            use_mmap: Usar mmap al leer los logs hacia atrás
+            fsync_policy: Política de fsync de interacciones ("never", "interval", "every")
+            fsync_interval: Segundos entre fsync con la política "interval"
+            fsync_every: Registros entre fsync con la política "every"
+            max_interaction_bytes: Tamaño máximo de cada archivo de interacciones
         """
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
+        self.use_mmap = use_mmap
         
         # Timestamp para nombres de archivo
         self.timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
         
+        # Agregados incrementales de interacciones (sidecar persistente)
+        self.aggregates_file = self.log_dir / ".interaction_stats.json"
+        self._aggregates_lock = threading.Lock()
+        
+        # Escritor de interacciones en segundo plano
+        self.interaction_writer = InteractionWriter(
+            self.log_dir,
+            self.timestamp,
+            fsync_policy=fsync_policy,
+            fsync_interval=fsync_interval,
+            fsync_every=fsync_every,
+            max_bytes=max_interaction_bytes
+        )
+        
         # Configurar loggers
         self._setup_loggers()
     
@@ -145,10 +345,8 @@ class BotLogger:
             "response_length": len(response)
         }
         
-        # Guardar interacciones detalladas
-        interactions_file = self.log_dir / f'interactions_{self.timestamp}.jsonl'
-        with open(interactions_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(interaction_data, ensure_ascii=False) + '\n')
+        # Guardar interacciones detalladas (en segundo plano)
+        self.interaction_writer.write(json.dumps(interaction_data, ensure_ascii=False))
     
     def log_startup(self, config: dict):
         """
@@ -174,6 +372,9 @@ class BotLogger:
         self.main_logger.info("="*60)
         self.main_logger.info("BOT SHUTTING DOWN")
         self.main_logger.info("="*60)
+        
+        # Vaciar la cola de interacciones pendientes
+        self.interaction_writer.close()
     
     def get_log_files(self) -> list:
         """
@@ -184,10 +385,25 @@ class BotLogger:
         """
         return list(self.log_dir.glob('*.log'))
     
+    def _error_files(self) -> list:
+        """
+        Obtiene los archivos de errores del más reciente al más antiguo
+        
+        Returns:
+            Lista de rutas ordenada por fecha de modificación
+        """
+        return sorted(
+            self.log_dir.glob('errors_*.log'),
+            key=lambda x: x.stat().st_mtime,
+            reverse=True
+        )
+    
     def get_latest_errors(self, count: int = 10) -> list:
         """
         Obtiene los últimos errores registrados
         
+        Solo se leen los bloques finales del archivo, no el archivo completo.
+        
         Args:
             count: Número de errores a obtener
             
@@ -195,23 +411,165 @@ class BotLogger:
             Lista de errores recientes
         """
         errors = []
-        error_files = sorted(
-            self.log_dir.glob('errors_*.log'),
-            key=lambda x: x.stat().st_mtime,
-            reverse=True
-        )
+        error_files = self._error_files()
         
         if error_files:
-            with open(error_files[0], 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                errors = lines[-count:]
+            errors, _ = tail_lines(error_files[0], count, use_mmap=self.use_mmap)
         
         return errors
     
-    def get_interaction_stats(self) -> dict:
+    def get_errors_page(self, limit: int = 50, cursor: str = None) -> dict:
+        """
+        Obtiene una página de errores recorriendo los logs hacia atrás
+        
+        Args:
+            limit: Número máximo de errores por página
+            cursor: Cursor devuelto por la página anterior (None = más recientes)
+            
+        Returns:
+            Diccionario con errores (más recientes primero) y el cursor siguiente
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        error_files = self._error_files()
+        names = [f.name for f in error_files]
+        
+        index, before = 0, None
+        if cursor:
+            name, _, offset = cursor.rpartition(':')
+            if name not in names or not offset.isdigit():
+                raise ValueError(f"Cursor no válido: {cursor}")
+            index, before = names.index(name), int(offset)
+        
+        errors = []
+        next_cursor = None
+        
+        while index < len(error_files) and len(errors) < limit:
+            lines, start = tail_lines(
+                error_files[index],
+                limit - len(errors),
+                before=before,
+                use_mmap=self.use_mmap
+            )
+            errors.extend(line.strip() for line in reversed(lines))
+            
+            if start > 0:
+                next_cursor = f"{names[index]}:{start}"
+                break
+            
+            # Archivo agotado: continuar con el anterior
+            index, before = index + 1, None
+            next_cursor = f"{names[index]}:{error_files[index].stat().st_size}" if index < len(error_files) else None
+        
+        return {
+            "errors": [error for error in errors if error],
+            "next_cursor": next_cursor
+        }
+    
+    def follow_errors(self) -> LogFollower:
+        """
+        Crea un seguidor de las líneas de error nuevas (de cualquier proceso)
+        
+        Returns:
+            LogFollower sobre errors_*.log
+        """
+        return LogFollower(self.log_dir, 'errors_*.log')
+    
+    def follow_interactions(self) -> LogFollower:
+        """
+        Crea un seguidor de las interacciones nuevas (líneas JSON)
+        
+        Returns:
+            LogFollower sobre interactions_*.jsonl
+        """
+        return LogFollower(self.log_dir, 'interactions_*.jsonl')
+    
+    @staticmethod
+    def _empty_file_aggregate() -> dict:
+        """Agregado vacío de un archivo de interacciones"""
+        return {
+            "offset": 0,
+            "count": 0,
+            "total_time": 0,
+            "prompt_chars": 0,
+            "response_chars": 0,
+            "ino": None,
+            "head": ""
+        }
+    
+    @staticmethod
+    def _file_head(file: Path, offset: int) -> str:
+        """
+        Huella del principio ya procesado de un archivo
+        
+        Detecta un archivo truncado (o sustituido) que ha vuelto a crecer
+        por encima del offset guardado.
+        
+        Args:
+            file: Archivo interactions_*.jsonl
+            offset: Bytes ya procesados
+            
+        Returns:
+            Huella de los primeros bytes procesados
+        """
+        with open(file, 'rb') as f:
+            head = f.read(min(offset, AGGREGATE_HEAD_BYTES))
+        return hashlib.blake2b(head, digest_size=8).hexdigest()
+    
+    def _scan_interactions(self, file: Path, aggregate: dict) -> dict:
+        """
+        Procesa las líneas completas añadidas a un archivo desde `offset`
+        
+        Args:
+            file: Archivo interactions_*.jsonl
+            aggregate: Agregado acumulado del archivo (se actualiza)
+            
+        Returns:
+            Agregado actualizado
+        """
+        with open(file, 'rb') as f:
+            f.seek(aggregate["offset"])
+            for raw_line in f:
+                # Una línea sin salto final aún se está escribiendo
+                if not raw_line.endswith(b'\n'):
+                    break
+                aggregate["offset"] += len(raw_line)
+                try:
+                    data = json.loads(raw_line.decode('utf-8'))
+                    aggregate["count"] += 1
+                    aggregate["total_time"] += data.get("response_time", 0)
+                    aggregate["prompt_chars"] += data.get("prompt_length", 0)
+                    aggregate["response_chars"] += data.get("response_length", 0)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+        return aggregate
+    
+    def _load_aggregates(self) -> dict:
+        """
+        Carga los agregados persistidos
+        
+        Returns:
+            Diccionario nombre de archivo -> agregado
+        """
+        if self.aggregates_file.exists():
+            try:
+                with open(self.aggregates_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get("files", {})
+            except Exception:
+                return {}
+        return {}
+    
+    def get_interaction_stats(self, full_rescan: bool = False) -> dict:
         """
         Obtiene estadísticas de las interacciones
         
+        Solo se procesan las líneas añadidas desde la última llamada; los
+        totales por archivo y su offset se guardan en un archivo auxiliar.
+        
+        Args:
+            full_rescan: Ignorar los agregados guardados y releer todo
+            
         Returns:
             Diccionario con estadísticas
         """
@@ -222,24 +580,52 @@ class BotLogger:
             "total_response_chars": 0
         }
         
-        interaction_files = list(self.log_dir.glob('interactions_*.jsonl'))
+        # Incluir lo que este proceso aún tiene en cola
+        self.interaction_writer.flush()
+        
+        interaction_files = sorted(self.log_dir.glob('interactions_*.jsonl'))
         
         if not interaction_files:
             return stats
         
-        total_time = 0
+        with self._aggregates_lock:
+            previous = {} if full_rescan else self._load_aggregates()
+            aggregates = {}
+            changed = full_rescan or set(previous) != {f.name for f in interaction_files}
+            
+            for file in interaction_files:
+                aggregate = previous.get(file.name)
+                stat = file.stat()
+                size = stat.st_size
+                
+                # Archivo nuevo, sustituido o truncado: procesarlo desde el principio
+                if aggregate is None or size < aggregate["offset"] or aggregate.get("ino") != stat.st_ino or (
+                    aggregate.get("head") != self._file_head(file, aggregate["offset"])
+                ):
+                    aggregate = self._empty_file_aggregate()
+                    aggregate["ino"] = stat.st_ino
+                    aggregate["head"] = self._file_head(file, 0)
+                    changed = True
+                
+                if size > aggregate["offset"]:
+                    aggregate = self._scan_interactions(file, aggregate)
+                    aggregate["head"] = self._file_head(file, aggregate["offset"])
+                    changed = True
+                
+                aggregates[file.name] = aggregate
+            
+            if changed:
+                try:
+                    atomic_write(self.aggregates_file, json.dumps({"files": aggregates}))
+                except Exception as e:
+                    self.main_logger.error(f"Error guardando agregados de interacciones: {e}")
         
-        for file in interaction_files:
-            with open(file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        stats["total_interactions"] += 1
-                        total_time += data.get("response_time", 0)
-                        stats["total_prompt_chars"] += data.get("prompt_length", 0)
-                        stats["total_response_chars"] += data.get("response_length", 0)
-                    except json.JSONDecodeError:
-                        continue
+        total_time = 0
+        for aggregate in aggregates.values():
+            stats["total_interactions"] += aggregate["count"]
+            total_time += aggregate["total_time"]
+            stats["total_prompt_chars"] += aggregate["prompt_chars"]
+            stats["total_response_chars"] += aggregate["response_chars"]
         
         if stats["total_interactions"] > 0:
             stats["avg_response_time"] = total_time / stats["total_interactions"]
@@ -293,5 +679,12 @@ if __name__ == "__main__":
     for key, value in stats.items():
         print(f"   {key}: {value}")
     
+    # Los agregados incrementales deben coincidir con una relectura completa
+    # (comprobado en tests/test_logger_stats.py)
+    logger.log_message(123456789, "Otra pregunta", "Otra respuesta", 0.42)
+    incremental = logger.get_interaction_stats()
+    full = logger.get_interaction_stats(full_rescan=True)
+    print(f"   Incremental == relectura completa: {incremental == full}")
+    
     logger.log_shutdown()
     print("\n✅ Logs creados en:", logger.log_dir)
\ No newline at end of file
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Enrutado de Modelos
+Elige el modelo de cada petición por reglas y mantiene cargados los que se usan
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from storage import StorageBackend
+
+
+# Indicios de pregunta técnica (van al modelo grande)
+TECHNICAL_MARKERS = (
+    "```", "traceback", "error", "exception", "def ", "class ", "import ",
+    "select ", "función", "funcion", "código", "codigo", "script", "compilar"
+)
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """
+    Convierte "clave=valor,clave=valor" en un diccionario
+
+    Los valores pueden contener ":" (p. ej. "llama3.2:1b").
+
+    Args:
+        spec: Texto de configuración (vacío = sin reglas)
+
+    Returns:
+        Diccionario clave -> valor
+    """
+    mapping = {}
+    for item in spec.split(","):
+        key, sep, value = item.partition("=")
+        if sep and key.strip() and value.strip():
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
+class ModelRouter:
+    """Selecciona el modelo de Ollama de cada petición y lo mantiene caliente"""
+
+    def __init__(
+        self,
+        default_model: str,
+        small_model: str = "",
+        large_model: str = "",
+        short_prompt_chars: int = 80,
+        long_prompt_chars: int = 400,
+        personality_models: Optional[Dict[str, str]] = None,
+        channel_models: Optional[Dict[str, str]] = None,
+        tier_models: Optional[Dict[str, str]] = None,
+        user_tiers: Optional[Dict[str, str]] = None,
+        allowed_models: Optional[Iterable[str]] = None,
+        storage: Optional[StorageBackend] = None,
+        client=None,
+        keep_alive: str = "30m",
+        warm_interval: float = 600,
+        warm_window: float = 3600,
+        stats_manager=None,
+        on_switch: Optional[Callable[[int], None]] = None
+    ):
+        """
+        Inicializa el enrutador
+
+        Orden de las reglas: modelo elegido con /model, canal, nivel del
+        usuario, personalidad, longitud/tipo de la pregunta y, si ninguna
+        aplica, el modelo por defecto.
+
+        Args:
+            default_model: Modelo por defecto
+            small_model: Modelo para mensajes cortos de charla (vacío = no usar)
+            large_model: Modelo para preguntas largas o técnicas (vacío = no usar)
+            short_prompt_chars: Longitud máxima de un mensaje "corto"
+            long_prompt_chars: Longitud mínima de un mensaje "largo"
+            personality_models: Modelo por personalidad
+            channel_models: Modelo por ID de canal
+            tier_models: Modelo por nivel de usuario
+            user_tiers: Nivel de cada ID de usuario
+            allowed_models: Modelos que se pueden elegir con /model
+            storage: Backend donde guardar los modelos elegidos con /model
+            client: OllamaClient u OllamaPool con el que precargar modelos
+            keep_alive: Tiempo que Ollama mantiene cargado cada modelo
+            warm_interval: Segundos entre precargas (0 = sin precarga periódica)
+            warm_window: Se precargan los modelos usados en estos últimos segundos
+            stats_manager: StatsManager opcional donde registrar el uso de modelos
+            on_switch: Callback opcional llamado con el ID de un usuario que
+                cambia de modelo (su contexto KV ya no sirve)
+        """
+        self.default_model = default_model
+        self.small_model = small_model
+        self.large_model = large_model
+        self.short_prompt_chars = short_prompt_chars
+        self.long_prompt_chars = long_prompt_chars
+        self.personality_models = personality_models or {}
+        self.channel_models = channel_models or {}
+        self.tier_models = tier_models or {}
+        self.user_tiers = user_tiers or {}
+        self.storage = storage
+        self.client = client
+        self.keep_alive = keep_alive
+        self.warm_interval = warm_interval
+        self.warm_window = warm_window
+        self.stats_manager = stats_manager
+        self.on_switch = on_switch
+
+        configured = [default_model, small_model, large_model]
+        self.allowed_models: List[str] = list(dict.fromkeys(
+            m for m in (list(allowed_models or []) or configured) if m
+        ))
+
+        self._user_models: Dict[int, str] = storage.load_user_models() if storage else {}
+        # Con un solo modelo posible el contexto KV nunca cambia de modelo
+        self._single_model = len(set(
+            self.allowed_models
+            + list(self.personality_models.values())
+            + list(self.channel_models.values())
+            + list(self.tier_models.values())
+            + list(self._user_models.values())
+        )) <= 1
+        self._last_model: "OrderedDict[int, str]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._warm_task: Optional[asyncio.Task] = None
+
+    def is_technical(self, prompt: str) -> bool:
+        """Indica si un mensaje parece una pregunta técnica"""
+        text = prompt.lower()
+        return any(marker in text for marker in TECHNICAL_MARKERS)
+
+    def route(
+        self,
+        user_id: int,
+        prompt: str,
+        personality: str,
+        channel_id: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Elige el modelo de una petición (sin efectos secundarios)
+
+        Args:
+            user_id: ID del usuario
+            prompt: Mensaje del usuario
+            personality: Personalidad activa
+            channel_id: ID del canal (si se conoce)
+
+        Returns:
+            Tupla (modelo, regla aplicada)
+        """
+        if user_id in self._user_models:
+            return self._user_models[user_id], "user"
+        if channel_id is not None and str(channel_id) in self.channel_models:
+            return self.channel_models[str(channel_id)], "channel"
+
+        tier = self.user_tiers.get(str(user_id))
+        if tier in self.tier_models:
+            return self.tier_models[tier], "tier"
+        if personality in self.personality_models:
+            return self.personality_models[personality], "personality"
+
+        if self.large_model and (len(prompt) >= self.long_prompt_chars or self.is_technical(prompt)):
+            return self.large_model, "large"
+        if self.small_model and len(prompt) <= self.short_prompt_chars:
+            return self.small_model, "small"
+        return self.default_model, "default"
+
+    def mark_used(self, user_id: int, model: str, reason: str = "default"):
+        """
+        Registra que se va a generar con un modelo
+
+        Args:
+            user_id: ID del usuario
+            model: Modelo elegido por route()
+            reason: Regla aplicada
+        """
+        self._last_used[model] = time.monotonic()
+
+        previous = self._last_model.pop(user_id, None)
+        self._last_model[user_id] = model
+        while len(self._last_model) > 10000:
+            self._last_model.popitem(last=False)
+        # Sin modelo previo conocido (p. ej. tras reiniciar) el contexto KV guardado
+        # puede ser de otro modelo: solo se conserva si no hay alternativa posible
+        switched = previous != model if previous is not None else not self._single_model
+        if switched and self.on_switch:
+            self.on_switch(user_id)
+
+        if self.stats_manager:
+            self.stats_manager.add_model_request(model, reason)
+
+    def touch(self, model: str):
+        """Registra el uso de un modelo fuera del enrutado (p. ej. borradores) para mantenerlo cargado"""
+        self._last_used[model] = time.monotonic()
+
+    def get_user_model(self, user_id: int) -> Optional[str]:
+        """Modelo elegido por un usuario con /model (None = automático)"""
+        return self._user_models.get(user_id)
+
+    def set_user_model(self, user_id: int, model: Optional[str]):
+        """
+        Fija (o quita, con None) el modelo de un usuario
+
+        Args:
+            user_id: ID del usuario
+            model: Modelo elegido o None para volver a la selección automática
+
+        Raises:
+            ValueError: Si el modelo no está entre los permitidos
+        """
+        if model is None:
+            self._user_models.pop(user_id, None)
+            if self.storage:
+                self.storage.delete_user_model(user_id)
+            return
+
+        if model not in self.allowed_models:
+            raise ValueError(f"Modelo no permitido: {model}")
+        self._user_models[user_id] = model
+        if self.storage:
+            self.storage.set_user_model(user_id, model)
+
+    async def warm(self, model: str) -> bool:
+        """
+        Carga un modelo en Ollama (o renueva su keep_alive)
+
+        Args:
+            model: Modelo a precargar
+
+        Returns:
+            True si al menos un servidor lo ha cargado
+        """
+        try:
+            loaded = await self.client.preload(model, self.keep_alive)
+            ok = loaded is None or loaded > 0
+        except Exception:
+            ok = False
+
+        if self.stats_manager:
+            self.stats_manager.add_model_warmup(model, ok)
+        return ok
+
+    def warm_models(self) -> List[str]:
+        """Modelos a mantener cargados: el de por defecto y los usados recientemente"""
+        cutoff = time.monotonic() - self.warm_window
+        recent = [model for model, used in self._last_used.items() if used >= cutoff]
+        return list(dict.fromkeys([self.default_model] + recent))
+
+    async def start(self):
+        """Lanza la precarga periódica (la primera, inmediata)"""
+        if self.client is not None and self.warm_interval > 0 and self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_loop())
+
+    async def close(self):
+        """Detiene la precarga periódica"""
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            await asyncio.gather(self._warm_task, return_exceptions=True)
+            self._warm_task = None
+
+    async def _warm_loop(self):
+        """Precarga los modelos en uso cada `warm_interval` segundos"""
+        while True:
+            for model in self.warm_models():
+                await self.warm(model)
+            await asyncio.sleep(self.warm_interval)
+
+    def get_status(self) -> Dict:
+        """
+        Obtiene el estado actual del enrutador
+
+        Returns:
+            Diccionario con modelos permitidos, elegidos y segundos desde su último uso
+        """
+        now = time.monotonic()
+        return {
+            "default_model": self.default_model,
+            "allowed_models": self.allowed_models,
+            "user_overrides": len(self._user_models),
+            "last_used": {model: now - used for model, used in self._last_used.items()},
+            "keep_alive": self.keep_alive
+        }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    class DemoClient:
+        """Cliente de demostración que solo anota los modelos precargados"""
+
+        async def preload(self, model: str, keep_alive: str):
+            print(f"🔥 Precargando {model} (keep_alive={keep_alive})")
+
+    async def demo():
+        router = ModelRouter(
+            "llama3.2",
+            small_model="llama3.2:1b",
+            large_model="qwen2.5-coder:7b",
+            personality_models=parse_mapping("mentor=llama3.1:8b"),
+            channel_models=parse_mapping("555=llama3.2"),
+            tier_models=parse_mapping("premium=llama3.1:70b"),
+            user_tiers=parse_mapping("42=premium"),
+            client=DemoClient(),
+            warm_interval=0.2,
+            on_switch=lambda user_id: print(f"🔁 Usuario {user_id} cambia de modelo")
+        )
+
+        requests = [
+            (1, "hola!", "amigo", None),
+            (1, "¿Por qué mi script lanza un Traceback al importar pandas?", "amigo", None),
+            (2, "Explícame la recursividad", "mentor", None),
+            (42, "hola", "amigo", None),
+            (3, "hola", "amigo", 555),
+            (4, "Cuéntame algo sobre la historia de Roma y el imperio bizantino " * 8, "amigo", None)
+        ]
+        for user_id, prompt, personality, channel_id in requests:
+            model, reason = router.route(user_id, prompt, personality, channel_id)
+            router.mark_used(user_id, model, reason)
+            print(f"👤 {user_id:>3} {prompt[:40]!r:44} -> {model} ({reason})")
+
+        router.set_user_model(1, "llama3.2")
+        print(f"🎛️  /model usuario 1 -> {router.route(1, 'hola', 'amigo')}")
+
+        await router.start()
+        await asyncio.sleep(0.3)
+        await router.close()
+
+    asyncio.run(demo())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Cliente Ollama Asíncrono
+Cliente HTTP no bloqueante con sesión persistente (keep-alive)
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+
+class OllamaClient:
+    """Cliente asíncrono para la API HTTP de Ollama"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        timeout: float = 60,
+        max_connections: int = 32
+    ):
+        """
+        Inicializa el cliente (la sesión se crea en start())
+
+        Args:
+            base_url: URL base del servidor Ollama
+            timeout: Tiempo máximo por petición en segundos
+            max_connections: Conexiones simultáneas máximas del pool
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def is_started(self) -> bool:
+        """Indica si la sesión HTTP está abierta"""
+        return self._session is not None and not self._session.closed
+
+    async def start(self):
+        """Crea la sesión HTTP con pool de conexiones keep-alive"""
+        if self.is_started:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            keepalive_timeout=60
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def close(self):
+        """Cierra la sesión HTTP y libera las conexiones"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """
+        Devuelve la sesión activa, creándola si hace falta
+
+        Returns:
+            Sesión HTTP abierta
+        """
+        if not self.is_started:
+            await self.start()
+        return self._session
+
+    async def generate(self, payload: Dict) -> Dict:
+        """
+        Llama a /api/generate sin streaming
+
+        Args:
+            payload: Cuerpo de la petición (model, prompt, options...)
+
+        Returns:
+            Respuesta JSON de Ollama
+
+        Raises:
+            asyncio.TimeoutError: Si Ollama tarda más de `timeout`
+            aiohttp.ClientConnectionError: Si no se puede conectar
+            aiohttp.ClientResponseError: Si Ollama devuelve un error HTTP
+        """
+        session = await self._ensure_session()
+        payload = dict(payload, stream=False)
+
+        async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def preload(self, model: str, keep_alive: str = "5m"):
+        """
+        Carga un modelo en memoria (o renueva su keep_alive) sin generar texto
+
+        Args:
+            model: Modelo de Ollama
+            keep_alive: Tiempo que Ollama debe mantenerlo cargado (p. ej. "30m")
+
+        Raises:
+            asyncio.TimeoutError: Si Ollama tarda más de `timeout`
+            aiohttp.ClientConnectionError: Si no se puede conectar
+            aiohttp.ClientResponseError: Si Ollama devuelve un error HTTP
+        """
+        session = await self._ensure_session()
+
+        async with session.post(
+            f"{self.base_url}/api/generate",
+            json={"model": model, "keep_alive": keep_alive, "stream": False}
+        ) as response:
+            response.raise_for_status()
+            await response.read()
+
+    async def tags(self, timeout: Optional[float] = None) -> Dict:
+        """
+        Llama a /api/tags (modelos instalados); sirve como sonda de salud
+
+        Args:
+            timeout: Tiempo máximo en segundos (por defecto, el del cliente)
+
+        Returns:
+            Respuesta JSON de Ollama
+
+        Raises:
+            asyncio.TimeoutError: Si Ollama tarda más del tiempo indicado
+            aiohttp.ClientConnectionError: Si no se puede conectar
+            aiohttp.ClientResponseError: Si Ollama devuelve un error HTTP
+        """
+        session = await self._ensure_session()
+        kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+
+        async with session.get(f"{self.base_url}/api/tags", **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def embed(self, model: str, inputs: List[str]) -> List[List[float]]:
+        """
+        Calcula embeddings de varios textos en una sola petición
+
+        Usa /api/embed (por lotes) y, si el servidor es antiguo y no lo
+        conoce, recurre a /api/embeddings texto a texto.
+
+        Args:
+            model: Modelo de embeddings (p. ej. nomic-embed-text)
+            inputs: Textos a convertir
+
+        Returns:
+            Un vector por texto, en el mismo orden
+
+        Raises:
+            asyncio.TimeoutError: Si Ollama tarda más de `timeout`
+            aiohttp.ClientConnectionError: Si no se puede conectar
+            aiohttp.ClientResponseError: Si Ollama devuelve un error HTTP
+        """
+        session = await self._ensure_session()
+
+        async with session.post(
+            f"{self.base_url}/api/embed",
+            json={"model": model, "input": inputs}
+        ) as response:
+            if response.status != 404:
+                response.raise_for_status()
+                return (await response.json())["embeddings"]
+
+        vectors = []
+        for text in inputs:
+            async with session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": model, "prompt": text}
+            ) as response:
+                response.raise_for_status()
+                vectors.append((await response.json())["embedding"])
+        return vectors
+
+    async def generate_stream(self, payload: Dict) -> AsyncIterator[Dict]:
+        """
+        Llama a /api/generate en modo streaming (NDJSON)
+
+        Args:
+            payload: Cuerpo de la petición (model, prompt, options...)
+
+        Yields:
+            Cada fragmento JSON emitido por Ollama; el último trae done=True
+            junto con las métricas (eval_count, context...)
+
+        Raises:
+            asyncio.TimeoutError: Si Ollama tarda más de `timeout`
+            aiohttp.ClientConnectionError: Si no se puede conectar
+            aiohttp.ClientResponseError: Si Ollama devuelve un error HTTP
+            RuntimeError: Si Ollama reporta un error dentro del stream
+        """
+        session = await self._ensure_session()
+        payload = dict(payload, stream=True)
+
+        async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
+            response.raise_for_status()
+
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+
+                yield chunk
+                if chunk.get("done"):
+                    break
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    from aiohttp import web
+
+    async def fake_generate(request: web.Request) -> web.Response:
+        """Servidor Ollama falso: tarda lo que indica el prompt"""
+        data = await request.json()
+        await asyncio.sleep(float(data["prompt"]))
+        return web.json_response({"response": f"ok {data['prompt']}", "eval_count": 1})
+
+    async def demo():
+        app = web.Application()
+        app.router.add_post("/api/generate", fake_generate)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 11435)
+        await site.start()
+
+        client = OllamaClient("http://127.0.0.1:11435")
+        await client.start()
+
+        delays = [0.5, 1.0, 1.5, 2.0, 1.0, 0.5, 2.0, 1.5]
+        print(f"🧪 {len(delays)} peticiones concurrentes (suma: {sum(delays):.1f}s, máx: {max(delays):.1f}s)")
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            client.generate({"model": "fake", "prompt": str(d)}) for d in delays
+        ])
+        elapsed = time.perf_counter() - start
+
+        print(f"✅ {len(results)} respuestas en {elapsed:.2f}s")
+
+        await client.close()
+        await runner.cleanup()
+
+    asyncio.run(demo())
@@ -5,9 +5,10 @@
 Gestión de diferentes personalidades del bot
 """
 
-import json
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
+
+from storage import JSONStorage, StorageBackend
 
 
 class PersonalityManager:
@@ -18,6 +19,8 @@ class PersonalityManager:
         "profesional": {
             "name": "🎓 Profesional",
             "description": "Formal, preciso y estructurado",
+            "cache": True,
+            "speculative": False,
             "system_prompt": """Eres un asistente profesional y eficiente. Tu comunicación es:
 - Formal y respetuosa
 - Precisa y concisa
@@ -32,6 +35,8 @@ Mantienes un tono profesional en todo momento, proporcionando información preci
         "amigo": {
             "name": "😊 Amigo",
             "description": "Casual, cercano y conversacional",
+            "cache": True,
+            "speculative": True,
             "system_prompt": """Eres un amigo cercano y de confianza. Tu comunicación es:
 - Casual y relajada
 - Cercana y empática
@@ -46,6 +51,8 @@ Hablas como un buen amigo, siendo comprensivo, divertido cuando es apropiado, y
         "mentor": {
             "name": "👨‍🏫 Mentor",
             "description": "Educativo, paciente y detallado",
+            "cache": True,
+            "speculative": False,
             "system_prompt": """Eres un mentor educativo y paciente. Tu comunicación es:
 - Explicativa y detallada
 - Paciente y comprensiva
@@ -60,6 +67,8 @@ Enseñas de manera efectiva, asegurándote de que se comprende cada concepto ant
         "entusiasta": {
             "name": "🎉 Entusiasta",
             "description": "Energético, positivo y motivador",
+            "cache": True,
+            "speculative": True,
             "system_prompt": """Eres un asistente entusiasta y motivador. Tu comunicación es:
 - Energética y positiva
 - Motivadora e inspiradora
@@ -74,15 +83,25 @@ Transmites energía positiva y motivación en cada interacción, haciendo que to
     
     DEFAULT_PERSONALITY = "amigo"
     
-    def __init__(self, data_file: str = "data/personalities.json"):
+    def __init__(
+        self,
+        data_file: str = "data/personalities.json",
+        storage: Optional[StorageBackend] = None
+    ):
         """
         Inicializa el gestor de personalidades
         
         Args:
-            data_file: Archivo donde guardar las preferencias de usuarios
+            data_file: Archivo donde guardar las preferencias de usuarios (backend JSON)
+            storage: Backend de almacenamiento compartido (opcional)
         """
-        self.data_file = Path(data_file)
-        self.data_file.parent.mkdir(exist_ok=True)
+        if storage is None:
+            data_path = Path(data_file)
+            storage = JSONStorage(
+                data_dir=str(data_path.parent),
+                personalities_file=str(data_path)
+            )
+        self.storage = storage
         
         # Cargar preferencias guardadas
         self.user_personalities = self._load_preferences()
@@ -94,25 +113,14 @@ Transmites energía positiva y motivación en cada interacción, haciendo que to
         Returns:
             Diccionario con user_id -> personality
         """
-        if self.data_file.exists():
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Convertir keys a int
-                    return {int(k): v for k, v in data.items()}
-            except Exception:
-                return {}
-        return {}
-    
-    def _save_preferences(self):
-        """Guarda las preferencias de personalidad"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                # Convertir keys a str para JSON
-                data = {str(k): v for k, v in self.user_personalities.items()}
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error guardando preferencias: {e}")
+            return self.storage.load_personalities()
+        except Exception:
+            return {}
+    
+    def reload(self):
+        """Vuelve a leer las preferencias (las ha podido cambiar otro proceso, p. ej. el bot)"""
+        self.user_personalities = self._load_preferences()
     
     def get_personality(self, user_id: int) -> str:
         """
@@ -141,7 +149,7 @@ Transmites energía positiva y motivación en cada interacción, haciendo que to
             return False
         
         self.user_personalities[user_id] = personality
-        self._save_preferences()
+        self.storage.set_personality(user_id, personality)
         return True
     
     def get_system_prompt(self, personality: str) -> str:
@@ -159,6 +167,36 @@ Transmites energía positiva y motivación en cada interacción, haciendo que to
         
         return self.PERSONALITIES[personality]["system_prompt"]
     
+    def is_cacheable(self, personality: str) -> bool:
+        """
+        Indica si las respuestas de una personalidad pueden reutilizarse
+        
+        Args:
+            personality: Nombre de la personalidad
+            
+        Returns:
+            True si la personalidad admite caché de respuestas
+        """
+        if personality not in self.PERSONALITIES:
+            personality = self.DEFAULT_PERSONALITY
+        
+        return self.PERSONALITIES[personality].get("cache", True)
+    
+    def is_speculative(self, personality: str) -> bool:
+        """
+        Indica si una personalidad admite respuesta especulativa (borrador rápido)
+        
+        Args:
+            personality: Nombre de la personalidad
+            
+        Returns:
+            True si se puede responder primero con el modelo borrador
+        """
+        if personality not in self.PERSONALITIES:
+            personality = self.DEFAULT_PERSONALITY
+        
+        return self.PERSONALITIES[personality].get("speculative", False)
+    
     def get_personality_info(self, personality: str) -> dict:
         """
         Obtiene información completa de una personalidad
@@ -213,7 +251,7 @@ Transmites energía positiva y motivación en cada interacción, haciendo que to
         """
         if user_id in self.user_personalities:
             del self.user_personalities[user_id]
-            self._save_preferences()
+            self.storage.delete_personality(user_id)
     
     def get_personality_description(self, personality: str) -> str:
         """
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Caché de Respuestas
+Reutiliza respuestas a preguntas repetidas (LRU + caducidad + límite en bytes)
+"""
+
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+# Clave de caché: (modelo, personalidad, prompt normalizado, huella de contexto)
+CacheKey = Tuple[str, str, str, str]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normaliza un prompt para que variaciones triviales compartan entrada
+
+    Pasa a minúsculas, elimina acentos, signos de puntuación y espacios
+    repetidos: "¡Hola!", "hola" y "  HOLA " dan el mismo resultado.
+
+    Args:
+        prompt: Mensaje del usuario
+
+    Returns:
+        Prompt normalizado
+    """
+    text = unicodedata.normalize("NFKD", prompt.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class _Entry:
+    """Respuesta almacenada"""
+
+    __slots__ = ("response", "expires_at", "size")
+
+    def __init__(self, response: str, expires_at: float, size: int):
+        self.response = response
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ResponseCache:
+    """Caché LRU de respuestas con caducidad y límite de memoria"""
+
+    def __init__(
+        self,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl: float = 3600,
+        max_prompt_length: int = 500,
+        stats_manager=None
+    ):
+        """
+        Inicializa la caché
+
+        Args:
+            max_bytes: Tamaño máximo aproximado (claves + respuestas) en bytes
+            ttl: Segundos de validez de cada respuesta
+            max_prompt_length: Prompts más largos no se cachean
+            stats_manager: StatsManager opcional donde registrar aciertos y fallos
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_prompt_length = max_prompt_length
+        self.stats_manager = stats_manager
+
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        """Indica si hay una respuesta válida para la clave (sin contar como consulta)"""
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes aproximados ocupados"""
+        return self._bytes
+
+    def make_key(
+        self,
+        model: str,
+        personality: str,
+        prompt: str,
+        context_fingerprint: str = ""
+    ) -> Optional[CacheKey]:
+        """
+        Construye la clave de un prompt
+
+        Args:
+            model: Modelo de Ollama
+            personality: Personalidad activa
+            prompt: Mensaje del usuario
+            context_fingerprint: Huella opcional de la conversación previa
+
+        Returns:
+            Clave o None si el prompt no es cacheable
+        """
+        if len(prompt) > self.max_prompt_length:
+            return None
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+        return (model, personality, normalized, context_fingerprint)
+
+    def _remove(self, key: CacheKey):
+        """Elimina una entrada y descuenta su tamaño"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """
+        Busca una respuesta en caché
+
+        Args:
+            key: Clave devuelta por make_key()
+
+        Returns:
+            Respuesta o None si no está o ha caducado
+        """
+        entry = self._entries.get(key)
+        hit = entry is not None and entry.expires_at > time.monotonic()
+
+        if entry is not None and not hit:
+            self._remove(key)
+        if hit:
+            self._entries.move_to_end(key)
+
+        if self.stats_manager:
+            self.stats_manager.add_cache_lookup(hit, len(self._entries), self._bytes)
+
+        return entry.response if hit else None
+
+    def put(self, key: CacheKey, response: str):
+        """
+        Guarda una respuesta, expulsando las menos recientes si no cabe
+
+        Args:
+            key: Clave devuelta por make_key()
+            response: Respuesta generada
+        """
+        size = len(response.encode("utf-8")) + len(key[2].encode("utf-8")) + 200
+        if not response or size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = _Entry(response, time.monotonic() + self.ttl, size)
+        self._bytes += size
+
+        evicted = 0
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            evicted += 1
+
+        if self.stats_manager:
+            self.stats_manager.add_cache_store(evicted, len(self._entries), self._bytes)
+
+    def clear(self):
+        """Vacía la caché"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_status(self) -> Dict:
+        """
+        Obtiene el estado actual de la caché
+
+        Returns:
+            Diccionario con entradas, bytes y límites
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    cache = ResponseCache(max_bytes=2048, ttl=60)
+
+    for prompt in ["¡Hola!", "hola", "  HOLA  ", "¿Cuáles son las reglas?", "cuales son las reglas"]:
+        key = cache.make_key("llama3.2", "amigo", prompt)
+        response = cache.get(key)
+        if response is None:
+            response = f"Respuesta generada para '{prompt}'"
+            cache.put(key, response)
+            print(f"❌ Fallo:   {prompt!r:30} -> {key[2]!r}")
+        else:
+            print(f"✅ Acierto: {prompt!r:30} -> {response}")
+
+    for n in range(20):
+        cache.put(cache.make_key("llama3.2", "amigo", f"pregunta {n}"), "x" * 200)
+    print(f"\n📦 Estado: {cache.get_status()}")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Planificador de Generaciones
+Cola global acotada con reparto equitativo (round-robin) entre usuarios
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """La cola de generaciones ha alcanzado su capacidad máxima"""
+
+    def __init__(self, depth: int):
+        """
+        Args:
+            depth: Peticiones en espera en el momento del rechazo
+        """
+        super().__init__(f"Cola llena ({depth} en espera)")
+        self.depth = depth
+
+
+class _Ticket:
+    """Petición en espera de turno"""
+
+    __slots__ = ("user_id", "granted", "enqueued_at")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.granted = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class GenerationScheduler:
+    """Limita las generaciones concurrentes y las reparte por turnos entre usuarios"""
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 50, stats_manager=None):
+        """
+        Inicializa el planificador
+
+        Args:
+            max_concurrent: Generaciones simultáneas máximas contra Ollama
+            max_queue: Peticiones en espera máximas antes de rechazar
+            stats_manager: StatsManager opcional donde registrar esperas
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.stats_manager = stats_manager
+
+        self._pending: Dict[int, Deque[_Ticket]] = {}
+        self._rotation: Deque[int] = deque()
+        self._in_flight: set = set()
+
+    @property
+    def active(self) -> int:
+        """Generaciones en curso"""
+        return len(self._in_flight)
+
+    @property
+    def queued(self) -> int:
+        """Peticiones esperando turno"""
+        return sum(len(tickets) for tickets in self._pending.values())
+
+    def has_work(self, user_id: int) -> bool:
+        """
+        Indica si un usuario tiene una generación en curso o en espera
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            True si el usuario ocupa un hueco o tiene peticiones en cola
+        """
+        return user_id in self._in_flight or bool(self._pending.get(user_id))
+
+    def position(self, ticket: _Ticket) -> int:
+        """
+        Calcula cuántas peticiones se atenderán antes que una dada
+
+        Args:
+            ticket: Petición en espera
+
+        Returns:
+            Posición en la cola (1 = la siguiente en salir)
+        """
+        tickets = self._pending.get(ticket.user_id)
+        if not tickets or ticket not in tickets:
+            return 0
+
+        # Orden de servicio: usuarios en rotación y después los que tienen una en curso
+        order = list(self._rotation) + [
+            uid for uid in self._pending if uid not in self._rotation
+        ]
+        rounds = list(tickets).index(ticket)
+        user_index = order.index(ticket.user_id)
+
+        ahead = 0
+        for index, uid in enumerate(order):
+            count = len(self._pending[uid])
+            ahead += min(count, rounds)
+            if index < user_index and count > rounds:
+                ahead += 1
+        return ahead + 1
+
+    async def run(
+        self,
+        user_id: int,
+        func: Callable[[], Awaitable[Any]],
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Any:
+        """
+        Ejecuta una generación cuando le llegue el turno
+
+        Args:
+            user_id: ID del usuario que la solicita
+            func: Corrutina (sin argumentos) que realiza la generación
+            on_queued: Callback opcional llamado con la posición si hay que esperar
+
+        Returns:
+            Resultado de `func`
+
+        Raises:
+            QueueFullError: Si la cola está llena
+            Exception: La de `on_queued` (la petición se retira de la cola)
+        """
+        depth = self.queued
+        if depth >= self.max_queue:
+            if self.stats_manager:
+                self.stats_manager.add_queue_rejection(depth)
+            raise QueueFullError(depth)
+
+        ticket = _Ticket(user_id)
+        self._pending.setdefault(user_id, deque()).append(ticket)
+        if user_id not in self._in_flight and user_id not in self._rotation:
+            self._rotation.append(user_id)
+        self._dispatch()
+
+        position = 0
+        try:
+            if not ticket.granted.done():
+                position = self.position(ticket)
+                if on_queued:
+                    await on_queued(position)
+            await ticket.granted
+        except BaseException:
+            # Cancelada o fallo al avisar (p. ej. error de Discord): no perder el hueco
+            self._cancel(ticket)
+            raise
+
+        wait_time = time.monotonic() - ticket.enqueued_at
+        if self.stats_manager:
+            self.stats_manager.add_queue_wait(position, wait_time, self.queued)
+
+        try:
+            return await func()
+        finally:
+            self._release(user_id)
+
+    def _dispatch(self):
+        """Concede turnos mientras haya capacidad, rotando entre usuarios"""
+        while self._rotation and len(self._in_flight) < self.max_concurrent:
+            user_id = self._rotation.popleft()
+            tickets = self._pending.get(user_id)
+            if not tickets:
+                self._pending.pop(user_id, None)
+                continue
+
+            ticket = tickets.popleft()
+            if not tickets:
+                del self._pending[user_id]
+            if ticket.granted.done():
+                # Cancelada en este mismo ciclo, antes de que _cancel la retirase
+                if tickets:
+                    self._rotation.append(user_id)
+                continue
+
+            self._in_flight.add(user_id)
+            ticket.granted.set_result(True)
+
+    def _release(self, user_id: int):
+        """
+        Libera el hueco de un usuario y lo devuelve al final de la rotación
+
+        Args:
+            user_id: ID del usuario cuya generación terminó
+        """
+        self._in_flight.discard(user_id)
+        if self._pending.get(user_id):
+            self._rotation.append(user_id)
+        self._dispatch()
+
+    def _cancel(self, ticket: _Ticket):
+        """
+        Retira una petición cancelada (o libera su turno si ya se concedió)
+
+        Args:
+            ticket: Petición cancelada
+        """
+        if ticket.granted.done() and not ticket.granted.cancelled():
+            self._release(ticket.user_id)
+            return
+
+        tickets = self._pending.get(ticket.user_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._pending[ticket.user_id]
+                if ticket.user_id in self._rotation:
+                    self._rotation.remove(ticket.user_id)
+
+    def get_status(self) -> Dict:
+        """
+        Obtiene el estado actual de la cola
+
+        Returns:
+            Diccionario con generaciones activas y en espera
+        """
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "waiting_users": len(self._pending)
+        }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    async def demo():
+        scheduler = GenerationScheduler(max_concurrent=2, max_queue=6)
+        order = []
+
+        async def job(user_id: int, n: int):
+            async def work():
+                await asyncio.sleep(0.1)
+                order.append(f"{user_id}#{n}")
+            try:
+                await scheduler.run(user_id, work)
+            except QueueFullError as e:
+                order.append(f"{user_id}#{n} rechazada ({e.depth})")
+
+        # El usuario 1 envía 5 peticiones seguidas, 2 y 3 solo una
+        jobs = [job(1, n) for n in range(5)] + [job(2, 0), job(3, 0)]
+        await asyncio.gather(*jobs)
+
+        print("🧪 Orden de servicio:")
+        for item in order:
+            print(f"   {item}")
+
+    asyncio.run(demo())
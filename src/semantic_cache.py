@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Caché Semántica
+Reutiliza respuestas a preguntas parecidas comparando embeddings
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage import atomic_write
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: se usa la búsqueda en Python puro
+    np = None
+
+try:
+    import hnswlib
+except ImportError:  # Índice ANN opcional para cachés grandes
+    hnswlib = None
+
+
+Vector = List[float]
+
+
+def normalize(vector: Vector) -> Vector:
+    """
+    Escala un vector a norma 1 (el producto escalar pasa a ser el coseno)
+
+    Args:
+        vector: Vector de embeddings
+
+    Returns:
+        Vector normalizado
+    """
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+# --- Índices vectoriales ---
+
+class VectorIndex:
+    """Interfaz de un índice de vecinos más próximos (similitud coseno)"""
+
+    def __init__(self, dim: int, capacity: int = 10000):
+        """
+        Args:
+            dim: Dimensión de los vectores
+            capacity: Elementos máximos esperados
+        """
+        self.dim = dim
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def add(self, item_id: int, vector: Vector):
+        """Añade un vector normalizado"""
+        raise NotImplementedError
+
+    def remove(self, item_id: int):
+        """Elimina un vector"""
+        raise NotImplementedError
+
+    def search(self, vector: Vector, k: int = 1) -> List[Tuple[int, float]]:
+        """Devuelve hasta `k` pares (id, similitud) ordenados de mayor a menor"""
+        raise NotImplementedError
+
+
+class BruteForceIndex(VectorIndex):
+    """Búsqueda exhaustiva: NumPy si está instalado, Python puro si no"""
+
+    def __init__(self, dim: int, capacity: int = 10000):
+        super().__init__(dim, capacity)
+        self._ids: List[int] = []
+        self._vectors: List[Vector] = []
+        self._positions: Dict[int, int] = {}
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, item_id: int, vector: Vector):
+        if item_id in self._positions:
+            self.remove(item_id)
+        self._positions[item_id] = len(self._ids)
+        self._ids.append(item_id)
+        self._vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, item_id: int):
+        position = self._positions.pop(item_id, None)
+        if position is None:
+            return
+        # Mover el último a la posición liberada (O(1))
+        last_id = self._ids.pop()
+        last_vector = self._vectors.pop()
+        if position < len(self._ids):
+            self._ids[position] = last_id
+            self._vectors[position] = last_vector
+            self._positions[last_id] = position
+        self._matrix = None
+
+    def search(self, vector: Vector, k: int = 1) -> List[Tuple[int, float]]:
+        if not self._ids:
+            return []
+        k = min(k, len(self._ids))
+
+        if np is not None:
+            if self._matrix is None:
+                self._matrix = np.asarray(self._vectors, dtype=np.float32)
+            scores = self._matrix @ np.asarray(vector, dtype=np.float32)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[i], float(scores[i])) for i in top]
+
+        scores = [sum(a * b for a, b in zip(v, vector)) for v in self._vectors]
+        top = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k]
+        return [(self._ids[i], scores[i]) for i in top]
+
+
+class HNSWIndex(VectorIndex):
+    """Índice aproximado HNSW (requiere hnswlib)"""
+
+    def __init__(self, dim: int, capacity: int = 10000):
+        if hnswlib is None:
+            raise ImportError("hnswlib no está instalado (pip install hnswlib)")
+        super().__init__(dim, capacity)
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=200, M=16, allow_replace_deleted=True)
+        self._index.set_ef(64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, item_id: int, vector: Vector):
+        if self._count >= self._index.get_max_elements():
+            self._index.resize_index(self._index.get_max_elements() * 2)
+        self._index.add_items([vector], [item_id], replace_deleted=True)
+        self._count += 1
+
+    def remove(self, item_id: int):
+        try:
+            self._index.mark_deleted(item_id)
+            self._count -= 1
+        except RuntimeError:
+            pass
+
+    def search(self, vector: Vector, k: int = 1) -> List[Tuple[int, float]]:
+        if self._count == 0:
+            return []
+        labels, distances = self._index.knn_query([vector], k=min(k, self._count))
+        # hnswlib devuelve distancia coseno (1 - similitud)
+        return [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+
+# Índices disponibles; se pueden registrar otros con el mismo interfaz
+INDEX_TYPES: Dict[str, type] = {
+    "bruteforce": BruteForceIndex,
+    "hnsw": HNSWIndex
+}
+
+
+# --- Embeddings por lotes ---
+
+class EmbeddingBatcher:
+    """Agrupa las peticiones de embeddings concurrentes en una sola llamada"""
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[List[Vector]]],
+        max_batch: int = 32,
+        max_delay: float = 0.01,
+        stats_manager=None
+    ):
+        """
+        Inicializa el agrupador
+
+        Args:
+            embed: Corrutina que recibe varios textos y devuelve sus vectores
+            max_batch: Textos máximos por llamada
+            max_delay: Segundos máximos que espera un texto a que se llene el lote
+            stats_manager: StatsManager opcional donde registrar los lotes
+        """
+        self.embed_many = embed
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats_manager = stats_manager
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def embed(self, text: str) -> Vector:
+        """
+        Calcula el embedding de un texto (compartiendo llamada con otros)
+
+        Args:
+            text: Texto a convertir
+
+        Returns:
+            Vector de embeddings
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Lanza la llamada con los textos acumulados"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        """
+        Ejecuta un lote y reparte los resultados
+
+        Args:
+            batch: Pares (texto, futuro) a resolver
+        """
+        try:
+            vectors = await self.embed_many([text for text, _ in batch])
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        if self.stats_manager:
+            self.stats_manager.add_embedding_batch(len(batch))
+
+
+# --- Caché semántica ---
+
+class _Scope:
+    """Índice y respuestas de un modelo + personalidad"""
+
+    __slots__ = ("index", "entries")
+
+    def __init__(self, index: VectorIndex):
+        self.index = index
+        # id -> (prompt, respuesta, vector, creado); en orden de inserción
+        self.entries: "OrderedDict[int, Tuple[str, str, Vector, float]]" = OrderedDict()
+
+
+class SemanticCache:
+    """Caché de respuestas por similitud de embeddings, separada por personalidad"""
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[Vector]],
+        threshold: float = 0.92,
+        max_entries: int = 5000,
+        ttl: float = 86400,
+        index_type: str = "bruteforce",
+        persist_file: Optional[str] = None,
+        max_prompt_length: int = 500,
+        stats_manager=None
+    ):
+        """
+        Inicializa la caché
+
+        Args:
+            embed: Corrutina que devuelve el embedding de un texto
+            threshold: Similitud coseno mínima para reutilizar una respuesta
+            max_entries: Respuestas máximas por ámbito (se expulsan las más antiguas)
+            ttl: Segundos de validez de cada respuesta
+            index_type: Clave de INDEX_TYPES ("bruteforce" o "hnsw")
+            persist_file: Archivo JSON donde guardar la caché (None = solo memoria)
+            max_prompt_length: Prompts más largos no se buscan ni se guardan
+            stats_manager: StatsManager opcional donde registrar aciertos y fallos
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Índice no válido: {index_type}")
+
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_type = index_type
+        self.persist_file = Path(persist_file) if persist_file else None
+        self.max_prompt_length = max_prompt_length
+        self.stats_manager = stats_manager
+
+        self._scopes: Dict[Tuple[str, str], _Scope] = {}
+        self._next_id = 0
+        self._dirty = False
+
+        if self.persist_file:
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(len(scope.entries) for scope in self._scopes.values())
+
+    def _scope(self, model: str, personality: str, dim: int) -> _Scope:
+        """Obtiene (o crea) el ámbito de un modelo + personalidad"""
+        key = (model, personality)
+        scope = self._scopes.get(key)
+        if scope is None:
+            index = INDEX_TYPES[self.index_type](dim, capacity=self.max_entries + 1)
+            scope = self._scopes[key] = _Scope(index)
+        return scope
+
+    async def lookup(
+        self,
+        model: str,
+        personality: str,
+        prompt: str
+    ) -> Tuple[Optional[str], Optional[Vector]]:
+        """
+        Busca una respuesta a una pregunta parecida
+
+        Args:
+            model: Modelo de Ollama
+            personality: Personalidad activa (solo se buscan sus respuestas)
+            prompt: Mensaje del usuario
+
+        Returns:
+            Tupla (respuesta o None, embedding normalizado del prompt para
+            store(); None si el prompt no es cacheable)
+        """
+        if len(prompt) > self.max_prompt_length or not prompt.strip():
+            return None, None
+
+        vector = normalize(await self.embed(prompt))
+        scope = self._scopes.get((model, personality))
+
+        response = None
+        similarity = 0.0
+        if scope is not None:
+            for item_id, score in scope.index.search(vector, k=1):
+                entry = scope.entries.get(item_id)
+                if entry is None:
+                    continue
+                if time.time() - entry[3] > self.ttl:
+                    self._remove(scope, item_id)
+                    continue
+                similarity = score
+                if score >= self.threshold:
+                    response = entry[1]
+
+        if self.stats_manager:
+            self.stats_manager.add_semantic_lookup(response is not None, similarity, len(self))
+
+        return response, vector
+
+    def store(self, model: str, personality: str, prompt: str, vector: Vector, response: str):
+        """
+        Guarda una respuesta generada
+
+        Args:
+            model: Modelo de Ollama
+            personality: Personalidad con la que se generó
+            prompt: Mensaje del usuario
+            vector: Embedding normalizado devuelto por lookup()
+            response: Respuesta generada
+        """
+        if not response:
+            return
+
+        scope = self._scope(model, personality, len(vector))
+        item_id = self._next_id
+        self._next_id += 1
+
+        scope.index.add(item_id, vector)
+        scope.entries[item_id] = (prompt, response, vector, time.time())
+        while len(scope.entries) > self.max_entries:
+            self._remove(scope, next(iter(scope.entries)))
+        self._dirty = True
+
+    def _remove(self, scope: _Scope, item_id: int):
+        """Elimina una respuesta de un ámbito"""
+        scope.entries.pop(item_id, None)
+        scope.index.remove(item_id)
+        self._dirty = True
+
+    def save(self):
+        """Guarda la caché en disco (si hay cambios y archivo configurado)"""
+        if not self.persist_file or not self._dirty:
+            return
+
+        data = {
+            "scopes": [
+                {
+                    "model": model,
+                    "personality": personality,
+                    "entries": [
+                        {"prompt": p, "response": r, "vector": v, "created": c}
+                        for p, r, v, c in scope.entries.values()
+                    ]
+                }
+                for (model, personality), scope in self._scopes.items()
+            ]
+        }
+        atomic_write(self.persist_file, json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        self._dirty = False
+
+    def load(self):
+        """Carga la caché desde disco reconstruyendo los índices"""
+        if not self.persist_file or not self.persist_file.exists():
+            return
+
+        try:
+            with open(self.persist_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error cargando la caché semántica: {e}")
+            return
+
+        now = time.time()
+        for scope_data in data.get("scopes", []):
+            for entry in scope_data["entries"]:
+                if now - entry["created"] > self.ttl:
+                    continue
+                scope = self._scope(scope_data["model"], scope_data["personality"], len(entry["vector"]))
+                item_id = self._next_id
+                self._next_id += 1
+                scope.index.add(item_id, entry["vector"])
+                scope.entries[item_id] = (entry["prompt"], entry["response"], entry["vector"], entry["created"])
+
+    def get_status(self) -> Dict:
+        """
+        Obtiene el estado actual de la caché
+
+        Returns:
+            Diccionario con entradas por ámbito y configuración
+        """
+        return {
+            "entries": len(self),
+            "scopes": {f"{m}:{p}": len(s.entries) for (m, p), s in self._scopes.items()},
+            "threshold": self.threshold,
+            "index": self.index_type,
+            "numpy": np is not None
+        }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import hashlib
+    import re
+    import tempfile
+
+    def stub_embeddings(texts: List[str]) -> List[Vector]:
+        """Embeddings locales de prueba: bolsa de palabras con hashing"""
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 64
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+    async def demo():
+        calls = []
+
+        async def embed_many(texts: List[str]) -> List[Vector]:
+            calls.append(len(texts))
+            return stub_embeddings(texts)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            batcher = EmbeddingBatcher(embed_many)
+            cache = SemanticCache(batcher.embed, threshold=0.7, persist_file=f"{tmp}/semantic.json")
+
+            _, vector = await cache.lookup("llama3.2", "amigo", "cuáles son las reglas del servidor")
+            cache.store("llama3.2", "amigo", "cuáles son las reglas del servidor", vector, "Sé amable y no hagas spam.")
+
+            for personality, prompt in [
+                ("amigo", "dime las reglas del servidor"),
+                ("profesional", "dime las reglas del servidor"),
+                ("amigo", "qué tiempo hace hoy"),
+            ]:
+                response, _ = await cache.lookup("llama3.2", personality, prompt)
+                print(f"{'✅' if response else '❌'} [{personality}] {prompt!r} -> {response}")
+
+            # Varias búsquedas simultáneas comparten una llamada de embeddings
+            calls.clear()
+            await asyncio.gather(*[cache.lookup("llama3.2", "amigo", f"pregunta {n}") for n in range(10)])
+            print(f"\n📦 10 búsquedas concurrentes -> {len(calls)} llamada(s) de embeddings")
+
+            cache.save()
+            reloaded = SemanticCache(batcher.embed, threshold=0.7, persist_file=f"{tmp}/semantic.json")
+            print(f"💾 Recargada desde disco: {reloaded.get_status()}")
+
+    asyncio.run(demo())
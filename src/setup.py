@@ -120,6 +120,7 @@ def install_all_dependencies() -> bool:
         ("discord.py>=2.6.4", "discord.py (Discord API)"),
         ("python-dotenv>=1.2.1", "python-dotenv (Variables de entorno)"),
         ("requests>=2.32.5", "requests (HTTP client)"),
+        ("aiohttp>=3.9.0", "aiohttp (HTTP client asíncrono)"),
         ("flask>=3.1.2", "Flask (Web server)"),
         ("flask-cors>=6.0.2", "Flask-CORS (CORS support)")
     ]
@@ -160,6 +161,7 @@ def verify_all_imports() -> bool:
         ("discord", "discord.py"),
         ("dotenv", "python-dotenv"),
         ("requests", "requests"),
+        ("aiohttp", "aiohttp"),
         ("flask", "Flask"),
         ("flask_cors", "Flask-CORS")
     ]
@@ -193,6 +195,7 @@ def create_requirements_file():
 discord.py>=2.6.4
 python-dotenv>=1.2.1
 requests>=2.32.5
+aiohttp>=3.9.0
 flask>=3.1.2
 flask-cors>=6.0.2
 """
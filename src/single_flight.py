@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Agrupación de Peticiones Idénticas
+Las peticiones concurrentes con la misma clave comparten una sola generación
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+# Callback que recibe cada token generado
+TokenCallback = Callable[[str], Awaitable[None]]
+
+
+class _Flight:
+    """Generación en curso y las peticiones que esperan su resultado"""
+
+    __slots__ = ("tokens", "listeners", "done", "result", "error")
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.listeners: List[asyncio.Queue] = []
+        self.done = asyncio.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplica generaciones concurrentes idénticas (single-flight)"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def run(
+        self,
+        key: Hashable,
+        func: Callable[[TokenCallback], Awaitable[Any]],
+        on_token: Optional[TokenCallback] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Ejecuta una generación o se une a la que ya está en curso con la misma clave
+
+        El primero en llegar (líder) ejecuta `func`, que recibe una función
+        `emit(token)` con la que publicar lo generado. Los demás (seguidores)
+        reciben primero los tokens ya emitidos y después los nuevos, y al final
+        el mismo resultado (o la misma excepción) que el líder.
+
+        Args:
+            key: Clave de la petición (p. ej. la clave de la caché de respuestas)
+            func: Corrutina que realiza la generación y devuelve su resultado
+            on_token: Callback opcional para recibir los tokens
+
+        Returns:
+            Tupla (resultado, True si esta petición fue la que generó)
+
+        Raises:
+            Exception: La excepción lanzada por `func`
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            return await self._lead(key, func, on_token), True
+        return await self._follow(flight, on_token), False
+
+    async def _lead(
+        self,
+        key: Hashable,
+        func: Callable[[TokenCallback], Awaitable[Any]],
+        on_token: Optional[TokenCallback]
+    ) -> Any:
+        """Ejecuta la generación y reparte sus tokens y su resultado"""
+        flight = _Flight()
+        self._flights[key] = flight
+
+        async def emit(token: str):
+            flight.tokens.append(token)
+            for queue in flight.listeners:
+                queue.put_nowait(token)
+            if on_token is not None:
+                await on_token(token)
+
+        try:
+            flight.result = await func(emit)
+            return flight.result
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("La generación compartida se canceló")
+            raise
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done.set()
+            for queue in flight.listeners:
+                queue.put_nowait(None)
+
+    async def _follow(self, flight: _Flight, on_token: Optional[TokenCallback]) -> Any:
+        """Espera el resultado de una generación ajena, recibiendo sus tokens"""
+        if on_token is not None:
+            queue: asyncio.Queue = asyncio.Queue()
+            flight.listeners.append(queue)
+            try:
+                # Lo ya generado llega de una vez; el resto, token a token
+                if flight.tokens:
+                    await on_token("".join(flight.tokens))
+                while True:
+                    token = await queue.get()
+                    if token is None:
+                        break
+                    await on_token(token)
+            finally:
+                flight.listeners.remove(queue)
+
+        await flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+
+    async def demo():
+        flights = SingleFlight()
+        generations = 0
+
+        async def generate(emit: TokenCallback) -> str:
+            nonlocal generations
+            generations += 1
+            for word in "La respuesta a la pregunta del anuncio".split():
+                await asyncio.sleep(0.05)
+                await emit(word + " ")
+            return "La respuesta a la pregunta del anuncio"
+
+        async def user(n: int) -> Tuple[str, bool, str]:
+            await asyncio.sleep(n * 0.04)
+            received = []
+
+            async def on_token(token: str):
+                received.append(token)
+
+            result, leader = await flights.run(("llama3.2", "amigo", "que hay de nuevo"), generate, on_token)
+            return result, leader, "".join(received).strip()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[user(n) for n in range(10)])
+        elapsed = time.perf_counter() - start
+
+        for n, (result, leader, streamed) in enumerate(results):
+            role = "líder" if leader else "seguidor"
+            print(f"{'👑' if leader else '🔗'} Usuario {n} ({role}): {streamed == result}")
+        print(f"\n✅ {len(results)} peticiones, {generations} generación(es) en {elapsed:.2f}s")
+
+    asyncio.run(demo())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Respuesta Especulativa
+Responde rápido con un modelo borrador y lo sustituye por la respuesta completa
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+# Resultados de una respuesta especulativa
+REFINED = "refined"            # Se mostró el borrador y después la respuesta completa
+CANCELLED = "cancelled"        # El usuario escribió antes: se queda el borrador
+FINAL_FIRST = "final_first"    # La respuesta completa llegó antes que el borrador
+DRAFT_FAILED = "draft_failed"  # El borrador falló o tardó demasiado
+FINAL_FAILED = "final_failed"  # La respuesta completa falló: se queda el borrador
+
+
+class SpeculativeResponder:
+    """Coordina el borrador rápido y la respuesta completa de cada mensaje"""
+
+    def __init__(
+        self,
+        busy_messages: int = 5,
+        busy_window: float = 60.0,
+        draft_timeout: float = 10.0,
+        stats_manager=None
+    ):
+        """
+        Inicializa el coordinador
+
+        Args:
+            busy_messages: Mensajes en la ventana a partir de los que un canal
+                está "concurrido" (0 = especular siempre)
+            busy_window: Segundos de la ventana de actividad por canal
+            draft_timeout: Segundos máximos de espera por el borrador
+            stats_manager: StatsManager opcional donde registrar latencias y resultados
+        """
+        self.busy_messages = busy_messages
+        self.busy_window = busy_window
+        self.draft_timeout = draft_timeout
+        self.stats_manager = stats_manager
+
+        self._activity: Dict[int, Deque[float]] = {}
+        self._pending: Dict[int, Tuple[int, asyncio.Task]] = {}
+
+    def observe(self, channel_id: int):
+        """
+        Registra un mensaje en un canal (para medir su actividad)
+
+        Args:
+            channel_id: ID del canal
+        """
+        now = time.monotonic()
+        times = self._activity.setdefault(channel_id, deque())
+        times.append(now)
+        while times and now - times[0] > self.busy_window:
+            times.popleft()
+
+        # Olvidar canales sin actividad reciente
+        if len(self._activity) > 1000:
+            for idle in [c for c, t in self._activity.items() if not t or now - t[-1] > self.busy_window]:
+                del self._activity[idle]
+
+    def is_busy(self, channel_id: int) -> bool:
+        """Indica si un canal tiene suficiente actividad para especular"""
+        if self.busy_messages <= 0:
+            return True
+        now = time.monotonic()
+        times = self._activity.get(channel_id, ())
+        return sum(1 for t in times if now - t <= self.busy_window) >= self.busy_messages
+
+    def is_pending(self, user_id: int) -> bool:
+        """Indica si un usuario tiene una respuesta completa pendiente de un borrador"""
+        return user_id in self._pending
+
+    def cancel(self, user_id: int, channel_id: Optional[int] = None) -> bool:
+        """
+        Cancela la respuesta completa pendiente de un usuario (se queda el borrador)
+
+        Args:
+            user_id: ID del usuario que ha vuelto a escribir
+            channel_id: Solo cancelar si la respuesta pendiente es de este canal
+
+        Returns:
+            True si había una respuesta pendiente y se ha cancelado
+        """
+        pending = self._pending.get(user_id)
+        if pending is None or (channel_id is not None and pending[0] != channel_id):
+            return False
+        pending[1].cancel()
+        return True
+
+    async def run(
+        self,
+        user_id: int,
+        channel_id: int,
+        draft: Callable[[], Awaitable[str]],
+        final: Callable[[], Awaitable[str]],
+        show_draft: Callable[[str], Awaitable[None]]
+    ) -> Tuple[str, str]:
+        """
+        Lanza borrador y respuesta completa en paralelo
+
+        El borrador se muestra en cuanto llega (con `show_draft`) salvo que la
+        respuesta completa llegue antes. Publicar la respuesta definitiva
+        queda a cargo de quien llama.
+
+        Args:
+            user_id: ID del usuario
+            channel_id: ID del canal
+            draft: Corrutina que genera el borrador con el modelo rápido
+            final: Corrutina que genera la respuesta completa
+            show_draft: Corrutina que publica el borrador
+
+        Returns:
+            Tupla (respuesta definitiva, resultado: refined, cancelled,
+            final_first, draft_failed o final_failed); la respuesta está
+            vacía si se canceló antes de mostrar nada
+
+        Raises:
+            Exception: La excepción de `final` si no había borrador que mostrar
+        """
+        start = time.monotonic()
+        final_task = asyncio.create_task(final())
+        draft_task = asyncio.create_task(draft())
+        self._pending[user_id] = (channel_id, final_task)
+
+        draft_latency = 0.0
+        draft_text = ""
+        try:
+            await asyncio.wait(
+                {final_task, draft_task},
+                timeout=self.draft_timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if draft_task.done() and not draft_task.cancelled() and draft_task.exception() is None:
+                draft_text = draft_task.result().strip()
+
+            if final_task.done() and not final_task.cancelled():
+                outcome = FINAL_FIRST
+            elif draft_text:
+                draft_latency = time.monotonic() - start
+                await show_draft(draft_text)
+                # Esperar la respuesta completa sin propagar su cancelación
+                await asyncio.wait({final_task})
+                if final_task.cancelled():
+                    outcome = CANCELLED
+                elif final_task.exception() is not None:
+                    outcome = FINAL_FAILED
+                else:
+                    outcome = REFINED
+            else:
+                await asyncio.wait({final_task})
+                outcome = CANCELLED if final_task.cancelled() else DRAFT_FAILED
+        except asyncio.CancelledError:
+            final_task.cancel()
+            raise
+        finally:
+            draft_task.cancel()
+            if self._pending.get(user_id, (None, None))[1] is final_task:
+                del self._pending[user_id]
+
+        # Si se canceló antes de que hubiera borrador, no hay respuesta ("")
+        if outcome in (CANCELLED, FINAL_FAILED):
+            response = draft_text
+        else:
+            response = final_task.result()
+
+        if self.stats_manager:
+            self.stats_manager.add_speculative_reply(
+                outcome,
+                draft_latency,
+                time.monotonic() - start if outcome not in (CANCELLED, FINAL_FAILED) else 0.0
+            )
+        return response, outcome
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    async def demo():
+        responder = SpeculativeResponder(busy_messages=3)
+
+        for _ in range(3):
+            responder.observe(10)
+        print(f"📈 Canal 10 concurrido: {responder.is_busy(10)} | canal 20: {responder.is_busy(20)}")
+
+        async def scenario(name: str, draft_delay: float, final_delay: float, interrupt_after: float = 0):
+            start = time.monotonic()
+
+            async def draft() -> str:
+                await asyncio.sleep(draft_delay)
+                return "Borrador rápido"
+
+            async def final() -> str:
+                await asyncio.sleep(final_delay)
+                return "Respuesta completa y detallada"
+
+            async def show_draft(text: str):
+                print(f"   ✏️  {time.monotonic() - start:.2f}s borrador: {text}")
+
+            if interrupt_after:
+                asyncio.get_running_loop().call_later(interrupt_after, responder.cancel, 1)
+
+            response, outcome = await responder.run(1, 10, draft, final, show_draft)
+            print(f"   ✅ {time.monotonic() - start:.2f}s [{outcome}] {response}")
+
+        print("\n🧪 Borrador y refinado:")
+        await scenario("refinado", 0.1, 0.5)
+        print("🧪 El usuario vuelve a escribir:")
+        await scenario("cancelado", 0.1, 1.0, interrupt_after=0.3)
+        print("🧪 La respuesta completa llega antes:")
+        await scenario("final primero", 0.5, 0.1)
+
+    asyncio.run(demo())
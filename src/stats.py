@@ -11,131 +11,566 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from collections import defaultdict
 
+from storage import ROLLUP_RESOLUTIONS, JSONStorage, StorageBackend, empty_rollup
+
 
 class StatsManager:
     """Gestor de estadísticas del bot"""
     
-    def __init__(self, data_file: str = "data/stats.json"):
+    # Valores iniciales de los grupos de métricas auxiliares
+    METRIC_DEFAULTS = {
+        "queue": {
+            "total_served": 0,
+            "total_queued": 0,
+            "total_wait_time": 0,
+            "max_wait_time": 0,
+            "max_position": 0,
+            "rejected": 0,
+            "current_depth": 0
+        },
+        "conversations": {
+            "resident_users": 0,
+            "resident_messages": 0,
+            "resident_bytes": 0,
+            "max_users": 0,
+            "hits": 0,
+            "loads": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+            "spilled": 0,
+            "reloaded": 0
+        },
+        "context": {
+            "builds": 0,
+            "truncated_builds": 0,
+            "dropped_messages": 0,
+            "truncated_messages": 0,
+            "total_tokens": 0,
+            "max_tokens": 0
+        },
+        "summary": {
+            "completed": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "skipped": 0,
+            "messages_summarized": 0,
+            "total_time": 0
+        },
+        "response_cache": {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "entries": 0,
+            "bytes": 0
+        },
+        "semantic_cache": {
+            "hits": 0,
+            "misses": 0,
+            "entries": 0,
+            "total_hit_similarity": 0,
+            "embed_batches": 0,
+            "embed_inputs": 0
+        },
+        "coalescing": {
+            "leaders": 0,
+            "followers": 0,
+            "saved_tokens": 0
+        },
+        "adaptive": {
+            "num_predict": 0,
+            "num_ctx": 0,
+            "num_thread": 0,
+            "p95": 0,
+            "queue_depth": 0,
+            "shrink": 0,
+            "grow": 0
+        },
+        "speculative": {
+            "refined": 0,
+            "cancelled": 0,
+            "final_first": 0,
+            "draft_failed": 0,
+            "final_failed": 0,
+            "total_draft_latency": 0,
+            "total_final_latency": 0
+        }
+    }
+    
+    def __init__(
+        self,
+        data_file: str = "data/stats.json",
+        flush_interval: float = 5.0,
+        flush_threshold: int = 100,
+        storage: Optional[StorageBackend] = None
+    ):
         """
         Inicializa el gestor de estadísticas
         
+        Sin `storage` se usa el backend JSON clásico sobre `data_file`, que
+        acumula los cambios en memoria y los escribe en segundo plano cada
+        `flush_interval` segundos, al acumular `flush_threshold` cambios o
+        al cerrar.
+        
+        Args:
+            data_file: Archivo donde guardar las estadísticas (backend JSON)
+            flush_interval: Segundos máximos entre escrituras a disco
+            flush_threshold: Cambios pendientes que fuerzan una escritura
+            storage: Backend de almacenamiento compartido (opcional)
+        """
+        if storage is None:
+            data_path = Path(data_file)
+            storage = JSONStorage(
+                data_dir=str(data_path.parent),
+                stats_file=str(data_path),
+                flush_interval=flush_interval,
+                flush_threshold=flush_threshold
+            )
+        self.storage = storage
+    
+    def flush(self):
+        """Escribe los cambios pendientes"""
+        self.storage.flush()
+    
+    def close(self):
+        """Vuelca los cambios pendientes y libera el backend"""
+        self.storage.close()
+    
+    def add_interaction(self, user_id: int, tokens_used: int, response_time: float):
+        """
+        Registra una interacción
+        
         Args:
-            data_file: Archivo donde guardar las estadísticas
+            user_id: ID del usuario
+            tokens_used: Tokens utilizados en la respuesta
+            response_time: Tiempo de respuesta en segundos
+        """
+        self.storage.record_interaction(str(user_id), tokens_used, response_time, datetime.now())
+    
+    def add_command(self, command: str):
         """
-        self.data_file = Path(data_file)
-        self.data_file.parent.mkdir(exist_ok=True)
+        Registra el uso de un comando
         
-        # Cargar estadísticas existentes
-        self.stats = self._load_stats()
+        Args:
+            command: Nombre del comando ejecutado
+        """
+        self.storage.record_command(command)
     
-    def _load_stats(self) -> Dict:
+    def get_metrics(self, group: str) -> Dict:
         """
-        Carga las estadísticas desde el archivo
+        Obtiene un grupo de métricas auxiliares con sus valores por defecto
         
+        Args:
+            group: Nombre del grupo (queue, ...)
+            
         Returns:
-            Diccionario con las estadísticas
+            Diccionario con las métricas del grupo
+        """
+        metrics = dict(self.METRIC_DEFAULTS.get(group, {}))
+        metrics.update(self.storage.get_metrics(group))
+        return metrics
+    
+    def add_queue_wait(self, position: int, wait_time: float, depth: int):
+        """
+        Registra el paso de una generación por la cola
+        
+        Args:
+            position: Posición inicial en la cola (0 si no tuvo que esperar)
+            wait_time: Segundos esperando turno
+            depth: Peticiones que siguen en espera
+        """
+        self.storage.update_metrics(
+            "queue",
+            increments={
+                "total_served": 1,
+                "total_queued": 1 if position > 0 else 0,
+                "total_wait_time": wait_time
+            },
+            maxima={"max_wait_time": wait_time, "max_position": position},
+            values={"current_depth": depth}
+        )
+    
+    def add_queue_rejection(self, depth: int):
+        """
+        Registra una petición rechazada por cola llena
+        
+        Args:
+            depth: Peticiones en espera en el momento del rechazo
         """
-        if self.data_file.exists():
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return self._create_default_stats()
-        return self._create_default_stats()
+        self.storage.update_metrics(
+            "queue",
+            increments={"rejected": 1},
+            values={"current_depth": depth}
+        )
     
-    def _create_default_stats(self) -> Dict:
+    def get_queue_stats(self) -> Dict:
         """
-        Crea estructura de estadísticas por defecto
+        Obtiene estadísticas de la cola de generaciones
         
         Returns:
-            Diccionario con estructura vacía
-        """
-        return {
-            "global": {
-                "total_messages": 0,
-                "total_tokens": 0,
-                "total_response_time": 0,
-                "start_date": datetime.now().isoformat(),
-                "last_interaction": None
+            Diccionario con esperas, posiciones y rechazos
+        """
+        queue = self.get_metrics("queue")
+        
+        if queue["total_served"] > 0:
+            queue["avg_wait_time"] = queue["total_wait_time"] / queue["total_served"]
+        else:
+            queue["avg_wait_time"] = 0
+        
+        return queue
+    
+    def set_conversation_metrics(self, metrics: Dict):
+        """
+        Publica las métricas de memoria del almacén de conversaciones
+        
+        Args:
+            metrics: Resultado de ConversationStore.get_metrics()
+        """
+        self.storage.update_metrics("conversations", values=metrics)
+    
+    def get_conversation_stats(self) -> Dict:
+        """
+        Obtiene las métricas del almacén de conversaciones
+        
+        Returns:
+            Diccionario con usuarios residentes, memoria y expulsiones
+        """
+        return self.get_metrics("conversations")
+    
+    def add_context_build(self, included: int, dropped: int, truncated: int, tokens: int):
+        """
+        Registra una decisión del constructor de contexto
+        
+        Args:
+            included: Mensajes incluidos en el prompt
+            dropped: Mensajes descartados por falta de presupuesto
+            truncated: Mensajes recortados (0 o 1)
+            tokens: Tokens estimados del prompt
+        """
+        self.storage.update_metrics(
+            "context",
+            increments={
+                "builds": 1,
+                "truncated_builds": 1 if dropped or truncated else 0,
+                "dropped_messages": dropped,
+                "truncated_messages": truncated,
+                "total_tokens": tokens
             },
-            "users": {},
-            "hourly": {str(i): 0 for i in range(24)},
-            "commands": {}
-        }
+            maxima={"max_tokens": tokens}
+        )
     
-    def _save_stats(self):
-        """Guarda las estadísticas en el archivo"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error guardando estadísticas: {e}")
+    def get_context_stats(self) -> Dict:
+        """
+        Obtiene estadísticas del constructor de contexto
+        
+        Returns:
+            Diccionario con recortes y tokens medios por prompt
+        """
+        context = self.get_metrics("context")
+        
+        if context["builds"] > 0:
+            context["avg_tokens"] = context["total_tokens"] / context["builds"]
+        else:
+            context["avg_tokens"] = 0
+        
+        return context
     
-    def add_interaction(self, user_id: int, tokens_used: int, response_time: float):
+    def add_summary_run(self, status: str, messages: int, duration: float):
         """
-        Registra una interacción
+        Registra la ejecución de un resumen de conversación
         
         Args:
-            user_id: ID del usuario
-            tokens_used: Tokens utilizados en la respuesta
-            response_time: Tiempo de respuesta en segundos
+            status: "completed", "cancelled", "failed" o "skipped"
+            messages: Mensajes incorporados al resumen
+            duration: Segundos empleados
         """
-        user_id_str = str(user_id)
-        now = datetime.now()
+        self.storage.update_metrics(
+            "summary",
+            increments={
+                status: 1,
+                "messages_summarized": messages,
+                "total_time": duration
+            }
+        )
+    
+    def add_cache_lookup(self, hit: bool, entries: int, size: int):
+        """
+        Registra una consulta a la caché de respuestas
         
-        # Estadísticas globales
-        self.stats["global"]["total_messages"] += 1
-        self.stats["global"]["total_tokens"] += tokens_used
-        self.stats["global"]["total_response_time"] += response_time
-        self.stats["global"]["last_interaction"] = now.isoformat()
-        
-        # Estadísticas por usuario
-        if user_id_str not in self.stats["users"]:
-            self.stats["users"][user_id_str] = {
-                "total_messages": 0,
-                "total_tokens": 0,
-                "total_response_time": 0,
-                "first_interaction": now.isoformat(),
-                "last_interaction": now.isoformat(),
-                "interactions": []
+        Args:
+            hit: Si se encontró una respuesta válida
+            entries: Entradas actuales de la caché
+            size: Bytes ocupados por la caché
+        """
+        self.storage.update_metrics(
+            "response_cache",
+            increments={"hits" if hit else "misses": 1},
+            values={"entries": entries, "bytes": size}
+        )
+    
+    def add_cache_store(self, evicted: int, entries: int, size: int):
+        """
+        Registra una respuesta guardada en la caché
+        
+        Args:
+            evicted: Entradas expulsadas para hacerle sitio
+            entries: Entradas actuales de la caché
+            size: Bytes ocupados por la caché
+        """
+        self.storage.update_metrics(
+            "response_cache",
+            increments={"stores": 1, "evictions": evicted},
+            values={"entries": entries, "bytes": size}
+        )
+    
+    def get_cache_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de la caché de respuestas
+        
+        Returns:
+            Diccionario con aciertos, fallos, tasa de acierto y tamaño
+        """
+        cache = self.get_metrics("response_cache")
+        lookups = cache["hits"] + cache["misses"]
+        cache["hit_rate"] = cache["hits"] / lookups if lookups > 0 else 0
+        return cache
+    
+    def add_semantic_lookup(self, hit: bool, similarity: float, entries: int):
+        """
+        Registra una consulta a la caché semántica
+        
+        Args:
+            hit: Si se reutilizó una respuesta
+            similarity: Similitud coseno del vecino más próximo
+            entries: Respuestas guardadas en la caché
+        """
+        self.storage.update_metrics(
+            "semantic_cache",
+            increments={
+                "hits" if hit else "misses": 1,
+                "total_hit_similarity": similarity if hit else 0
+            },
+            values={"entries": entries}
+        )
+    
+    def add_embedding_batch(self, size: int):
+        """
+        Registra una llamada de embeddings por lotes
+        
+        Args:
+            size: Textos incluidos en la llamada
+        """
+        self.storage.update_metrics(
+            "semantic_cache",
+            increments={"embed_batches": 1, "embed_inputs": size}
+        )
+    
+    def get_semantic_cache_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de la caché semántica
+        
+        Returns:
+            Diccionario con aciertos, fallos, similitud media y tamaño de lote medio
+        """
+        cache = self.get_metrics("semantic_cache")
+        lookups = cache["hits"] + cache["misses"]
+        cache["hit_rate"] = cache["hits"] / lookups if lookups > 0 else 0
+        cache["avg_hit_similarity"] = cache["total_hit_similarity"] / cache["hits"] if cache["hits"] > 0 else 0
+        cache["avg_batch_size"] = (
+            cache["embed_inputs"] / cache["embed_batches"] if cache["embed_batches"] > 0 else 0
+        )
+        return cache
+    
+    def add_coalesced_request(self, leader: bool, tokens: int = 0):
+        """
+        Registra una petición que compartió generación con otras idénticas
+        
+        Args:
+            leader: Si fue la petición que llamó a Ollama
+            tokens: Tokens de la generación compartida (ahorrados si es seguidora)
+        """
+        self.storage.update_metrics(
+            "coalescing",
+            increments={
+                "leaders" if leader else "followers": 1,
+                "saved_tokens": 0 if leader else tokens
             }
+        )
+    
+    def get_coalescing_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de la agrupación de peticiones idénticas
         
-        user_stats = self.stats["users"][user_id_str]
-        user_stats["total_messages"] += 1
-        user_stats["total_tokens"] += tokens_used
-        user_stats["total_response_time"] += response_time
-        user_stats["last_interaction"] = now.isoformat()
+        Returns:
+            Diccionario con líderes, seguidores, tokens ahorrados y proporción ahorrada
+        """
+        coalescing = self.get_metrics("coalescing")
+        total = coalescing["leaders"] + coalescing["followers"]
+        coalescing["saved_ratio"] = coalescing["followers"] / total if total > 0 else 0
+        return coalescing
+    
+    def add_backend_request(self, backend: str, latency: float, error: bool):
+        """
+        Registra una petición a un servidor Ollama del pool
         
-        # Guardar interacción detallada (últimas 100)
-        user_stats["interactions"].append({
-            "timestamp": now.isoformat(),
-            "tokens": tokens_used,
-            "response_time": response_time
-        })
+        Args:
+            backend: Nombre del servidor (host:puerto)
+            latency: Segundos hasta completar la petición
+            error: Si la petición falló
+        """
+        self.storage.update_metrics(
+            "backends",
+            increments={
+                f"{backend}|requests": 1,
+                f"{backend}|errors": 1 if error else 0,
+                f"{backend}|total_latency": latency
+            },
+            maxima={f"{backend}|max_latency": latency}
+        )
+    
+    def add_backend_ejection(self, backend: str):
+        """
+        Registra la expulsión temporal de un servidor tras un fallo de conexión
         
-        # Limitar a últimas 100 interacciones
-        if len(user_stats["interactions"]) > 100:
-            user_stats["interactions"] = user_stats["interactions"][-100:]
+        Args:
+            backend: Nombre del servidor (host:puerto)
+        """
+        self.storage.update_metrics("backends", increments={f"{backend}|ejections": 1})
+    
+    def set_backend_health(self, backend: str, healthy: bool):
+        """
+        Registra el resultado de la sonda de salud de un servidor
         
-        # Estadísticas por hora
-        hour = str(now.hour)
-        self.stats["hourly"][hour] = self.stats["hourly"].get(hour, 0) + 1
+        Args:
+            backend: Nombre del servidor (host:puerto)
+            healthy: Si respondió a /api/tags
+        """
+        self.storage.update_metrics("backends", values={f"{backend}|healthy": 1 if healthy else 0})
+    
+    def get_backend_stats(self) -> Dict[str, Dict]:
+        """
+        Obtiene estadísticas por servidor Ollama
         
-        # Guardar cambios
-        self._save_stats()
+        Returns:
+            Diccionario {servidor: peticiones, errores, expulsiones, latencias y salud}
+        """
+        backends = {}
+        for key, value in self.get_metrics("backends").items():
+            backend, _, name = key.rpartition("|")
+            backends.setdefault(backend, {
+                "requests": 0,
+                "errors": 0,
+                "ejections": 0,
+                "total_latency": 0,
+                "max_latency": 0,
+                "healthy": 1
+            })[name] = value
+        
+        for metrics in backends.values():
+            requests = metrics["requests"]
+            metrics["avg_latency"] = metrics["total_latency"] / requests if requests > 0 else 0
+            metrics["error_rate"] = metrics["errors"] / requests if requests > 0 else 0
+        return backends
     
-    def add_command(self, command: str):
+    def add_model_request(self, model: str, reason: str):
         """
-        Registra el uso de un comando
+        Registra la generación con un modelo elegido por el enrutador
         
         Args:
-            command: Nombre del comando ejecutado
+            model: Modelo de Ollama
+            reason: Regla que lo eligió (user, channel, tier, personality, large, small, default)
+        """
+        self.storage.update_metrics("models", increments={f"{model}|requests": 1})
+        self.storage.update_metrics("model_reasons", increments={reason: 1})
+    
+    def add_model_warmup(self, model: str, ok: bool):
+        """
+        Registra una precarga (keep_alive) de un modelo
+        
+        Args:
+            model: Modelo de Ollama
+            ok: Si algún servidor lo cargó
+        """
+        self.storage.update_metrics(
+            "models",
+            increments={f"{model}|warmups" if ok else f"{model}|warmup_failures": 1}
+        )
+    
+    def get_model_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de uso de modelos
+        
+        Returns:
+            Diccionario con peticiones y precargas por modelo y usos de cada regla
+        """
+        models = {}
+        for key, value in self.get_metrics("models").items():
+            model, _, name = key.rpartition("|")
+            models.setdefault(model, {"requests": 0, "warmups": 0, "warmup_failures": 0})[name] = value
+        return {"models": models, "reasons": self.get_metrics("model_reasons")}
+    
+    def set_adaptive_state(
+        self,
+        options: Dict,
+        p95: float = 0,
+        depth: int = 0,
+        action: Optional[str] = None
+    ):
         """
-        if command not in self.stats["commands"]:
-            self.stats["commands"][command] = 0
+        Publica el punto de operación del ajuste adaptativo
         
-        self.stats["commands"][command] += 1
-        self._save_stats()
+        Args:
+            options: Opciones actuales (num_predict, num_ctx y num_thread opcional)
+            p95: Latencia p95 reciente en segundos
+            depth: Peticiones en cola
+            action: Decisión tomada ("shrink" o "grow"; None = solo estado)
+        """
+        self.storage.update_metrics(
+            "adaptive",
+            increments={action: 1} if action else None,
+            values={
+                "num_predict": options["num_predict"],
+                "num_ctx": options["num_ctx"],
+                "num_thread": options.get("num_thread", 0),
+                "p95": p95,
+                "queue_depth": depth
+            }
+        )
+    
+    def add_speculative_reply(self, outcome: str, draft_latency: float, final_latency: float):
+        """
+        Registra una respuesta especulativa (borrador + respuesta completa)
+        
+        Args:
+            outcome: refined, cancelled, final_first, draft_failed o final_failed
+            draft_latency: Segundos hasta mostrar el borrador (0 si no se mostró)
+            final_latency: Segundos hasta la respuesta completa (0 si no se usó)
+        """
+        self.storage.update_metrics(
+            "speculative",
+            increments={
+                outcome: 1,
+                "total_draft_latency": draft_latency,
+                "total_final_latency": final_latency
+            }
+        )
+    
+    def get_speculative_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de las respuestas especulativas
+        
+        Returns:
+            Diccionario con resultados, latencias medias de borrador y respuesta
+            completa, y proporción de borradores sustituidos por la respuesta completa
+        """
+        speculative = self.get_metrics("speculative")
+        drafts = speculative["refined"] + speculative["cancelled"] + speculative["final_failed"]
+        finals = speculative["refined"] + speculative["final_first"] + speculative["draft_failed"]
+        speculative["drafts_shown"] = drafts
+        speculative["avg_draft_latency"] = speculative["total_draft_latency"] / drafts if drafts > 0 else 0
+        speculative["avg_final_latency"] = speculative["total_final_latency"] / finals if finals > 0 else 0
+        speculative["final_used_rate"] = speculative["refined"] / drafts if drafts > 0 else 0
+        return speculative
     
     def get_global_stats(self) -> Dict:
         """
@@ -144,7 +579,7 @@ class StatsManager:
         Returns:
             Diccionario con estadísticas globales
         """
-        global_stats = self.stats["global"].copy()
+        global_stats = self.storage.get_global()
         
         # Calcular promedios
         total_messages = global_stats["total_messages"]
@@ -155,8 +590,10 @@ class StatsManager:
             global_stats["avg_tokens"] = 0
             global_stats["avg_response_time"] = 0
         
-        # Añadir cantidad de usuarios únicos
-        global_stats["unique_users"] = len(self.stats["users"])
+        total_response_time = global_stats["total_response_time"]
+        global_stats["avg_tokens_per_second"] = (
+            global_stats["total_tokens"] / total_response_time if total_response_time > 0 else 0
+        )
         
         # Calcular uptime
         if global_stats["start_date"]:
@@ -177,13 +614,11 @@ class StatsManager:
         Returns:
             Diccionario con estadísticas del usuario o None
         """
-        user_id_str = str(user_id)
+        user_stats = self.storage.get_user(str(user_id))
         
-        if user_id_str not in self.stats["users"]:
+        if user_stats is None:
             return None
         
-        user_stats = self.stats["users"][user_id_str].copy()
-        
         # Calcular promedios
         total_messages = user_stats["total_messages"]
         if total_messages > 0:
@@ -194,15 +629,10 @@ class StatsManager:
             user_stats["avg_response_time"] = 0
         
         # Calcular actividad reciente (últimos 7 días)
-        if user_stats["interactions"]:
-            week_ago = datetime.now() - timedelta(days=7)
-            recent = [
-                i for i in user_stats["interactions"]
-                if datetime.fromisoformat(i["timestamp"]) > week_ago
-            ]
-            user_stats["recent_activity"] = len(recent)
-        else:
-            user_stats["recent_activity"] = 0
+        week_ago = (datetime.now() - timedelta(days=7)).isoformat()
+        user_stats["recent_activity"] = sum(
+            1 for i in user_stats["interactions"] if i["timestamp"] > week_ago
+        )
         
         return user_stats
     
@@ -218,9 +648,9 @@ class StatsManager:
         """
         users = []
         
-        for user_id, stats in self.stats["users"].items():
+        for stats in self.storage.get_top_users(limit):
             users.append({
-                "user_id": int(user_id),
+                "user_id": stats["user_id"],
                 "total_messages": stats["total_messages"],
                 "total_tokens": stats["total_tokens"],
                 "avg_response_time": (
@@ -229,10 +659,7 @@ class StatsManager:
                 )
             })
         
-        # Ordenar por mensajes totales
-        users.sort(key=lambda x: x["total_messages"], reverse=True)
-        
-        return users[:limit]
+        return users
     
     def get_hourly_distribution(self) -> Dict[int, int]:
         """
@@ -241,7 +668,48 @@ class StatsManager:
         Returns:
             Diccionario con hora -> cantidad de mensajes
         """
-        return {int(k): v for k, v in self.stats["hourly"].items()}
+        return self.storage.get_hourly()
+    
+    def get_rollup_series(self, resolution: str = "hour", points: int = 24) -> List[Dict]:
+        """
+        Obtiene la serie temporal de una resolución a partir de los agregados
+        
+        Los agregados se actualizan al registrar cada interacción, así que el
+        coste depende solo de `points`, no del historial acumulado.
+        
+        Args:
+            resolution: "minute", "hour" o "day"
+            points: Cubos más recientes a devolver (los que no tienen actividad van a cero)
+            
+        Returns:
+            Lista cronológica de cubos con bucket, messages, tokens,
+            avg_response_time, max_response_time y tokens_per_second
+            
+        Raises:
+            ValueError: Si la resolución no existe
+        """
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Resolución no válida: {resolution}")
+        
+        key_format = ROLLUP_RESOLUTIONS[resolution][0]
+        step = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}[resolution]
+        now = datetime.now()
+        keys = [(now - step * i).strftime(key_format) for i in reversed(range(points))]
+        buckets = self.storage.get_rollups(resolution, keys[0]) if keys else {}
+        
+        series = []
+        for key in keys:
+            bucket = buckets.get(key) or empty_rollup()
+            messages = bucket["messages"]
+            series.append({
+                "bucket": key,
+                "messages": messages,
+                "tokens": bucket["tokens"],
+                "avg_response_time": bucket["response_time"] / messages if messages > 0 else 0,
+                "max_response_time": bucket["max_response_time"],
+                "tokens_per_second": bucket["tokens"] / bucket["response_time"] if bucket["response_time"] > 0 else 0
+            })
+        return series
     
     def get_command_stats(self) -> Dict[str, int]:
         """
@@ -250,7 +718,7 @@ class StatsManager:
         Returns:
             Diccionario con comando -> cantidad de usos
         """
-        return self.stats["commands"].copy()
+        return self.storage.get_commands()
     
     def get_top_commands(self, limit: int = 10) -> List[tuple]:
         """
@@ -263,7 +731,7 @@ class StatsManager:
             Lista de tuplas (comando, usos) ordenada
         """
         commands = sorted(
-            self.stats["commands"].items(),
+            self.storage.get_commands().items(),
             key=lambda x: x[1],
             reverse=True
         )
@@ -280,21 +748,14 @@ class StatsManager:
         Returns:
             Diccionario con fecha -> cantidad de interacciones
         """
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.stats["users"]:
-            return {}
-        
-        interactions = self.stats["users"][user_id_str]["interactions"]
         cutoff = datetime.now() - timedelta(days=days)
+        interactions = self.storage.get_user_interactions(str(user_id), since=cutoff)
         
         timeline = defaultdict(int)
         
         for interaction in interactions:
-            timestamp = datetime.fromisoformat(interaction["timestamp"])
-            if timestamp > cutoff:
-                date_key = timestamp.strftime("%Y-%m-%d")
-                timeline[date_key] += 1
+            date_key = interaction["timestamp"][:10]
+            timeline[date_key] += 1
         
         return dict(timeline)
     
@@ -305,10 +766,7 @@ class StatsManager:
         Args:
             user_id: ID del usuario
         """
-        user_id_str = str(user_id)
-        if user_id_str in self.stats["users"]:
-            del self.stats["users"][user_id_str]
-            self._save_stats()
+        self.storage.delete_user(str(user_id))
     
     def export_stats(self, filepath: str = None) -> str:
         """
@@ -328,7 +786,7 @@ class StatsManager:
         
         export_data = {
             "exported_at": datetime.now().isoformat(),
-            "bot_stats": self.stats
+            "bot_stats": self.storage.export_stats()
         }
         
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -0,0 +1,1414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Motor de Almacenamiento
+Backends intercambiables (JSON o SQLite) para estadísticas, personalidades
+y conversaciones
+"""
+
+import atexit
+import copy
+import json
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+# Resoluciones de los agregados temporales: formato de la clave del cubo y cubos conservados
+ROLLUP_RESOLUTIONS = {
+    "minute": ("%Y-%m-%dT%H:%M", 6 * 60),
+    "hour": ("%Y-%m-%dT%H", 30 * 24),
+    "day": ("%Y-%m-%d", 365)
+}
+
+
+# Interacciones detalladas conservadas por usuario (los totales no se pierden)
+MAX_USER_INTERACTIONS = 100
+
+
+def empty_rollup() -> Dict:
+    """Cubo de agregados vacío"""
+    return {"messages": 0, "tokens": 0, "response_time": 0, "max_response_time": 0}
+
+
+def atomic_write(path: Path, data: str):
+    """
+    Escribe un archivo de forma atómica (archivo temporal + fsync + rename)
+
+    Args:
+        path: Ruta final del archivo
+        data: Contenido a escribir
+    """
+    temp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+
+class FileWatch:
+    """Detecta si un archivo ha cambiado comparando inodo, mtime y tamaño (sin leerlo)"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Archivo a vigilar (puede no existir todavía)
+        """
+        self.path = Path(path)
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[tuple]:
+        """Firma actual del archivo (None si no existe)"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def changed(self) -> bool:
+        """
+        Comprueba si el archivo cambió desde la última comprobación
+
+        atomic_write sustituye el archivo con un rename, así que cada
+        escritura cambia el inodo aunque coincidan mtime y tamaño.
+
+        Returns:
+            True si la firma es distinta (y la recuerda para la próxima vez)
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+
+def default_stats() -> Dict:
+    """
+    Crea la estructura de estadísticas por defecto
+
+    Returns:
+        Diccionario con estructura vacía
+    """
+    return {
+        "global": {
+            "total_messages": 0,
+            "total_tokens": 0,
+            "total_response_time": 0,
+            "start_date": datetime.now().isoformat(),
+            "last_interaction": None
+        },
+        "users": {},
+        "hourly": {str(i): 0 for i in range(24)},
+        "commands": {}
+    }
+
+
+class StorageBackend:
+    """Interfaz común de los backends de almacenamiento"""
+
+    # --- Estadísticas ---
+
+    def record_interaction(self, user_id: str, tokens: int, response_time: float, timestamp: datetime):
+        """Registra una interacción de un usuario"""
+        raise NotImplementedError
+
+    def record_command(self, command: str):
+        """Incrementa el contador de usos de un comando"""
+        raise NotImplementedError
+
+    def update_metrics(
+        self,
+        group: str,
+        increments: Optional[Dict[str, float]] = None,
+        maxima: Optional[Dict[str, float]] = None,
+        values: Optional[Dict[str, float]] = None
+    ):
+        """Actualiza contadores de un grupo de métricas (sumas, máximos y valores fijos)"""
+        raise NotImplementedError
+
+    def get_metrics(self, group: str) -> Dict[str, float]:
+        """Obtiene los contadores de un grupo de métricas"""
+        raise NotImplementedError
+
+    def get_global(self) -> Dict:
+        """Obtiene los totales globales (incluye unique_users)"""
+        raise NotImplementedError
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        """Obtiene los totales de un usuario y sus últimas MAX_USER_INTERACTIONS interacciones"""
+        raise NotImplementedError
+
+    def get_user_interactions(self, user_id: str, since: Optional[datetime] = None) -> List[Dict]:
+        """Obtiene las interacciones de un usuario posteriores a `since`"""
+        raise NotImplementedError
+
+    def get_top_users(self, limit: int) -> List[Dict]:
+        """Obtiene los usuarios con más mensajes"""
+        raise NotImplementedError
+
+    def get_hourly(self) -> Dict[int, int]:
+        """Obtiene la distribución de mensajes por hora"""
+        raise NotImplementedError
+
+    def get_commands(self) -> Dict[str, int]:
+        """Obtiene los usos por comando"""
+        raise NotImplementedError
+
+    def get_rollups(self, resolution: str, since: str) -> Dict[str, Dict]:
+        """
+        Obtiene los cubos de una resolución a partir de una clave
+
+        Cada interacción suma en su cubo de minuto, hora y día al guardarse,
+        así que leer una serie cuesta lo mismo haya el historial que haya.
+
+        Args:
+            resolution: "minute", "hour" o "day"
+            since: Clave del primer cubo (formato de ROLLUP_RESOLUTIONS)
+
+        Returns:
+            Cubos (clave -> messages, tokens, response_time, max_response_time)
+        """
+        raise NotImplementedError
+
+    def delete_user(self, user_id: str):
+        """Elimina las estadísticas de un usuario"""
+        raise NotImplementedError
+
+    def export_stats(self) -> Dict:
+        """Exporta las estadísticas con la estructura clásica de stats.json"""
+        raise NotImplementedError
+
+    # --- Personalidades ---
+
+    def load_personalities(self) -> Dict[int, str]:
+        """Carga las preferencias de personalidad (user_id -> personalidad)"""
+        raise NotImplementedError
+
+    def set_personality(self, user_id: int, personality: str):
+        """Guarda la personalidad de un usuario"""
+        raise NotImplementedError
+
+    def delete_personality(self, user_id: int):
+        """Elimina la preferencia de personalidad de un usuario"""
+        raise NotImplementedError
+
+    # --- Modelos ---
+
+    def load_user_models(self) -> Dict[int, str]:
+        """Carga los modelos elegidos con /model (user_id -> modelo)"""
+        raise NotImplementedError
+
+    def set_user_model(self, user_id: int, model: str):
+        """Guarda el modelo elegido por un usuario"""
+        raise NotImplementedError
+
+    def delete_user_model(self, user_id: int):
+        """Elimina el modelo elegido por un usuario (vuelve a la selección automática)"""
+        raise NotImplementedError
+
+    # --- Conversaciones ---
+
+    def load_conversation(self, user_id: int) -> List[Dict]:
+        """Carga el historial guardado de un usuario"""
+        raise NotImplementedError
+
+    def append_message(self, user_id: int, message: Dict, keep: int = 20):
+        """Añade un mensaje al historial conservando solo los últimos `keep`"""
+        raise NotImplementedError
+
+    def replace_conversation(self, user_id: int, messages: List[Dict]):
+        """Sustituye el historial completo de un usuario"""
+        raise NotImplementedError
+
+    def load_summary(self, user_id: int) -> Dict:
+        """Carga el resumen acumulado de un usuario ({"summary", "until"})"""
+        raise NotImplementedError
+
+    def save_summary(self, user_id: int, summary: str, until: float):
+        """Guarda el resumen acumulado y la época del último mensaje que cubre"""
+        raise NotImplementedError
+
+    # --- Lectura desde otros procesos ---
+
+    def refresh(self) -> int:
+        """
+        Incorpora los cambios guardados por otro proceso (p. ej. el bot)
+
+        Solo hace comprobaciones baratas (stat del archivo, PRAGMA
+        data_version) y vuelve a leer los datos únicamente si han cambiado.
+
+        Returns:
+            Versión de los datos: cambia cada vez que cambian
+        """
+        return 0
+
+    # --- Ciclo de vida ---
+
+    def flush(self):
+        """Persiste los cambios pendientes"""
+
+    def close(self):
+        """Persiste los cambios pendientes y libera recursos"""
+        self.flush()
+
+
+class JSONStorage(StorageBackend):
+    """Backend clásico en archivos JSON con escritura diferida"""
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        stats_file: Optional[str] = None,
+        personalities_file: Optional[str] = None,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 100
+    ):
+        """
+        Inicializa el backend JSON
+
+        Los cambios de estadísticas y conversaciones se acumulan en memoria
+        y se escriben en segundo plano cada `flush_interval` segundos, al
+        acumular `flush_threshold` cambios o al cerrar.
+
+        Args:
+            data_dir: Directorio de datos
+            stats_file: Archivo de estadísticas (por defecto data/stats.json)
+            personalities_file: Archivo de personalidades (por defecto data/personalities.json)
+            flush_interval: Segundos máximos entre escrituras a disco
+            flush_threshold: Cambios pendientes que fuerzan una escritura
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.stats_file = Path(stats_file) if stats_file else self.data_dir / "stats.json"
+        self.personalities_file = (
+            Path(personalities_file) if personalities_file else self.data_dir / "personalities.json"
+        )
+        self.models_file = self.data_dir / "models.json"
+        self.conversations_dir = self.data_dir / "conversations"
+        self.stats_file.parent.mkdir(exist_ok=True)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._stats: Optional[Dict] = None
+        self._conversations: Dict[int, List[Dict]] = {}
+
+        # Escritura diferida (write-behind)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._dirty = 0
+        self._stats_dirty = False
+        self._dirty_conversations = set()
+        # Usuarios de la instantánea que flush() está serializando (no se modifican en sitio)
+        self._frozen_users: Optional[Dict[str, Dict]] = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # Cambios hechos por otros procesos (lectores como el dashboard)
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+        self._stats_watch = FileWatch(self.stats_file)
+        self._preferences_watches = [FileWatch(self.personalities_file), FileWatch(self.models_file)]
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name="json-storage-flush",
+            daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def stats(self) -> Dict:
+        """Estadísticas en memoria (se cargan la primera vez que se usan)"""
+        if self._stats is None:
+            self._stats_watch.changed()
+            self._stats = self._load_stats()
+        return self._stats
+
+    def _load_stats(self) -> Dict:
+        """
+        Carga las estadísticas desde el archivo
+
+        Returns:
+            Diccionario con las estadísticas
+        """
+        if self.stats_file.exists():
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                return default_stats()
+        return default_stats()
+
+    def _mark_dirty(self, stats: bool = True):
+        """
+        Marca que hay cambios pendientes de escribir
+
+        Args:
+            stats: Si el cambio afecta a las estadísticas (y no solo a conversaciones)
+        """
+        self._stats_dirty = self._stats_dirty or stats
+        self._dirty += 1
+        self._version += 1
+        if self._dirty >= self.flush_threshold:
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        """Hilo de fondo que vuelca los cambios pendientes a disco"""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._dirty:
+                self.flush()
+
+    def _writable_user(self, user_id: str) -> Dict:
+        """
+        Entrada de un usuario que se puede modificar (con el cerrojo tomado)
+
+        Si flush() está serializando una instantánea que la incluye, se
+        sustituye por una copia en vez de modificarla (copy-on-write).
+
+        Args:
+            user_id: ID del usuario (ya presente en las estadísticas)
+
+        Returns:
+            Entrada del usuario
+        """
+        user_stats = self._stats["users"][user_id]
+        if self._frozen_users is not None and self._frozen_users.get(user_id) is user_stats:
+            user_stats = dict(user_stats, interactions=list(user_stats["interactions"]))
+            self._stats["users"][user_id] = user_stats
+        return user_stats
+
+    # --- Estadísticas ---
+
+    def record_interaction(self, user_id: str, tokens: int, response_time: float, timestamp: datetime):
+        with self._lock:
+            stats = self.stats
+            iso = timestamp.isoformat()
+
+            # Estadísticas globales
+            stats["global"]["total_messages"] += 1
+            stats["global"]["total_tokens"] += tokens
+            stats["global"]["total_response_time"] += response_time
+            stats["global"]["last_interaction"] = iso
+
+            # Estadísticas por usuario
+            if user_id not in stats["users"]:
+                stats["users"][user_id] = {
+                    "total_messages": 0,
+                    "total_tokens": 0,
+                    "total_response_time": 0,
+                    "first_interaction": iso,
+                    "last_interaction": iso,
+                    "interactions": []
+                }
+
+            user_stats = self._writable_user(user_id)
+            user_stats["total_messages"] += 1
+            user_stats["total_tokens"] += tokens
+            user_stats["total_response_time"] += response_time
+            user_stats["last_interaction"] = iso
+
+            # Guardar interacción detallada (últimas MAX_USER_INTERACTIONS)
+            user_stats["interactions"].append({
+                "timestamp": iso,
+                "tokens": tokens,
+                "response_time": response_time
+            })
+            if len(user_stats["interactions"]) > MAX_USER_INTERACTIONS:
+                del user_stats["interactions"][:-MAX_USER_INTERACTIONS]
+
+            # Estadísticas por hora
+            hour = str(timestamp.hour)
+            stats["hourly"][hour] = stats["hourly"].get(hour, 0) + 1
+
+            # Agregados por minuto, hora y día (en orden cronológico: se descartan los primeros)
+            rollups = stats.setdefault("rollups", {})
+            for resolution, (key_format, retention) in ROLLUP_RESOLUTIONS.items():
+                buckets = rollups.setdefault(resolution, {})
+                key = timestamp.strftime(key_format)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    out_of_order = bool(buckets) and key < next(reversed(buckets))
+                    bucket = buckets[key] = empty_rollup()
+                    if out_of_order:
+                        buckets = rollups[resolution] = dict(sorted(buckets.items()))
+                    while len(buckets) > retention:
+                        del buckets[next(iter(buckets))]
+                bucket["messages"] += 1
+                bucket["tokens"] += tokens
+                bucket["response_time"] += response_time
+                bucket["max_response_time"] = max(bucket["max_response_time"], response_time)
+
+            self._mark_dirty()
+
+    def record_command(self, command: str):
+        with self._lock:
+            commands = self.stats["commands"]
+            commands[command] = commands.get(command, 0) + 1
+            self._mark_dirty()
+
+    def update_metrics(self, group, increments=None, maxima=None, values=None):
+        with self._lock:
+            metrics = self.stats.setdefault(group, {})
+            for name, amount in (increments or {}).items():
+                metrics[name] = metrics.get(name, 0) + amount
+            for name, value in (maxima or {}).items():
+                metrics[name] = max(metrics.get(name, value), value)
+            for name, value in (values or {}).items():
+                metrics[name] = value
+            self._mark_dirty()
+
+    def get_metrics(self, group: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats.get(group, {}))
+
+    def get_global(self) -> Dict:
+        with self._lock:
+            global_stats = self.stats["global"].copy()
+            global_stats["unique_users"] = len(self.stats["users"])
+            return global_stats
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            user_stats = self.stats["users"].get(user_id)
+            if user_stats is None:
+                return None
+            user_stats = user_stats.copy()
+            user_stats["interactions"] = list(user_stats["interactions"])
+            return user_stats
+
+    def get_user_interactions(self, user_id: str, since: Optional[datetime] = None) -> List[Dict]:
+        user_stats = self.get_user(user_id)
+        if user_stats is None:
+            return []
+        interactions = user_stats["interactions"]
+        if since is not None:
+            cutoff = since.isoformat()
+            interactions = [i for i in interactions if i["timestamp"] > cutoff]
+        return interactions
+
+    def get_top_users(self, limit: int) -> List[Dict]:
+        with self._lock:
+            users = [
+                {
+                    "user_id": int(user_id),
+                    "total_messages": stats["total_messages"],
+                    "total_tokens": stats["total_tokens"],
+                    "total_response_time": stats["total_response_time"]
+                }
+                for user_id, stats in self.stats["users"].items()
+            ]
+        users.sort(key=lambda x: x["total_messages"], reverse=True)
+        return users[:limit]
+
+    def get_hourly(self) -> Dict[int, int]:
+        with self._lock:
+            return {int(k): v for k, v in self.stats["hourly"].items()}
+
+    def get_commands(self) -> Dict[str, int]:
+        with self._lock:
+            return self.stats["commands"].copy()
+
+    def get_rollups(self, resolution: str, since: str) -> Dict[str, Dict]:
+        with self._lock:
+            buckets = self.stats.get("rollups", {}).get(resolution, {})
+            # Desde el final: solo se recorren los cubos pedidos
+            selected = []
+            for key in reversed(buckets):
+                if key < since:
+                    break
+                selected.append((key, dict(buckets[key])))
+        return dict(reversed(selected))
+
+    def delete_user(self, user_id: str):
+        with self._lock:
+            if user_id in self.stats["users"]:
+                del self.stats["users"][user_id]
+                self._mark_dirty()
+
+    def export_stats(self) -> Dict:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    # --- Personalidades ---
+
+    def load_personalities(self) -> Dict[int, str]:
+        if self.personalities_file.exists():
+            try:
+                with open(self.personalities_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    # Convertir keys a int
+                    return {int(k): v for k, v in data.items()}
+            except Exception:
+                return {}
+        return {}
+
+    def _save_personalities(self, personalities: Dict[int, str]):
+        """Guarda las preferencias de personalidad (son pocas: escritura inmediata)"""
+        try:
+            # Convertir keys a str para JSON
+            data = {str(k): v for k, v in personalities.items()}
+            atomic_write(self.personalities_file, json.dumps(data, indent=2, ensure_ascii=False))
+        except Exception as e:
+            print(f"Error guardando preferencias: {e}")
+
+    def set_personality(self, user_id: int, personality: str):
+        with self._lock:
+            personalities = self.load_personalities()
+            personalities[user_id] = personality
+            self._save_personalities(personalities)
+
+    def delete_personality(self, user_id: int):
+        with self._lock:
+            personalities = self.load_personalities()
+            if personalities.pop(user_id, None) is not None:
+                self._save_personalities(personalities)
+
+    # --- Modelos ---
+
+    def load_user_models(self) -> Dict[int, str]:
+        if self.models_file.exists():
+            try:
+                with open(self.models_file, 'r', encoding='utf-8') as f:
+                    return {int(k): v for k, v in json.load(f).items()}
+            except Exception:
+                return {}
+        return {}
+
+    def _save_user_models(self, models: Dict[int, str]):
+        """Guarda los modelos elegidos (son pocos: escritura inmediata)"""
+        try:
+            data = {str(k): v for k, v in models.items()}
+            atomic_write(self.models_file, json.dumps(data, indent=2, ensure_ascii=False))
+        except Exception as e:
+            print(f"Error guardando modelos: {e}")
+
+    def set_user_model(self, user_id: int, model: str):
+        with self._lock:
+            models = self.load_user_models()
+            models[user_id] = model
+            self._save_user_models(models)
+
+    def delete_user_model(self, user_id: int):
+        with self._lock:
+            models = self.load_user_models()
+            if models.pop(user_id, None) is not None:
+                self._save_user_models(models)
+
+    # --- Conversaciones ---
+
+    def _conversation_file(self, user_id: int) -> Path:
+        """Ruta del archivo de historial de un usuario"""
+        return self.conversations_dir / f"{user_id}.json"
+
+    def load_conversation(self, user_id: int) -> List[Dict]:
+        with self._lock:
+            if user_id in self._conversations:
+                return list(self._conversations[user_id])
+
+        path = self._conversation_file(user_id)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                return []
+        return []
+
+    def append_message(self, user_id: int, message: Dict, keep: int = 20):
+        with self._lock:
+            if user_id not in self._conversations:
+                self._conversations[user_id] = self.load_conversation(user_id)
+            messages = self._conversations[user_id]
+            messages.append(dict(message))
+            if len(messages) > keep:
+                del messages[:-keep]
+            self._dirty_conversations.add(user_id)
+            self._mark_dirty(stats=False)
+
+    def replace_conversation(self, user_id: int, messages: List[Dict]):
+        with self._lock:
+            self._conversations[user_id] = [dict(m) for m in messages]
+            self._dirty_conversations.add(user_id)
+            self._mark_dirty(stats=False)
+
+    def _summary_file(self, user_id: int) -> Path:
+        """Ruta del archivo de resumen de un usuario"""
+        return self.conversations_dir / f"{user_id}.summary.json"
+
+    def load_summary(self, user_id: int) -> Dict:
+        path = self._summary_file(user_id)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {"summary": "", "until": 0.0}
+
+    def save_summary(self, user_id: int, summary: str, until: float):
+        # Los resúmenes son poco frecuentes: se escriben al momento
+        path = self._summary_file(user_id)
+        if not summary:
+            path.unlink(missing_ok=True)
+            return
+        self.conversations_dir.mkdir(exist_ok=True)
+        atomic_write(path, json.dumps({"summary": summary, "until": until}, ensure_ascii=False))
+
+    # --- Lectura desde otros procesos ---
+
+    def refresh(self) -> int:
+        with self._refresh_lock:
+            if self._stats is not None and self._stats_watch.changed():
+                # Se parsea fuera del cerrojo: las lecturas siguen sirviendo los datos anteriores
+                try:
+                    with open(self.stats_file, 'r', encoding='utf-8') as f:
+                        stats = json.load(f)
+                except Exception:
+                    stats = None
+
+                with self._lock:
+                    # Con cambios propios sin volcar, los datos en memoria mandan
+                    if stats is not None and not self._stats_dirty:
+                        self._stats = stats
+                        self._version += 1
+
+            if any([watch.changed() for watch in self._preferences_watches]):
+                with self._lock:
+                    self._version += 1
+
+            return self._version
+
+    # --- Ciclo de vida ---
+
+    def flush(self):
+        """
+        Escribe los cambios pendientes de forma atómica
+
+        Con el cerrojo solo se toma una instantánea (copia superficial de los
+        usuarios y copia del resto); se serializa fuera de él, así que
+        registrar interacciones no espera a que se escriba el archivo.
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = None
+                if self._stats_dirty and self._stats is not None:
+                    users = dict(self._stats["users"])
+                    snapshot = {
+                        key: users if key == "users" else copy.deepcopy(value)
+                        for key, value in self._stats.items()
+                    }
+                    self._frozen_users = users
+                conversations = {
+                    user_id: json.dumps(self._conversations.get(user_id, []), ensure_ascii=False)
+                    for user_id in self._dirty_conversations
+                }
+                self._dirty_conversations.clear()
+                self._stats_dirty = False
+                self._dirty = 0
+
+            stats_data = None
+            try:
+                if snapshot is not None:
+                    try:
+                        stats_data = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'))
+                    finally:
+                        with self._lock:
+                            self._frozen_users = None
+                if stats_data is not None:
+                    atomic_write(self.stats_file, stats_data)
+                    # Nuestra propia escritura no cuenta como cambio externo
+                    self._stats_watch.changed()
+                if conversations:
+                    self.conversations_dir.mkdir(exist_ok=True)
+                    for user_id, data in conversations.items():
+                        atomic_write(self._conversation_file(user_id), data)
+            except Exception as e:
+                print(f"Error guardando datos: {e}")
+                with self._lock:
+                    self._stats_dirty = self._stats_dirty or snapshot is not None
+                    self._dirty_conversations.update(conversations)
+                    self._dirty += 1
+                return
+
+            # Las conversaciones ya escritas se vuelven a leer del disco
+            with self._lock:
+                for user_id in conversations:
+                    if user_id not in self._dirty_conversations:
+                        self._conversations.pop(user_id, None)
+
+    def close(self):
+        """Detiene el hilo de escritura y vuelca los cambios pendientes"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher.is_alive() and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=5)
+        self.flush()
+
+
+class SQLiteStorage(StorageBackend):
+    """Backend SQLite embebido en modo WAL con tablas indexadas"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            total_messages INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            total_response_time REAL NOT NULL DEFAULT 0,
+            first_interaction TEXT,
+            last_interaction TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_messages ON users(total_messages DESC);
+        CREATE TABLE IF NOT EXISTS interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            response_time REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_interactions_user_ts ON interactions(user_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_interactions_ts ON interactions(timestamp);
+        CREATE TABLE IF NOT EXISTS hourly (
+            hour INTEGER PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS commands (
+            command TEXT PRIMARY KEY,
+            uses INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS rollups (
+            resolution TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            messages INTEGER NOT NULL DEFAULT 0,
+            tokens INTEGER NOT NULL DEFAULT 0,
+            response_time REAL NOT NULL DEFAULT 0,
+            max_response_time REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (resolution, bucket)
+        );
+        CREATE TABLE IF NOT EXISTS metrics (
+            grp TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (grp, name)
+        );
+        CREATE TABLE IF NOT EXISTS personalities (
+            user_id INTEGER PRIMARY KEY,
+            personality TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS user_models (
+            user_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_user ON messages(user_id, id);
+        CREATE TABLE IF NOT EXISTS summaries (
+            user_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            until REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_file: str = "data/bot.db", batch_size: int = 500, logger=None):
+        """
+        Inicializa el backend SQLite
+
+        Las escrituras se encolan y un hilo dedicado las aplica en
+        transacciones por lotes; las lecturas usan una conexión por hilo.
+
+        Args:
+            db_file: Ruta de la base de datos
+            batch_size: Operaciones máximas por transacción
+            logger: BotLogger opcional donde registrar las escrituras fallidas
+        """
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(exist_ok=True)
+        self.batch_size = batch_size
+        self.logger = logger
+
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('start_date', ?)",
+            (datetime.now().isoformat(),)
+        )
+        # Bases de datos creadas antes del límite por usuario: recortarlas una vez
+        conn.execute(
+            "DELETE FROM interactions WHERE id IN (SELECT id FROM ("
+            "SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS n "
+            "FROM interactions) WHERE n > ?)",
+            (MAX_USER_INTERACTIONS,)
+        )
+        conn.commit()
+
+        self._last_rollup_minute: Optional[str] = None
+
+        # Detección de cambios de otras conexiones (PRAGMA data_version)
+        self._version = 0
+        self._version_lock = threading.Lock()
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+
+        self._queue: "queue.Queue[Optional[Callable]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Devuelve la conexión del hilo actual (la crea si no existe)
+
+        Returns:
+            Conexión SQLite en modo WAL
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self):
+        """Hilo escritor: agrupa las operaciones pendientes en transacciones"""
+        conn = self._connection()
+        while True:
+            operation = self._queue.get()
+            batch = [operation]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            operations = [operation for operation in batch if operation is not None]
+            try:
+                try:
+                    with conn:
+                        for operation in operations:
+                            operation(conn)
+                except Exception:
+                    # El lote entero se ha deshecho: repetirlo operación a
+                    # operación para perder solo la que falla
+                    for operation in operations:
+                        try:
+                            with conn:
+                                operation(conn)
+                        except Exception as e:
+                            self._log_write_error(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                conn.close()
+                return
+
+    def _log_write_error(self, error: Exception):
+        """
+        Registra una escritura descartada
+
+        Args:
+            error: Excepción de la operación fallida
+        """
+        message = f"Error escribiendo en SQLite: {error}"
+        if self.logger:
+            self.logger.log_error("SYSTEM", message)
+        else:
+            print(message)
+
+    def _submit(self, operation: Callable[[sqlite3.Connection], None]):
+        """
+        Encola una operación de escritura
+
+        Args:
+            operation: Función que recibe la conexión del hilo escritor
+        """
+        self._queue.put(operation)
+
+    # --- Estadísticas ---
+
+    def record_interaction(self, user_id: str, tokens: int, response_time: float, timestamp: datetime):
+        iso = timestamp.isoformat()
+
+        def operation(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (user_id, first_interaction) VALUES (?, ?)",
+                (user_id, iso)
+            )
+            if cursor.rowcount:
+                self._increment(conn, "global", {"unique_users": 1})
+            conn.execute(
+                "UPDATE users SET total_messages = total_messages + 1, "
+                "total_tokens = total_tokens + ?, total_response_time = total_response_time + ?, "
+                "last_interaction = ? WHERE user_id = ?",
+                (tokens, response_time, iso, user_id)
+            )
+            conn.execute(
+                "INSERT INTO interactions (user_id, timestamp, tokens, response_time) VALUES (?, ?, ?, ?)",
+                (user_id, iso, tokens, response_time)
+            )
+            # Como JSONStorage: solo las últimas MAX_USER_INTERACTIONS por usuario
+            conn.execute(
+                "DELETE FROM interactions WHERE id IN ("
+                "SELECT id FROM interactions WHERE user_id = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?)",
+                (user_id, MAX_USER_INTERACTIONS)
+            )
+            conn.execute(
+                "INSERT INTO hourly (hour, count) VALUES (?, 1) "
+                "ON CONFLICT(hour) DO UPDATE SET count = count + 1",
+                (timestamp.hour,)
+            )
+            self._add_rollups(conn, timestamp, tokens, response_time)
+            self._increment(conn, "global", {
+                "total_messages": 1,
+                "total_tokens": tokens,
+                "total_response_time": response_time
+            })
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_interaction', ?)",
+                (iso,)
+            )
+
+        self._submit(operation)
+
+    def _add_rollups(self, conn: sqlite3.Connection, timestamp: datetime, tokens: int, response_time: float):
+        """Suma una interacción en sus cubos de minuto, hora y día (dentro de la transacción)"""
+        conn.executemany(
+            "INSERT INTO rollups (resolution, bucket, messages, tokens, response_time, max_response_time) "
+            "VALUES (?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT(resolution, bucket) DO UPDATE SET messages = messages + 1, "
+            "tokens = tokens + excluded.tokens, response_time = response_time + excluded.response_time, "
+            "max_response_time = MAX(max_response_time, excluded.max_response_time)",
+            [
+                (resolution, timestamp.strftime(key_format), tokens, response_time, response_time)
+                for resolution, (key_format, _) in ROLLUP_RESOLUTIONS.items()
+            ]
+        )
+
+        # Al empezar un minuto nuevo se descartan los cubos fuera de la retención
+        minute = timestamp.strftime(ROLLUP_RESOLUTIONS["minute"][0])
+        if minute != self._last_rollup_minute:
+            self._last_rollup_minute = minute
+            for resolution, (key_format, retention) in ROLLUP_RESOLUTIONS.items():
+                conn.execute(
+                    "DELETE FROM rollups WHERE resolution = ? AND bucket IN ("
+                    "SELECT bucket FROM rollups WHERE resolution = ? ORDER BY bucket DESC LIMIT -1 OFFSET ?)",
+                    (resolution, resolution, retention)
+                )
+
+    def record_command(self, command: str):
+        self._submit(lambda conn: conn.execute(
+            "INSERT INTO commands (command, uses) VALUES (?, 1) "
+            "ON CONFLICT(command) DO UPDATE SET uses = uses + 1",
+            (command,)
+        ))
+
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, group: str, increments: Dict[str, float]):
+        """Suma valores a contadores de métricas dentro de una transacción"""
+        conn.executemany(
+            "INSERT INTO metrics (grp, name, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(grp, name) DO UPDATE SET value = value + excluded.value",
+            [(group, name, amount) for name, amount in increments.items()]
+        )
+
+    def update_metrics(self, group, increments=None, maxima=None, values=None):
+        def operation(conn):
+            if increments:
+                self._increment(conn, group, increments)
+            if maxima:
+                conn.executemany(
+                    "INSERT INTO metrics (grp, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(grp, name) DO UPDATE SET value = MAX(value, excluded.value)",
+                    [(group, name, value) for name, value in maxima.items()]
+                )
+            if values:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metrics (grp, name, value) VALUES (?, ?, ?)",
+                    [(group, name, value) for name, value in values.items()]
+                )
+
+        self._submit(operation)
+
+    def get_metrics(self, group: str) -> Dict[str, float]:
+        rows = self._connection().execute(
+            "SELECT name, value FROM metrics WHERE grp = ?", (group,)
+        ).fetchall()
+        return {row["name"]: row["value"] for row in rows}
+
+    def get_global(self) -> Dict:
+        conn = self._connection()
+        counters = self.get_metrics("global")
+        meta = {
+            row["key"]: row["value"]
+            for row in conn.execute("SELECT key, value FROM meta").fetchall()
+        }
+        return {
+            "total_messages": int(counters.get("total_messages", 0)),
+            "total_tokens": int(counters.get("total_tokens", 0)),
+            "total_response_time": counters.get("total_response_time", 0),
+            "start_date": meta.get("start_date"),
+            "last_interaction": meta.get("last_interaction"),
+            "unique_users": int(counters.get("unique_users", 0))
+        }
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        conn = self._connection()
+        row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+
+        user_stats = dict(row)
+        del user_stats["user_id"]
+        interactions = conn.execute(
+            "SELECT timestamp, tokens, response_time FROM interactions "
+            "WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+            (user_id, MAX_USER_INTERACTIONS)
+        ).fetchall()
+        user_stats["interactions"] = [dict(r) for r in reversed(interactions)]
+        return user_stats
+
+    def get_user_interactions(self, user_id: str, since: Optional[datetime] = None) -> List[Dict]:
+        cutoff = since.isoformat() if since else ""
+        rows = self._connection().execute(
+            "SELECT timestamp, tokens, response_time FROM interactions "
+            "WHERE user_id = ? AND timestamp > ? ORDER BY timestamp",
+            (user_id, cutoff)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_top_users(self, limit: int) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT user_id, total_messages, total_tokens, total_response_time FROM users "
+            "ORDER BY total_messages DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [dict(r, user_id=int(r["user_id"])) for r in rows]
+
+    def get_hourly(self) -> Dict[int, int]:
+        hourly = {hour: 0 for hour in range(24)}
+        for row in self._connection().execute("SELECT hour, count FROM hourly").fetchall():
+            hourly[row["hour"]] = row["count"]
+        return hourly
+
+    def get_commands(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT command, uses FROM commands").fetchall()
+        return {row["command"]: row["uses"] for row in rows}
+
+    def get_rollups(self, resolution: str, since: str) -> Dict[str, Dict]:
+        rows = self._connection().execute(
+            "SELECT bucket, messages, tokens, response_time, max_response_time FROM rollups "
+            "WHERE resolution = ? AND bucket >= ? ORDER BY bucket",
+            (resolution, since)
+        ).fetchall()
+        return {row["bucket"]: {key: row[key] for key in row.keys() if key != "bucket"} for row in rows}
+
+    def delete_user(self, user_id: str):
+        def operation(conn):
+            cursor = conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+            if cursor.rowcount:
+                self._increment(conn, "global", {"unique_users": -1})
+            conn.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
+
+        self._submit(operation)
+
+    def export_stats(self) -> Dict:
+        stats = {
+            "global": self.get_global(),
+            "users": {},
+            "hourly": {str(k): v for k, v in self.get_hourly().items()},
+            "commands": self.get_commands()
+        }
+        del stats["global"]["unique_users"]
+
+        conn = self._connection()
+        for row in conn.execute("SELECT user_id FROM users").fetchall():
+            stats["users"][row["user_id"]] = self.get_user(row["user_id"])
+
+        groups = conn.execute("SELECT DISTINCT grp FROM metrics WHERE grp != 'global'").fetchall()
+        for row in groups:
+            stats[row["grp"]] = self.get_metrics(row["grp"])
+
+        stats["rollups"] = {resolution: {} for resolution in ROLLUP_RESOLUTIONS}
+        for row in conn.execute("SELECT * FROM rollups ORDER BY resolution, bucket").fetchall():
+            stats["rollups"].setdefault(row["resolution"], {})[row["bucket"]] = {
+                key: row[key] for key in row.keys() if key not in ("resolution", "bucket")
+            }
+
+        return stats
+
+    def import_stats(self, stats: Dict):
+        """
+        Importa estadísticas con la estructura clásica de stats.json
+
+        Args:
+            stats: Diccionario cargado de stats.json
+        """
+        def operation(conn):
+            global_stats = stats.get("global", {})
+            self._increment(conn, "global", {
+                "total_messages": global_stats.get("total_messages", 0),
+                "total_tokens": global_stats.get("total_tokens", 0),
+                "total_response_time": global_stats.get("total_response_time", 0),
+                "unique_users": len(stats.get("users", {}))
+            })
+            for key in ("start_date", "last_interaction"):
+                if global_stats.get(key):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        (key, global_stats[key])
+                    )
+
+            for user_id, user in stats.get("users", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, user["total_messages"], user["total_tokens"],
+                     user["total_response_time"], user.get("first_interaction"),
+                     user.get("last_interaction"))
+                )
+                conn.executemany(
+                    "INSERT INTO interactions (user_id, timestamp, tokens, response_time) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(user_id, i["timestamp"], i["tokens"], i["response_time"])
+                     for i in user.get("interactions", [])]
+                )
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO hourly (hour, count) VALUES (?, ?)",
+                [(int(hour), count) for hour, count in stats.get("hourly", {}).items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO commands (command, uses) VALUES (?, ?)",
+                list(stats.get("commands", {}).items())
+            )
+            for resolution, buckets in stats.get("rollups", {}).items():
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?)",
+                    [(resolution, key, b["messages"], b["tokens"], b["response_time"], b["max_response_time"])
+                     for key, b in buckets.items()]
+                )
+
+        self._submit(operation)
+        self.flush()
+
+    # --- Personalidades ---
+
+    def load_personalities(self) -> Dict[int, str]:
+        rows = self._connection().execute(
+            "SELECT user_id, personality FROM personalities"
+        ).fetchall()
+        return {row["user_id"]: row["personality"] for row in rows}
+
+    def set_personality(self, user_id: int, personality: str):
+        self._submit(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO personalities (user_id, personality) VALUES (?, ?)",
+            (user_id, personality)
+        ))
+
+    def delete_personality(self, user_id: int):
+        self._submit(lambda conn: conn.execute(
+            "DELETE FROM personalities WHERE user_id = ?", (user_id,)
+        ))
+
+    # --- Modelos ---
+
+    def load_user_models(self) -> Dict[int, str]:
+        rows = self._connection().execute(
+            "SELECT user_id, model FROM user_models"
+        ).fetchall()
+        return {row["user_id"]: row["model"] for row in rows}
+
+    def set_user_model(self, user_id: int, model: str):
+        self._submit(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO user_models (user_id, model) VALUES (?, ?)",
+            (user_id, model)
+        ))
+
+    def delete_user_model(self, user_id: int):
+        self._submit(lambda conn: conn.execute(
+            "DELETE FROM user_models WHERE user_id = ?", (user_id,)
+        ))
+
+    # --- Conversaciones ---
+
+    def load_conversation(self, user_id: int) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT role, content, timestamp FROM messages WHERE user_id = ? ORDER BY id",
+            (user_id,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def append_message(self, user_id: int, message: Dict, keep: int = 20):
+        def operation(conn):
+            conn.execute(
+                "INSERT INTO messages (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (user_id, message["role"], message["content"], message.get("timestamp"))
+            )
+            conn.execute(
+                "DELETE FROM messages WHERE user_id = ? AND id <= ("
+                "SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (user_id, user_id, keep)
+            )
+
+        self._submit(operation)
+
+    def replace_conversation(self, user_id: int, messages: List[Dict]):
+        rows = [
+            (user_id, m["role"], m["content"], m.get("timestamp"))
+            for m in messages
+        ]
+
+        def operation(conn):
+            conn.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT INTO messages (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+        self._submit(operation)
+
+    def load_summary(self, user_id: int) -> Dict:
+        row = self._connection().execute(
+            "SELECT summary, until FROM summaries WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return {"summary": "", "until": 0.0}
+        return dict(row)
+
+    def save_summary(self, user_id: int, summary: str, until: float):
+        if not summary:
+            self._submit(lambda conn: conn.execute(
+                "DELETE FROM summaries WHERE user_id = ?", (user_id,)
+            ))
+            return
+        self._submit(lambda conn: conn.execute(
+            "INSERT INTO summaries (user_id, summary, until) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET summary = excluded.summary, until = excluded.until",
+            (user_id, summary, until)
+        ))
+
+    # --- Lectura desde otros procesos ---
+
+    def refresh(self) -> int:
+        # Las lecturas van siempre a la base de datos; solo hace falta saber si
+        # cambió. data_version es por conexión, así que se usa siempre la misma.
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._version += 1
+            return self._version
+
+    # --- Ciclo de vida ---
+
+    def flush(self):
+        """Espera a que el hilo escritor aplique todas las operaciones pendientes"""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Aplica las operaciones pendientes y cierra el hilo escritor"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+
+_shared_storage: Optional[StorageBackend] = None
+
+
+def create_storage(backend: Optional[str] = None, data_dir: str = "data", logger=None) -> StorageBackend:
+    """
+    Crea (una sola vez por proceso) el backend configurado
+
+    Usa la variable de entorno STORAGE_BACKEND ("json" o "sqlite") y, para
+    SQLite, STORAGE_PATH. Al crear una base SQLite nueva se importan los
+    datos existentes de stats.json y personalities.json.
+
+    Args:
+        backend: Backend a usar (por defecto el de STORAGE_BACKEND)
+        data_dir: Directorio de datos
+        logger: BotLogger opcional donde registrar los errores de escritura
+
+    Returns:
+        Backend de almacenamiento compartido
+    """
+    global _shared_storage
+    if _shared_storage is not None:
+        return _shared_storage
+
+    backend = (backend or os.getenv("STORAGE_BACKEND", "json")).lower()
+
+    if backend == "sqlite":
+        db_file = Path(os.getenv("STORAGE_PATH", str(Path(data_dir) / "bot.db")))
+        is_new = not db_file.exists()
+        storage = SQLiteStorage(str(db_file), logger=logger)
+
+        if is_new:
+            legacy = JSONStorage(data_dir)
+            if legacy.stats_file.exists():
+                storage.import_stats(legacy.export_stats())
+            for user_id, personality in legacy.load_personalities().items():
+                storage.set_personality(user_id, personality)
+            for user_id, model in legacy.load_user_models().items():
+                storage.set_user_model(user_id, model)
+            storage.flush()
+    elif backend == "json":
+        storage = JSONStorage(data_dir)
+    else:
+        raise ValueError(f"Backend de almacenamiento desconocido: {backend}")
+
+    _shared_storage = storage
+    return storage
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in (JSONStorage(tmp), SQLiteStorage(str(Path(tmp) / "bot.db"))):
+            name = type(storage).__name__
+            print(f"\n🗄️  {name}")
+
+            storage.record_interaction("111", 120, 1.5, datetime.now())
+            storage.record_interaction("222", 80, 0.7, datetime.now())
+            storage.record_command("stats")
+            storage.set_personality(111, "mentor")
+            storage.append_message(111, {"role": "user", "content": "Hola", "timestamp": None})
+            storage.flush()
+
+            print(f"   Global: {storage.get_global()}")
+            print(f"   Top: {storage.get_top_users(5)}")
+            print(f"   Personalidades: {storage.load_personalities()}")
+            print(f"   Conversación 111: {storage.load_conversation(111)}")
+            storage.close()
+
+    print("\n✅ Test completado")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Respuestas en Streaming
+Entrega progresiva de tokens editando mensajes de Discord
+"""
+
+import time
+from typing import List
+
+import discord
+
+
+# Límite de caracteres por mensaje de Discord
+MAX_MESSAGE_LENGTH = 2000
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Divide un texto en fragmentos que caben en un mensaje de Discord
+
+    Args:
+        text: Texto completo
+        limit: Longitud máxima de cada fragmento
+
+    Returns:
+        Lista de fragmentos (al menos uno)
+    """
+    if not text:
+        return [""]
+    return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+
+class StreamingMessage:
+    """Mensaje de Discord que se va editando a medida que llegan tokens"""
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        placeholder: str = "💭 Pensando...",
+        edit_interval: float = 1.0,
+        edit_every_tokens: int = 20
+    ):
+        """
+        Inicializa el mensaje en streaming
+
+        Args:
+            channel: Canal donde publicar la respuesta
+            placeholder: Texto inicial mientras no hay tokens
+            edit_interval: Segundos máximos entre ediciones
+            edit_every_tokens: Tokens acumulados que fuerzan una edición
+        """
+        self.channel = channel
+        self.placeholder = placeholder
+        self.edit_interval = edit_interval
+        self.edit_every_tokens = edit_every_tokens
+
+        self.text = ""
+        self.messages: List[discord.Message] = []
+        self._pending_tokens = 0
+        self._last_edit = 0.0
+
+    async def start(self, text: str = None):
+        """
+        Publica el mensaje provisional (o lo actualiza si ya existe)
+
+        Args:
+            text: Texto provisional alternativo
+        """
+        text = text or self.placeholder
+        if self.messages:
+            await self._edit(self.messages[0], text)
+        else:
+            self.messages.append(await self.channel.send(text))
+        self._last_edit = time.monotonic()
+
+    async def feed(self, token: str):
+        """
+        Añade un token y edita el mensaje si toca según la cadencia
+
+        Args:
+            token: Fragmento de texto recibido de Ollama
+        """
+        if not self.messages:
+            await self.start()
+
+        self.text += token
+        self._pending_tokens += 1
+
+        # Pasar a un mensaje nuevo al superar el límite de Discord
+        if len(self.text) > len(self.messages) * MAX_MESSAGE_LENGTH:
+            await self._sync(self.text)
+            return
+
+        elapsed = time.monotonic() - self._last_edit
+        if self._pending_tokens >= self.edit_every_tokens or elapsed >= self.edit_interval:
+            await self._sync(self.text)
+
+    async def finish(self, final_text: str):
+        """
+        Deja los mensajes con el texto definitivo
+
+        Args:
+            final_text: Respuesta completa (o mensaje de error)
+        """
+        self.text = final_text or "🤔 No tengo respuesta para eso."
+        await self._sync(self.text, final=True)
+
+    async def _sync(self, text: str, final: bool = False):
+        """
+        Reconcilia los mensajes publicados con el texto actual
+
+        Args:
+            text: Texto a mostrar
+            final: Si es la versión definitiva (elimina mensajes sobrantes)
+        """
+        chunks = split_message(text)
+
+        for index, chunk in enumerate(chunks):
+            if index < len(self.messages):
+                message = self.messages[index]
+                if message.content != chunk:
+                    await self._edit(message, chunk)
+            else:
+                self.messages.append(await self.channel.send(chunk))
+
+        if final:
+            for message in self.messages[len(chunks):]:
+                try:
+                    await message.delete()
+                except discord.HTTPException:
+                    pass
+            del self.messages[len(chunks):]
+
+        self._pending_tokens = 0
+        self._last_edit = time.monotonic()
+
+    async def _edit(self, message: discord.Message, content: str):
+        """
+        Edita un mensaje ignorando fallos puntuales de la API
+
+        Args:
+            message: Mensaje a editar
+            content: Nuevo contenido
+        """
+        if not content:
+            return
+        try:
+            edited = await message.edit(content=content)
+            if edited is not None:
+                self.messages[self.messages.index(message)] = edited
+        except discord.HTTPException:
+            pass
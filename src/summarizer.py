@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Resumen Continuo de Conversaciones
+Comprime los turnos antiguos en un resumen acumulado, en segundo plano
+"""
+
+import asyncio
+import time
+from typing import Dict, List
+
+from conversation import ConversationStore, MessageRecord
+from scheduler import QueueFullError
+
+
+SUMMARY_PROMPT = """Eres un asistente que resume conversaciones.
+Actualiza el resumen con los nuevos mensajes. Conserva nombres, datos, \
+decisiones y preguntas pendientes. Responde solo con el resumen, en pocas frases.
+
+Resumen actual:
+{summary}
+
+Nuevos mensajes:
+{messages}
+
+Resumen actualizado:"""
+
+
+class ConversationSummarizer:
+    """Genera y mantiene el resumen acumulado de cada conversación"""
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        client,
+        model: str,
+        threshold: int = 12,
+        keep_recent: int = 4,
+        max_tokens: int = 300,
+        scheduler=None,
+        stats_manager=None
+    ):
+        """
+        Inicializa el resumidor
+
+        Args:
+            store: Almacén de conversaciones
+            client: OllamaClient con el que generar los resúmenes
+            model: Modelo de Ollama a usar
+            threshold: Mensajes sin resumir que disparan un resumen
+            keep_recent: Mensajes recientes que se dejan fuera del resumen
+            max_tokens: Longitud máxima del resumen (num_predict)
+            scheduler: GenerationScheduler opcional para no saturar Ollama
+            stats_manager: StatsManager opcional donde registrar los resúmenes
+        """
+        self.store = store
+        self.client = client
+        self.model = model
+        self.threshold = threshold
+        self.keep_recent = keep_recent
+        self.max_tokens = max_tokens
+        self.scheduler = scheduler
+        self.stats_manager = stats_manager
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def maybe_schedule(self, user_id: int) -> bool:
+        """
+        Lanza un resumen en segundo plano si el historial supera el umbral
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            True si se ha lanzado un resumen
+        """
+        if user_id in self._tasks:
+            return False
+        if len(self.store.unsummarized(user_id)) < self.threshold:
+            return False
+
+        task = asyncio.create_task(self._summarize(user_id))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda done: self._forget(user_id, done))
+        return True
+
+    def _forget(self, user_id: int, task: asyncio.Task):
+        """Olvida una tarea terminada (si no ha sido sustituida por otra)"""
+        if self._tasks.get(user_id) is task:
+            del self._tasks[user_id]
+
+    def cancel(self, user_id: int):
+        """
+        Cancela el resumen en curso de un usuario (p. ej. al reiniciar el chat)
+
+        Args:
+            user_id: ID del usuario
+        """
+        task = self._tasks.pop(user_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def close(self):
+        """Cancela todos los resúmenes en curso y espera a que terminen"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _format(records: List[MessageRecord]) -> str:
+        """Mensajes en formato de texto para el prompt del resumen"""
+        return "\n".join(f"{r.role.label}: {r.content}" for r in records)
+
+    async def _summarize(self, user_id: int):
+        """
+        Resume los mensajes antiguos sin resumir de un usuario
+
+        Args:
+            user_id: ID del usuario
+        """
+        pending = self.store.unsummarized(user_id)
+        covered = pending[:-self.keep_recent] if self.keep_recent else pending
+        if not covered:
+            return
+
+        summary, _ = self.store.get_summary(user_id)
+        payload = {
+            "model": self.model,
+            "prompt": SUMMARY_PROMPT.format(
+                summary=summary or "(vacío)",
+                messages=self._format(covered)
+            ),
+            "options": {
+                "temperature": 0.3,
+                "num_predict": self.max_tokens
+            }
+        }
+
+        start = time.monotonic()
+        status = "completed"
+        try:
+            if self.scheduler is not None:
+                # Clave propia para no bloquear la siguiente respuesta del usuario
+                result = await self.scheduler.run(("summary", user_id), lambda: self.client.generate(payload))
+            else:
+                result = await self.client.generate(payload)
+
+            new_summary = result.get("response", "").strip()
+            if new_summary:
+                self.store.set_summary(user_id, new_summary, covered[-1].timestamp)
+            else:
+                status = "failed"
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except QueueFullError:
+            # Se reintentará en el siguiente turno
+            status = "skipped"
+        except Exception as e:
+            status = "failed"
+            print(f"Error resumiendo la conversación de {user_id}: {e}")
+        finally:
+            if self.stats_manager:
+                self.stats_manager.add_summary_run(
+                    status,
+                    len(covered) if status == "completed" else 0,
+                    time.monotonic() - start
+                )
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import tempfile
+
+    from conversation import Role
+    from storage import JSONStorage
+
+    class DemoClient:
+        """Cliente de demostración que "resume" quedándose con las primeras palabras"""
+
+        async def generate(self, payload: Dict) -> Dict:
+            await asyncio.sleep(0.1)
+            messages = payload["prompt"].split("Nuevos mensajes:\n")[1].split("\n\n")[0]
+            return {"response": " ".join(messages.split()[:30])}
+
+    async def demo():
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = JSONStorage(data_dir=tmp)
+            store = ConversationStore(storage)
+            summarizer = ConversationSummarizer(store, DemoClient(), "demo", threshold=6, keep_recent=2)
+
+            for n in range(10):
+                store.append(1, MessageRecord(Role.USER, f"Pregunta {n} sobre Python"))
+                store.append(1, MessageRecord(Role.ASSISTANT, f"Respuesta {n}"))
+                summarizer.maybe_schedule(1)
+                await asyncio.sleep(0.2)
+
+            summary, until = store.get_summary(1)
+            print(f"📝 Resumen: {summary[:80]}...")
+            print(f"   Mensajes sin resumir: {len(store.unsummarized(1))}")
+
+            await summarizer.close()
+            storage.close()
+
+    asyncio.run(demo())
@@ -5,11 +5,19 @@
 Servidor Flask con API REST y dashboard
 """
 
-from flask import Flask, render_template, jsonify, send_from_directory
+from flask import Flask, Blueprint, Response, current_app, render_template, jsonify, send_from_directory, request
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+from dotenv import load_dotenv
 from pathlib import Path
 import json
+import os
+import signal
+import threading
+import time
 from datetime import datetime
+from functools import wraps
+from typing import Callable, Optional
 import sys
 
 # Añadir src al path para imports
@@ -18,32 +26,299 @@ sys.path.insert(0, str(Path(__file__).parent))
 from stats import StatsManager
 from personality import PersonalityManager
 from logger import BotLogger
+from storage import ROLLUP_RESOLUTIONS, StorageBackend, create_storage
+from live_stream import LiveStream
+from http_cache import BodyCache, CachedBody, choose_encoding, content_etag
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Servidor de producción
+WEB_SERVER = os.getenv("WEB_SERVER", "dev").lower()
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "5000"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(min(4, os.cpu_count() or 1))))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
+# Segundos entre comprobaciones de cambios hechos por el bot
+WEB_REFRESH_INTERVAL = float(os.getenv("WEB_REFRESH_INTERVAL", "1"))
+
+# Segundos entre deltas de /api/stream
+WEB_STREAM_TICK = float(os.getenv("WEB_STREAM_TICK", "1"))
+
+# Conexiones de /api/stream por worker: cada una ocupa un hilo mientras está
+# abierta, así que por defecto se deja libre al menos la mitad para /api/*
+WEB_STREAM_MAX_SUBSCRIBERS = int(os.getenv("WEB_STREAM_MAX_SUBSCRIBERS", str(max(1, WEB_THREADS // 2))))
+
+# Segundos tras los que el dashboard vuelve a intentar el stream si estaba lleno
+WEB_STREAM_RETRY_AFTER = 60
+
+# Compresión de respuestas a partir de este tamaño en bytes (0 = sin compresión)
+WEB_COMPRESS_MIN_BYTES = int(os.getenv("WEB_COMPRESS_MIN_BYTES", "1024"))
+
+# Rangos de /api/stats/charts: resolución de los cubos y número de puntos
+CHART_RANGES = {
+    "hour": ("minute", 60),
+    "day": ("hour", 24),
+    "week": ("hour", 7 * 24),
+    "month": ("day", 30),
+    "year": ("day", 365)
+}
+
+# Etiqueta de cada cubo en las gráficas según su resolución
+CHART_LABELS = {
+    "minute": "%H:%M",
+    "hour": "%d/%m %H:00",
+    "day": "%d/%m"
+}
+
+# Rutas del dashboard (se registran en cada app creada con create_app)
+dashboard = Blueprint('dashboard', __name__)
+
+
+def summary_data(stats: StatsManager) -> dict:
+    """
+    Resumen completo del bot (lo sirven /api/summary y el stream en vivo)
+    
+    Args:
+        stats: Gestor de estadísticas
+        
+    Returns:
+        Diccionario con el resumen
+    """
+    return {
+        "global": stats.get_global_stats(),
+        "top_users": stats.get_top_users(5),
+        "top_commands": [
+            {"command": cmd, "uses": uses} 
+            for cmd, uses in stats.get_top_commands(5)
+        ],
+        "hourly_distribution": stats.get_hourly_distribution(),
+        "queue": stats.get_queue_stats(),
+        "conversations": stats.get_conversation_stats(),
+        "context": stats.get_context_stats(),
+        "summaries": stats.get_metrics("summary"),
+        "response_cache": stats.get_cache_stats(),
+        "semantic_cache": stats.get_semantic_cache_stats(),
+        "coalescing": stats.get_coalescing_stats(),
+        "backends": stats.get_backend_stats(),
+        "models": stats.get_model_stats(),
+        "adaptive": stats.get_metrics("adaptive"),
+        "speculative": stats.get_speculative_stats()
+    }
+
+
+def parse_interaction(line: str) -> Optional[dict]:
+    """Métricas de una línea del log de interacciones (sin el texto de los mensajes)"""
+    try:
+        interaction = json.loads(line)
+    except ValueError:
+        return None
+    return {
+        key: interaction.get(key)
+        for key in ("timestamp", "user_id", "response_time", "prompt_length", "response_length")
+    }
+
+
+class DashboardState:
+    """Managers de un proceso del dashboard (uno por worker)"""
+
+    def __init__(self, storage: StorageBackend = None, refresh_interval: float = WEB_REFRESH_INTERVAL):
+        """
+        Crea los managers sobre el mismo backend de almacenamiento que el bot
+
+        Los datos se sirven desde memoria. Como mucho cada `refresh_interval`
+        segundos se comprueba (con un stat o PRAGMA data_version) si el bot
+        ha guardado cambios, y solo entonces se vuelven a leer.
+
+        Args:
+            storage: Backend de almacenamiento (por defecto el del proceso)
+            refresh_interval: Segundos entre comprobaciones de cambios
+        """
+        self.storage = storage or create_storage()
+        self.stats_manager = StatsManager(storage=self.storage)
+        self.personality_manager = PersonalityManager(storage=self.storage)
+        self.logger = BotLogger()
+
+        self.refresh_interval = refresh_interval
+        self.version = self.storage.refresh()
+        self._last_refresh = time.monotonic()
+        self._refresh_lock = threading.Lock()
+
+        # Cuerpos de respuesta serializados por versión de los datos
+        self.body_cache = BodyCache()
+
+        # Métricas en vivo para /api/stream (un hilo por worker, solo con suscriptores)
+        self.stream = LiveStream(
+            snapshot=lambda: summary_data(self.stats_manager),
+            version=self.refresh,
+            followers={
+                "errors": self.logger.follow_errors(),
+                "interactions": self.logger.follow_interactions()
+            },
+            parsers={"interactions": parse_interaction},
+            tick=WEB_STREAM_TICK,
+            max_subscribers=WEB_STREAM_MAX_SUBSCRIBERS
+        )
+
+    def refresh(self) -> int:
+        """
+        Incorpora los cambios guardados por el bot si toca comprobarlo
+
+        Si otro hilo ya está comprobando, se sirven los datos actuales
+        sin esperar.
+
+        Returns:
+            Versión de los datos servidos
+        """
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_interval or not self._refresh_lock.acquire(blocking=False):
+            return self.version
+        try:
+            self._last_refresh = now
+            version = self.storage.refresh()
+            if version != self.version:
+                self.personality_manager.reload()
+                self.version = version
+        finally:
+            self._refresh_lock.release()
+        return self.version
+
+    def close(self):
+        """Vuelca los cambios pendientes y detiene los hilos en segundo plano"""
+        self.stream.close()
+        self.logger.interaction_writer.close()
+        self.stats_manager.close()
+
+
+def _state() -> DashboardState:
+    """Managers de la app que atiende la petición actual"""
+    return current_app.extensions['dashboard']
+
+
+# Accesos a los managers del worker actual (válidos dentro de una petición)
+stats_manager = LocalProxy(lambda: _state().stats_manager)
+personality_manager = LocalProxy(lambda: _state().personality_manager)
+logger = LocalProxy(lambda: _state().logger)
+
+
+def create_app(storage: StorageBackend = None) -> Flask:
+    """
+    Crea la app Flask del dashboard con sus propios managers
+
+    Los managers arrancan hilos de escritura y abren conexiones, que no
+    sobreviven a un fork: cada worker debe llamar a esta función después
+    de arrancar (p. ej. gunicorn 'web_server:create_app()' sin --preload).
+
+    Args:
+        storage: Backend de almacenamiento (por defecto el del proceso)
+
+    Returns:
+        App Flask lista para servir
+    """
+    app = Flask(
+        __name__,
+        template_folder='../web/templates',
+        static_folder='../web/static'
+    )
+    CORS(app)
+
+    # Configuración
+    app.config['JSON_AS_ASCII'] = False
+    app.config['JSON_SORT_KEYS'] = False
+
+    app.extensions['dashboard'] = DashboardState(storage)
+    app.register_blueprint(dashboard)
+    return app
 
-# Inicializar Flask
-app = Flask(
-    __name__,
-    template_folder='../web/templates',
-    static_folder='../web/static'
-)
-CORS(app)
 
-# Inicializar managers
-stats_manager = StatsManager()
-personality_manager = PersonalityManager()
-logger = BotLogger()
+@dashboard.before_app_request
+def refresh_read_model():
+    """Mantiene los datos en memoria al día con lo que guarda el bot"""
+    _state().refresh()
 
-# Configuración
-app.config['JSON_AS_ASCII'] = False
-app.config['JSON_SORT_KEYS'] = False
+
+def cached_response(view=None, window: Optional[Callable[[], str]] = None):
+    """
+    Sirve una ruta desde la caché de cuerpos mientras no cambien los datos
+    
+    El cuerpo JSON se genera y serializa una vez por versión de los datos;
+    lleva un ETag fuerte (del contenido, igual en todos los workers), responde
+    304 a If-None-Match y se comprime con brotli o gzip por encima de
+    WEB_COMPRESS_MIN_BYTES. Las respuestas de error no se guardan.
+    
+    Args:
+        view: Vista a decorar (se puede usar como @cached_response o @cached_response(...))
+        window: Función opcional que devuelve el periodo actual de la respuesta
+            (p. ej. el cubo en curso de una serie): al cambiar se regenera
+            aunque los datos no hayan cambiado
+    """
+    if view is None:
+        return lambda function: cached_response(function, window)
+    
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        state = _state()
+        key = request.full_path
+        if window is not None:
+            key = f"{key}#{window()}"
+        version = state.version
+        
+        cached = state.body_cache.get(key, version)
+        if cached is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cached = CachedBody(
+                response.get_data(),
+                content_etag(response.get_json(silent=True)),
+                response.mimetype
+            )
+            state.body_cache.put(key, version, cached)
+        
+        encoding = choose_encoding(request.accept_encodings, len(cached.body), WEB_COMPRESS_MIN_BYTES)
+        # Cada codificación es una representación distinta: su propio ETag
+        etag = f"{cached.etag}-{encoding}" if encoding else cached.etag
+        
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(
+                cached.encoded(encoding) if encoding else cached.body,
+                mimetype=cached.mimetype
+            )
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    return wrapper
+
+
+def close_app(app: Flask):
+    """
+    Libera los managers de una app creada con create_app
+
+    Args:
+        app: App del dashboard
+    """
+    state = app.extensions.pop('dashboard', None)
+    if state is not None:
+        state.close()
 
 
-@app.route('/')
+@dashboard.route('/')
 def index():
     """Página principal del dashboard"""
     return render_template('dashboard.html')
 
 
-@app.route('/api/health')
+@dashboard.route('/api/health')
 def health():
     """Health check endpoint"""
     return jsonify({
@@ -53,7 +328,8 @@ def health():
     })
 
 
-@app.route('/api/stats')
+@dashboard.route('/api/stats')
+@cached_response
 def get_stats():
     """
     Obtiene estadísticas globales del bot
@@ -76,7 +352,8 @@ def get_stats():
         }), 500
 
 
-@app.route('/api/users')
+@dashboard.route('/api/users')
+@cached_response
 def get_users():
     """
     Obtiene lista de usuarios y sus estadísticas
@@ -100,7 +377,7 @@ def get_users():
         }), 500
 
 
-@app.route('/api/user/<int:user_id>')
+@dashboard.route('/api/user/<int:user_id>')
 def get_user(user_id: int):
     """
     Obtiene estadísticas de un usuario específico
@@ -133,7 +410,8 @@ def get_user(user_id: int):
         }), 500
 
 
-@app.route('/api/hourly')
+@dashboard.route('/api/hourly')
+@cached_response
 def get_hourly():
     """
     Obtiene distribución de actividad por hora
@@ -163,7 +441,8 @@ def get_hourly():
         }), 500
 
 
-@app.route('/api/commands')
+@dashboard.route('/api/commands')
+@cached_response
 def get_commands():
     """
     Obtiene estadísticas de comandos
@@ -190,7 +469,7 @@ def get_commands():
         }), 500
 
 
-@app.route('/api/personalities')
+@dashboard.route('/api/personalities')
 def get_personalities():
     """
     Obtiene información sobre personalidades
@@ -217,7 +496,7 @@ def get_personalities():
         }), 500
 
 
-@app.route('/api/logs/latest')
+@dashboard.route('/api/logs/latest')
 def get_latest_logs():
     """
     Obtiene los últimos logs del bot
@@ -247,7 +526,43 @@ def get_latest_logs():
         }), 500
 
 
-@app.route('/api/summary')
+@dashboard.route('/api/logs/errors')
+def get_error_logs():
+    """
+    Obtiene errores paginados, del más reciente al más antiguo
+    
+    Query params:
+        limit: Errores por página (máx. 500)
+        cursor: Cursor devuelto por la página anterior
+    
+    Returns:
+        JSON con errores y cursor de la página siguiente
+    """
+    try:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        cursor = request.args.get('cursor')
+        
+        page = logger.get_errors_page(limit, cursor)
+        
+        return jsonify({
+            "success": True,
+            "data": page,
+            "timestamp": datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@dashboard.route('/api/summary')
+@cached_response
 def get_summary():
     """
     Obtiene resumen completo del bot
@@ -255,22 +570,112 @@ def get_summary():
     Returns:
         JSON con resumen completo
     """
+    try:
+        return jsonify({
+            "success": True,
+            "data": summary_data(stats_manager),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+def _chart_range() -> str:
+    """Rango pedido en /api/stats/charts ("day" por defecto)"""
+    return request.args.get('range', 'day')
+
+
+def _chart_window() -> str:
+    """Cubo en curso del rango pedido (la serie avanza al empezar uno nuevo)"""
+    resolution = CHART_RANGES.get(_chart_range(), CHART_RANGES['day'])[0]
+    return datetime.now().strftime(ROLLUP_RESOLUTIONS[resolution][0])
+
+
+@dashboard.route('/api/stats/summary')
+@cached_response
+def get_stats_summary():
+    """
+    Obtiene las tarjetas de resumen del dashboard
+    
+    Returns:
+        JSON con total de mensajes, usuarios y tokens, tiempo medio de
+        respuesta y tokens por segundo
+    """
     try:
         global_stats = stats_manager.get_global_stats()
-        top_users = stats_manager.get_top_users(5)
-        top_commands = stats_manager.get_top_commands(5)
-        hourly_data = stats_manager.get_hourly_distribution()
         
         return jsonify({
             "success": True,
-            "data": {
-                "global": global_stats,
-                "top_users": top_users,
-                "top_commands": [
-                    {"command": cmd, "uses": uses} 
-                    for cmd, uses in top_commands
-                ],
-                "hourly_distribution": hourly_data
+            "total_messages": global_stats["total_messages"],
+            "total_users": global_stats["unique_users"],
+            "total_tokens": global_stats["total_tokens"],
+            "avg_response_time": global_stats["avg_response_time"],
+            "avg_tokens_per_second": global_stats["avg_tokens_per_second"],
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@dashboard.route('/api/stats/charts')
+@cached_response(window=_chart_window)
+def get_stats_charts():
+    """
+    Obtiene los datos de las gráficas del dashboard
+    
+    Las series temporales salen de los agregados por minuto, hora y día,
+    así que el coste depende del rango pedido y no del historial.
+    
+    Query params:
+        range: hour, day (por defecto), week, month o year
+        
+    Returns:
+        JSON con {labels, data} de response_times, tokens_per_second,
+        messages_by_user y commands_usage
+    """
+    chart_range = _chart_range()
+    if chart_range not in CHART_RANGES:
+        return jsonify({
+            "success": False,
+            "error": f"Rango no válido: {chart_range} (opciones: {', '.join(CHART_RANGES)})"
+        }), 400
+    
+    try:
+        resolution, points = CHART_RANGES[chart_range]
+        series = stats_manager.get_rollup_series(resolution, points)
+        key_format = ROLLUP_RESOLUTIONS[resolution][0]
+        labels = [
+            datetime.strptime(item["bucket"], key_format).strftime(CHART_LABELS[resolution])
+            for item in series
+        ]
+        top_users = stats_manager.get_top_users(10)
+        top_commands = stats_manager.get_top_commands(7)
+        
+        return jsonify({
+            "success": True,
+            "range": chart_range,
+            "resolution": resolution,
+            "response_times": {
+                "labels": labels,
+                "data": [round(item["avg_response_time"], 3) for item in series]
+            },
+            "tokens_per_second": {
+                "labels": labels,
+                "data": [round(item["tokens_per_second"], 2) for item in series]
+            },
+            "messages_by_user": {
+                "labels": [f"Usuario {user['user_id']}" for user in top_users],
+                "data": [user["total_messages"] for user in top_users]
+            },
+            "commands_usage": {
+                "labels": [f"/{cmd}" for cmd, _ in top_commands],
+                "data": [uses for _, uses in top_commands]
             },
             "timestamp": datetime.now().isoformat()
         })
@@ -281,7 +686,40 @@ def get_summary():
         }), 500
 
 
-@app.route('/api/export/stats')
+@dashboard.route('/api/stream')
+def stream():
+    """
+    Métricas en vivo (Server-Sent Events)
+    
+    Envía primero un evento "snapshot" con el resumen completo y después,
+    como mucho uno por tick, eventos "delta" con solo lo que ha cambiado
+    y las líneas nuevas de errores e interacciones.
+    
+    Cada conexión ocupa un hilo del worker: por encima de
+    WEB_STREAM_MAX_SUBSCRIBERS se responde 503 y el dashboard sigue con
+    el sondeo periódico.
+    
+    Returns:
+        Respuesta text/event-stream (o 503 si el stream está lleno)
+    """
+    live = _state().stream
+    if live.full:
+        return jsonify({
+            "success": False,
+            "error": "Demasiadas conexiones en vivo, usa el sondeo periódico"
+        }), 503, {'Retry-After': str(WEB_STREAM_RETRY_AFTER)}
+    
+    return Response(
+        live.events(retry_ms=WEB_STREAM_RETRY_AFTER * 1000),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@dashboard.route('/api/export/stats')
 def export_stats():
     """
     Exporta las estadísticas completas
@@ -308,7 +746,7 @@ def export_stats():
         }), 500
 
 
-@app.errorhandler(404)
+@dashboard.app_errorhandler(404)
 def not_found(error):
     """Maneja errores 404"""
     return jsonify({
@@ -318,7 +756,7 @@ def not_found(error):
     }), 404
 
 
-@app.errorhandler(500)
+@dashboard.app_errorhandler(500)
 def server_error(error):
     """Maneja errores 500"""
     return jsonify({
@@ -328,15 +766,114 @@ def server_error(error):
     }), 500
 
 
-def run_server(host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
+def _serve_gunicorn(host: str, port: int, workers: int, threads: int, keepalive: int, graceful_timeout: int):
     """
-    Inicia el servidor Flask
+    Sirve el dashboard con gunicorn (varios procesos con hilos, solo Unix)
+    
+    Cada worker crea su propia app al arrancar; al recibir SIGTERM los
+    workers cierran las conexiones de /api/stream, terminan las peticiones
+    en curso (hasta `graceful_timeout` segundos) y vuelcan sus managers
+    antes de salir.
+    """
+    from gunicorn.app.base import BaseApplication
+    
+    class DashboardApplication(BaseApplication):
+        """Aplicación gunicorn que crea la app del dashboard en cada worker"""
+        
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+        
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return create_app()
+    
+    def post_worker_init(worker):
+        # Las conexiones SSE no terminan solas: cerrarlas al empezar el apagado
+        handle_exit = signal.getsignal(signal.SIGTERM)
+        
+        def stop_streams(signum, frame):
+            if isinstance(getattr(worker, "wsgi", None), Flask):
+                worker.wsgi.extensions['dashboard'].stream.stop()
+            if callable(handle_exit):
+                handle_exit(signum, frame)
+        
+        signal.signal(signal.SIGTERM, stop_streams)
+    
+    def worker_exit(server, worker):
+        # Un worker que no llegó a cargar la app no tiene nada que volcar
+        if isinstance(getattr(worker, "wsgi", None), Flask):
+            close_app(worker.wsgi)
+    
+    DashboardApplication({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread",
+        "keepalive": keepalive,
+        "graceful_timeout": graceful_timeout,
+        "preload_app": False,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit
+    }).run()
+
+
+def _serve_waitress(host: str, port: int, threads: int):
+    """
+    Sirve el dashboard con waitress (un proceso con varios hilos, también en Windows)
+    
+    SIGTERM se trata como Ctrl+C para cerrar el servidor y volcar los
+    managers antes de salir.
+    """
+    from waitress import serve
+    
+    app = create_app()
+    
+    def shutdown(signum, frame):
+        app.extensions['dashboard'].stream.stop()
+        sys.exit(0)
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        serve(app, host=host, port=port, threads=threads)
+    finally:
+        close_app(app)
+
+
+def run_server(
+    host: str = '0.0.0.0',
+    port: int = 5000,
+    debug: bool = False,
+    server: str = "dev",
+    workers: int = 1,
+    threads: int = 8,
+    keepalive: int = 5,
+    graceful_timeout: int = 30
+):
+    """
+    Inicia el servidor del dashboard
     
     Args:
         host: Host donde escuchar
         port: Puerto donde escuchar
-        debug: Modo debug
+        debug: Modo debug (solo servidor de desarrollo)
+        server: "dev" (servidor de desarrollo de Flask), "gunicorn",
+            "waitress" o "production" (gunicorn si está disponible, si no waitress)
+        workers: Procesos worker (gunicorn)
+        threads: Hilos por worker
+        keepalive: Segundos que se mantiene abierta una conexión inactiva (gunicorn)
+        graceful_timeout: Segundos para terminar las peticiones en curso al detenerse (gunicorn)
     """
+    if server == "production":
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn" if os.name != "nt" else "waitress"
+        except ImportError:
+            server = "waitress"
+    
     print("\n" + "="*60)
     print("🌐 Dashboard Web del Bot")
     print("="*60)
@@ -345,18 +882,38 @@ def run_server(host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
     print(f"\n🔌 API Endpoints disponibles:")
     print(f"   • GET  /api/health - Health check")
     print(f"   • GET  /api/stats - Estadísticas globales")
+    print(f"   • GET  /api/stats/summary - Tarjetas de resumen")
+    print(f"   • GET  /api/stats/charts?range=day - Series de las gráficas")
     print(f"   • GET  /api/users - Lista de usuarios")
     print(f"   • GET  /api/user/<id> - Usuario específico")
     print(f"   • GET  /api/hourly - Actividad por hora")
     print(f"   • GET  /api/commands - Estadísticas de comandos")
     print(f"   • GET  /api/personalities - Info de personalidades")
     print(f"   • GET  /api/logs/latest - Logs recientes")
+    print(f"   • GET  /api/logs/errors - Errores paginados")
     print(f"   • GET  /api/summary - Resumen completo")
+    print(f"   • GET  /api/stream - Métricas en vivo (SSE)")
     print(f"   • GET  /api/export/stats - Exportar estadísticas")
+    if server == "gunicorn":
+        print(f"\n⚙️  gunicorn: {workers} workers x {threads} hilos, keep-alive {keepalive}s")
+    elif server == "waitress":
+        print(f"\n⚙️  waitress: {threads} hilos")
+    print(f"📡 Stream en vivo: hasta {WEB_STREAM_MAX_SUBSCRIBERS} conexiones por worker")
     print(f"\n⏹️  Presiona Ctrl+C para detener\n")
     
     try:
-        app.run(host=host, port=port, debug=debug)
+        if server == "gunicorn":
+            _serve_gunicorn(host, port, workers, threads, keepalive, graceful_timeout)
+        elif server == "waitress":
+            _serve_waitress(host, port, threads)
+        else:
+            app = create_app()
+            try:
+                app.run(host=host, port=port, debug=debug)
+            finally:
+                close_app(app)
+    except ImportError as e:
+        print(f"\n❌ Servidor '{server}' no instalado ({e.name or server}): pip install {e.name or server}")
     except KeyboardInterrupt:
         print("\n\n⏹️  Servidor detenido")
     except Exception as e:
@@ -364,4 +921,13 @@ def run_server(host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
 
 
 if __name__ == "__main__":
-    run_server(debug=True)
\ No newline at end of file
+    run_server(
+        host=WEB_HOST,
+        port=WEB_PORT,
+        debug=WEB_SERVER == "dev",
+        server=WEB_SERVER,
+        workers=WEB_WORKERS,
+        threads=WEB_THREADS,
+        keepalive=WEB_KEEPALIVE,
+        graceful_timeout=WEB_GRACEFUL_TIMEOUT
+    )
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Configuración de Tests
+Los módulos de src/ se importan por su nombre, igual que en el bot
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
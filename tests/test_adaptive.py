@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Tests del Ajuste Adaptativo
+Encoge bajo carga, crece en reposo y nunca sale de los límites configurados
+"""
+
+from adaptive import AdaptiveController
+
+
+class FakeScheduler:
+    """Cola simulada"""
+    queued = 0
+
+
+def make_controller(scheduler, **kwargs):
+    options = dict(
+        num_predict=500,
+        num_ctx=4096,
+        min_predict=128,
+        min_ctx=1024,
+        target_p95=10.0,
+        queue_high=5,
+        window=20,
+        min_samples=10,
+        interval=3600,
+        reload_interval=0,
+        ctx_step=512,
+        scheduler=scheduler
+    )
+    options.update(kwargs)
+    return AdaptiveController(**options)
+
+
+def feed(controller, latency, count=20):
+    for _ in range(count):
+        controller.observe(latency)
+
+
+def test_no_decision_below_min_samples():
+    controller = make_controller(FakeScheduler())
+    feed(controller, 50.0, count=9)
+    assert controller.evaluate() is None
+    assert controller.options() == {"num_predict": 500, "num_ctx": 4096}
+
+
+def test_shrinks_when_p95_is_above_target():
+    scheduler = FakeScheduler()
+    controller = make_controller(scheduler)
+    feed(controller, 15.0)
+
+    decision = controller.evaluate()
+    assert decision["action"] == "shrink"
+    assert decision["before"] == {"num_predict": 500, "num_ctx": 4096}
+    # Sin cola solo se acortan las respuestas; el contexto obliga a recargar
+    assert decision["after"] == {"num_predict": 375, "num_ctx": 4096}
+
+
+def test_shrinks_context_when_queue_is_deep():
+    scheduler = FakeScheduler()
+    scheduler.queued = 5
+    controller = make_controller(scheduler)
+    feed(controller, 1.0)
+
+    decision = controller.evaluate()
+    assert decision["action"] == "shrink"
+    assert decision["queue_depth"] == 5
+    assert decision["after"] == {"num_predict": 375, "num_ctx": 3584}
+
+
+def test_grows_back_when_idle():
+    scheduler = FakeScheduler()
+    scheduler.queued = 8
+    controller = make_controller(scheduler)
+    feed(controller, 15.0)
+    controller.evaluate()
+    controller.evaluate()
+    shrunk = controller.options()
+
+    scheduler.queued = 0
+    feed(controller, 2.0)
+    decision = controller.evaluate()
+    assert decision["action"] == "grow"
+    assert decision["before"] == shrunk
+    assert decision["after"]["num_predict"] > shrunk["num_predict"]
+    assert decision["after"]["num_ctx"] == shrunk["num_ctx"] + 512
+
+
+def test_stays_within_bounds():
+    scheduler = FakeScheduler()
+    controller = make_controller(scheduler)
+
+    scheduler.queued = 10
+    feed(controller, 60.0)
+    for _ in range(30):
+        controller.evaluate()
+    assert controller.options() == {"num_predict": 128, "num_ctx": 1024}
+    # Ya en el mínimo: no hay nada que cambiar
+    assert controller.evaluate() is None
+
+    scheduler.queued = 0
+    feed(controller, 1.0)
+    for _ in range(30):
+        controller.evaluate()
+    assert controller.options() == {"num_predict": 500, "num_ctx": 4096}
+    assert controller.evaluate() is None
+
+
+def test_context_changes_respect_reload_interval():
+    scheduler = FakeScheduler()
+    scheduler.queued = 10
+    controller = make_controller(scheduler, reload_interval=3600)
+    feed(controller, 60.0)
+
+    assert controller.evaluate()["after"]["num_ctx"] == 3584
+    # num_predict sigue bajando, pero el contexto espera a reload_interval
+    assert controller.evaluate()["after"] == {"num_predict": 281, "num_ctx": 3584}
+
+
+def test_timeouts_push_the_p95_over_target():
+    controller = make_controller(FakeScheduler())
+    feed(controller, 4.0, count=18)
+    # En reposo y ya en el máximo
+    assert controller.evaluate() is None
+
+    # Dos timeouts de 30 s entre 20 muestras bastan para superar la p95 objetivo
+    feed(controller, 30.0, count=2)
+    assert controller.p95() == 30.0
+    assert controller.evaluate()["action"] == "shrink"
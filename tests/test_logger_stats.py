@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Tests de los Agregados de Interacciones
+Los agregados incrementales deben coincidir siempre con una relectura completa
+"""
+
+import json
+
+import pytest
+
+from logger import BotLogger
+
+
+def write_interactions(path, count, response_time=1.0, mode='a'):
+    """Escribe interacciones como lo haría otro proceso del bot"""
+    with open(path, mode, encoding='utf-8') as f:
+        for n in range(count):
+            f.write(json.dumps({
+                "timestamp": "2026-01-01T00:00:00",
+                "user_id": n,
+                "prompt": "hola",
+                "response": "adiós",
+                "response_time": response_time,
+                "prompt_length": 4 + n,
+                "response_length": 5 + n
+            }) + '\n')
+
+
+def assert_matches_full_rescan(logger):
+    incremental = logger.get_interaction_stats()
+    assert incremental == logger.get_interaction_stats(full_rescan=True)
+    # La siguiente llamada incremental parte de los agregados recién guardados
+    assert logger.get_interaction_stats() == incremental
+    return incremental
+
+
+@pytest.fixture
+def logger(tmp_path):
+    bot_logger = BotLogger(log_dir=str(tmp_path), max_interaction_bytes=1024)
+    yield bot_logger
+    bot_logger.interaction_writer.close()
+
+
+def test_appends(logger):
+    for n in range(3):
+        logger.log_message(n, "pregunta", "respuesta", 0.5)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 3
+
+    for n in range(4):
+        logger.log_message(n, "otra pregunta", "otra respuesta", 1.5)
+    stats = assert_matches_full_rescan(logger)
+    assert stats["total_interactions"] == 7
+    assert stats["avg_response_time"] == pytest.approx((3 * 0.5 + 4 * 1.5) / 7)
+
+
+def test_partial_line_is_counted_once_complete(logger, tmp_path):
+    path = tmp_path / "interactions_external.jsonl"
+    write_interactions(path, 2)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 2
+
+    line = json.dumps({"response_time": 2.0, "prompt_length": 1, "response_length": 1})
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[:10])
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 2
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[10:] + '\n')
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 3
+
+
+def test_truncated_file(logger, tmp_path):
+    path = tmp_path / "interactions_external.jsonl"
+    write_interactions(path, 10)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 10
+
+    # Truncado y más pequeño que lo ya procesado
+    write_interactions(path, 3, response_time=2.0, mode='w')
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 3
+
+    # Truncado y vuelto a crecer por encima del offset guardado
+    write_interactions(path, 12, response_time=3.0, mode='w')
+    stats = assert_matches_full_rescan(logger)
+    assert stats["total_interactions"] == 12
+    assert stats["avg_response_time"] == pytest.approx(3.0)
+
+
+def test_new_and_rotated_files(logger, tmp_path):
+    logger.log_message(1, "hola", "adiós", 1.0)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 1
+
+    # Archivo nuevo de otro proceso
+    write_interactions(tmp_path / "interactions_2000_01_01_00_00_00.jsonl", 5)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 6
+
+    # Rotación por tamaño (max_interaction_bytes=1024)
+    for n in range(30):
+        logger.log_message(n, "pregunta " * 5, "respuesta " * 5, 0.25)
+    logger.interaction_writer.flush()
+    assert len(list(tmp_path.glob("interactions_*.jsonl"))) > 2
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 36
+
+    # Archivo sustituido por otro con el mismo nombre (rotación externa)
+    path = tmp_path / "interactions_2000_01_01_00_00_00.jsonl"
+    replacement = tmp_path / "replacement.tmp"
+    write_interactions(replacement, 7, response_time=4.0)
+    replacement.replace(path)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 38
+
+
+def test_deleted_file(logger, tmp_path):
+    first = tmp_path / "interactions_2000_01_01_00_00_00.jsonl"
+    second = tmp_path / "interactions_2000_01_02_00_00_00.jsonl"
+    write_interactions(first, 4)
+    write_interactions(second, 6, response_time=2.0)
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 10
+
+    first.unlink()
+    stats = assert_matches_full_rescan(logger)
+    assert stats["total_interactions"] == 6
+    assert stats["avg_response_time"] == pytest.approx(2.0)
+
+    second.unlink()
+    assert assert_matches_full_rescan(logger)["total_interactions"] == 0
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Tests del Cliente Ollama Asíncrono
+Las peticiones concurrentes no se bloquean entre sí
+"""
+
+import asyncio
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from ollama_client import OllamaClient  # noqa: E402
+
+
+async def fake_generate(request: web.Request) -> web.Response:
+    """Servidor Ollama falso: tarda lo que indica el prompt"""
+    data = await request.json()
+    await asyncio.sleep(float(data["prompt"]))
+    return web.json_response({"response": f"ok {data['prompt']}", "eval_count": 1})
+
+
+def test_concurrent_requests_take_max_latency_not_sum():
+    delays = [0.2, 0.4, 0.6, 0.8, 0.4, 0.2, 0.8, 0.6]
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/generate", fake_generate)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+
+        client = OllamaClient(f"http://{host}:{port}")
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                client.generate({"model": "fake", "prompt": str(delay)}) for delay in delays
+            ])
+            elapsed = time.perf_counter() - start
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(scenario())
+
+    assert [result["response"] for result in results] == [f"ok {delay}" for delay in delays]
+    assert elapsed < sum(delays) * 0.5
+    assert elapsed >= max(delays)
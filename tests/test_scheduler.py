@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Tests del Planificador de Generaciones
+"""
+
+import asyncio
+
+import pytest
+
+from scheduler import GenerationScheduler
+
+
+def test_failing_on_queued_releases_the_ticket():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "primera"
+
+        async def failing_notice(position: int):
+            raise RuntimeError("Discord no disponible")
+
+        first = asyncio.create_task(scheduler.run(1, slow))
+        await asyncio.sleep(0)
+
+        with pytest.raises(RuntimeError):
+            await scheduler.run(2, slow, on_queued=failing_notice)
+        assert scheduler.queued == 0
+
+        release.set()
+        assert await first == "primera"
+        assert scheduler.active == 0
+        assert scheduler.queued == 0
+
+        # El hueco sigue disponible: la siguiente petición no se queda colgada
+        result = await asyncio.wait_for(scheduler.run(3, slow), timeout=1)
+        assert result == "primera"
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_on_queued_releases_the_ticket():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        release = asyncio.Event()
+        notified = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        async def hanging_notice(position: int):
+            notified.set()
+            await asyncio.Event().wait()
+
+        first = asyncio.create_task(scheduler.run(1, slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run(2, slow, on_queued=hanging_notice))
+        await notified.wait()
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+        release.set()
+        await first
+        assert scheduler.active == 0
+        assert scheduler.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_in_the_same_tick_as_dispatch():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "lenta"
+
+        async def quick():
+            return "rápida"
+
+        first = asyncio.create_task(scheduler.run(1, slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run(2, quick))
+        await asyncio.sleep(0)
+        assert scheduler.queued == 1
+
+        # La primera termina y concede el turno a la segunda justo cuando se cancela
+        release.set()
+        second.cancel()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+
+        assert results[0] == "lenta"
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert scheduler.active == 0
+        assert scheduler.queued == 0
+        assert await asyncio.wait_for(scheduler.run(3, quick), timeout=1) == "rápida"
+
+    asyncio.run(scenario())
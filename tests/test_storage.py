@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 Bot de Discord con Ollama - Tests del Almacenamiento
+Los dos backends conservan las mismas interacciones por usuario
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import MAX_USER_INTERACTIONS, JSONStorage, SQLiteStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    backend = JSONStorage(str(tmp_path)) if request.param == "json" else SQLiteStorage(str(tmp_path / "bot.db"))
+    yield backend
+    backend.close()
+
+
+def test_interactions_are_capped_per_user(storage):
+    start = datetime(2026, 1, 1)
+    for n in range(MAX_USER_INTERACTIONS + 30):
+        storage.record_interaction("1", n, 1.0, start + timedelta(seconds=n))
+    for n in range(5):
+        storage.record_interaction("2", n, 1.0, start + timedelta(seconds=n))
+    storage.flush()
+
+    first = storage.get_user("1")
+    assert first["total_messages"] == MAX_USER_INTERACTIONS + 30
+    assert len(first["interactions"]) == MAX_USER_INTERACTIONS
+    # Se conservan las más recientes
+    assert [i["tokens"] for i in first["interactions"]] == list(range(30, MAX_USER_INTERACTIONS + 30))
+    assert len(storage.get_user("2")["interactions"]) == 5
+
+
+def test_sqlite_prunes_existing_databases_on_open(tmp_path):
+    path = tmp_path / "bot.db"
+    SQLiteStorage(str(path)).close()
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO interactions (user_id, timestamp, tokens, response_time) VALUES (?, ?, ?, ?)",
+        [("1", f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}", n, 1.0) for n in range(MAX_USER_INTERACTIONS + 50)]
+    )
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(str(path))
+    try:
+        rows = storage._connection().execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+        assert rows == MAX_USER_INTERACTIONS
+    finally:
+        storage.close()
+
+
+def test_json_flush_during_writes_keeps_every_interaction(tmp_path):
+    storage = JSONStorage(str(tmp_path), flush_interval=3600, flush_threshold=10 ** 9)
+    for n in range(2000):
+        storage.record_interaction(str(n), 1, 1.0, datetime(2026, 1, 1))
+    stop = threading.Event()
+
+    def flush_loop():
+        while not stop.is_set():
+            storage.flush()
+
+    flusher = threading.Thread(target=flush_loop)
+    flusher.start()
+    try:
+        for n in range(3000):
+            storage.record_interaction(str(n % 50), 10, 0.5, datetime(2026, 1, 2))
+    finally:
+        stop.set()
+        flusher.join()
+    storage.close()
+
+    with open(tmp_path / "stats.json", encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["global"]["total_messages"] == 5000
+    assert sum(user["total_messages"] for user in saved["users"].values()) == 5000
+    assert saved["users"]["0"]["total_messages"] == 1 + 60
+    assert len(saved["users"]["0"]["interactions"]) == 61
+
+
+def test_sqlite_failed_write_only_drops_that_operation(tmp_path):
+    class FakeLogger:
+        def __init__(self):
+            self.errors = []
+
+        def log_error(self, user_id, error):
+            self.errors.append(error)
+
+    logger = FakeLogger()
+    storage = SQLiteStorage(str(tmp_path / "bot.db"), logger=logger)
+    try:
+        storage.record_interaction("1", 10, 1.0, datetime(2026, 1, 1))
+        storage._submit(lambda conn: conn.execute("INSERT INTO missing_table VALUES (1)"))
+        storage.record_interaction("2", 20, 2.0, datetime(2026, 1, 1))
+        storage.flush()
+
+        assert storage.get_user("1")["total_messages"] == 1
+        assert storage.get_user("2")["total_messages"] == 1
+        assert len(logger.errors) == 1
+        assert "missing_table" in logger.errors[0]
+    finally:
+        storage.close()
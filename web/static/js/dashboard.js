@@ -1,11 +1,20 @@
 // Dashboard JavaScript for Bot Statistics
 
 let responseTimeChart, tokensPerSecChart, messagesByUserChart, commandsChart;
+let streaming = false;
+
+// Time series refresh triggered by the live stream (one request at a time)
+let timeSeriesRequest = null;
+let timeSeriesStale = false;
+
+// Delay before retrying the live stream when the server turned it down
+const STREAM_RETRY_MS = 60000;
 
 // Initialize dashboard when page loads
 document.addEventListener('DOMContentLoaded', function() {
     initializeCharts();
     loadDashboardData();
+    connectStream();
 });
 
 // Initialize Chart.js charts
@@ -188,6 +197,99 @@ function updateCommandsChart(data) {
     commandsChart.update();
 }
 
+// Live updates from /api/stream: patch cards and charts in place
+function connectStream() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('snapshot', (event) => {
+        streaming = true;
+        applyChanges(JSON.parse(event.data).data);
+    });
+
+    source.addEventListener('delta', (event) => {
+        const delta = JSON.parse(event.data);
+        applyChanges(delta.changes);
+        // The time charts are bucketed: reload the series when new messages
+        // land in the current bucket instead of plotting single interactions
+        const global = delta.changes.global || {};
+        if ((delta.interactions || []).length || global.total_messages !== undefined) {
+            refreshTimeSeries();
+        }
+    });
+
+    // Stream full: keep polling and try again later
+    source.addEventListener('busy', () => {
+        source.close();
+        setTimeout(connectStream, STREAM_RETRY_MS);
+    });
+
+    // The browser reconnects on its own (not after an error response such as
+    // 503); polling covers the gap
+    source.onerror = () => {
+        streaming = false;
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(connectStream, STREAM_RETRY_MS);
+        }
+    };
+}
+
+// Apply the changed parts of the summary
+function applyChanges(changes) {
+    const global = changes.global || {};
+    if (global.total_messages !== undefined) {
+        document.getElementById('total-messages').textContent = global.total_messages;
+    }
+    if (global.unique_users !== undefined) {
+        document.getElementById('total-users').textContent = global.unique_users;
+    }
+    if (global.avg_response_time !== undefined) {
+        document.getElementById('avg-response-time').textContent = `${global.avg_response_time.toFixed(2)}s`;
+    }
+    if (global.avg_tokens_per_second !== undefined) {
+        document.getElementById('avg-tokens-sec').textContent = global.avg_tokens_per_second.toFixed(1);
+    }
+
+    if (changes.top_users) {
+        messagesByUserChart.data.labels = changes.top_users.map(user => `Usuario ${user.user_id}`);
+        messagesByUserChart.data.datasets[0].data = changes.top_users.map(user => user.total_messages);
+        messagesByUserChart.update('none');
+    }
+
+    if (changes.top_commands) {
+        commandsChart.data.labels = changes.top_commands.map(item => `/${item.command}`);
+        commandsChart.data.datasets[0].data = changes.top_commands.map(item => item.uses);
+        commandsChart.update('none');
+    }
+}
+
+// Reload the bucketed response time and tokens/s series
+function refreshTimeSeries() {
+    if (timeSeriesRequest) {
+        // Fetch again once the current request finishes
+        timeSeriesStale = true;
+        return;
+    }
+
+    timeSeriesRequest = fetch('/api/stats/charts')
+        .then(response => response.json())
+        .then(chartData => {
+            updateResponseTimeChart(chartData.response_times);
+            updateTokensPerSecChart(chartData.tokens_per_second);
+        })
+        .catch(error => console.error('Error loading chart data:', error))
+        .finally(() => {
+            timeSeriesRequest = null;
+            if (timeSeriesStale) {
+                timeSeriesStale = false;
+                refreshTimeSeries();
+            }
+        });
+}
+
 // Refresh data manually
 function refreshData() {
     const refreshBtn = event.target;
@@ -246,5 +348,9 @@ function showError(message) {
     }, 5000);
 }
 
-// Auto refresh data every 30 seconds
-setInterval(loadDashboardData, 30000);
+// Auto refresh data every 30 seconds (only while the live stream is down)
+setInterval(() => {
+    if (!streaming) {
+        loadDashboardData();
+    }
+}, 30000);